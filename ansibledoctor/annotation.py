@@ -2,25 +2,35 @@
 """Find and parse annotations to AnnotationItem objects."""
 
 import json
+import logging
 import re
-from collections import defaultdict
-from typing import IO, Any
+from typing import Any
 
-import anyconfig
 import structlog
 
+from ansibledoctor.annotation_lexer import AnnotationLexer, AnnotationToken
+from ansibledoctor.annotation_merge import AnnotationMerger
 from ansibledoctor.config import SingleConfig
+from ansibledoctor.constants import DEFAULTS_FILE_KEY, VARS_FILE_KEY
+from ansibledoctor.exception import RoleError
 from ansibledoctor.file_registry import Registry
-from ansibledoctor.utils import _split_string, sys_exit_with_message
-from ansibledoctor.utils.file_utils import classify_var_file
+from ansibledoctor.model import Entry, new_entry
+from ansibledoctor.utils import _split_string
+
+MULTILINE_CHARS = [">", "$>"]
+STARTS_WITH_ANNOTATION = re.compile(r"(\#\ *[\@][\w]+)")
+COMMENT = re.compile(r"\#(.*)")
 
 
 class AnnotationItem:
     """Handle annotations."""
 
-    # next time improve this by looping over public available attributes
-    def __init__(self) -> None:
-        self.data: defaultdict[Any, dict[Any, Any]] = defaultdict(dict)
+    __slots__ = ("data", "file", "line")
+
+    def __init__(self, file: str = "", line: int = 0) -> None:
+        self.data: dict[str, Entry] = {}
+        self.file = file
+        self.line = line
 
     def __str__(self) -> str:
         """Beautify object string output."""
@@ -30,19 +40,42 @@ class AnnotationItem:
 
         return "None"
 
-    def get_obj(self) -> dict[Any, dict[Any, Any]]:
+    def get_obj(self) -> dict[str, Entry]:
         return self.data
 
 
 class Annotation:
-    """Handle annotations."""
+    """
+    Handle annotations.
+
+    Annotation lines that can't be used, e.g. because of an unknown subtype, are skipped and
+    recorded as issues with file and line, see `get_issues`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        files_registry: Registry,
+        lexer: AnnotationLexer | None = None,
+        strict: bool = True,
+    ) -> None:
+        """
+        Find all lines of an annotation.
 
-    def __init__(self, name: str, files_registry: Registry) -> None:
-        self._all_items: defaultdict[Any, Any] = defaultdict(dict)
-        self._file_handler: IO[str]
+        :param name: name of the annotation, e.g. `var`
+        :param files_registry: files of the role
+        :param lexer: lexer shared by all annotations of the role
+        :param strict: fail on invalid json values, otherwise the line is skipped and recorded
+            as issue
+        """
+        self._items: list[AnnotationItem] = []
+        self._issues: list[tuple[str, int, str, str]] = []
+        self._strict = strict
+        self._annotation_definition: dict[str, Any]
         self.config = SingleConfig()
         self.log = structlog.get_logger()
         self._files_registry = files_registry
+        self._lexer = lexer or AnnotationLexer(files_registry)
 
         self._all_annotations = self.config.get_annotations_definition()
 
@@ -53,68 +86,62 @@ class Annotation:
             self._find_annotation()
 
     def get_details(self) -> dict[str, Any]:
-        return self._all_items
+        return AnnotationMerger().fold(
+            self._annotation_definition["name"], self._annotation_definition, self._items
+        )
+
+    def get_items(self) -> list[AnnotationItem]:
+        return self._items
+
+    def get_issues(self) -> list[tuple[str, int, str, str]]:
+        """Get the skipped or incomplete annotation lines as file, line, check and message."""
+        return self._issues
+
+    def get_definition(self) -> dict[str, Any]:
+        return self._annotation_definition
 
     def _find_annotation(self) -> None:
-        regex = r"(\#\ *\@" + self._annotation_definition["name"] + r"\ +.*)"
-        for rfile in self._files_registry.get_files():
-            with open(rfile, encoding="utf8") as self._file_handler:
-                num = 1
-                while True:
-                    line = self._file_handler.readline()
-                    if not line:
-                        break
-
-                    if re.match(regex, line.strip()):
-                        item = self._get_annotation_data(
-                            num, line, self._annotation_definition["name"], rfile
-                        )
-                        if item:
-                            self.log.info(f"Found {item!s}")
-                            self._populate_item(item.get_obj())
-                    num += 1
-
-    def _populate_item(self, item: dict[str, Any]) -> None:
-        allow_multiple = self._annotation_definition["allow_multiple"]
-
-        for key, value in item.items():
-            if allow_multiple:
-                if key not in self._all_items:
-                    self._all_items[key] = []
-                self._all_items[key].append(value)
-            else:
-                try:
-                    anyconfig.merge(self._all_items[key], value, ac_merge=anyconfig.MS_DICTS)
-                except ValueError as e:
-                    sys_exit_with_message("Failed to merge annotation values", error=e)
+        name = self._annotation_definition["name"]
+        prefix = re.compile(r"(\#\ *\@" + name + r"\ *)")
+        # Resolve the lazy logger once and only format items if they are logged.
+        log = self.log.bind()
+        debug = log.is_enabled_for(logging.DEBUG)
+        for token in self._lexer.tokens(name):
+            item = self._get_annotation_data(token, prefix)
+            if item:
+                if debug:
+                    log.debug(f"Found {item!s}", path=item.file, line=item.line)
+                self._items.append(item)
 
     def _get_annotation_data(
-        self, num: int, line: str, name: str, rfile: str
+        self, token: AnnotationToken, prefix: re.Pattern[str]
     ) -> AnnotationItem | None:
         """
         Make some string conversion on a line in order to get the relevant data.
 
-        :param line:
+        :param token: annotation line found by the lexer
+        :param prefix: pattern of the annotation prefix, e.g. `# @var`
         """
-        item = AnnotationItem()
+        name = token.name
+        rfile = token.file
+        num = token.num
+        item = AnnotationItem(file=rfile, line=num)
 
         # step1 remove the annotation
-        reg1 = r"(\#\ *\@" + name + r"\ *)"
-        line1 = re.sub(reg1, "", line).strip()
+        line1 = prefix.sub("", token.line).strip()
 
         # step3 take the main key value from the annotation
         parts = [part.strip() for part in _split_string(line1, ":", "\\", 2)]
         key = str(parts[0])
-        item.data[key] = {}
+        item.data[key] = new_entry(name, file=rfile, line=num)
 
         if name == "var":
-            file_type = classify_var_file(rfile)
-            if file_type:
+            file_type = self._files_registry.get_file_type(rfile)
+            if file_type in (VARS_FILE_KEY, DEFAULTS_FILE_KEY):
                 item.data[key]["source"] = file_type
 
-        multiline_char = [">", "$>"]
-
         if len(parts) < 2:
+            self._issues.append((rfile, num, "missing-value", f"Missing value of @{name} {key}"))
             return None
 
         if len(parts) == 2:
@@ -122,43 +149,43 @@ class Annotation:
 
         subtypes = self._annotation_definition["subtypes"]
         if subtypes and parts[1] not in subtypes:
+            self._issues.append(
+                (rfile, num, "unknown-subtype", f"Unknown subtype '{parts[1]}' of @{name} {key}")
+            )
             return None
 
         content: Any = [parts[2]]
 
-        if parts[2] not in multiline_char and parts[2].startswith("$"):
+        if parts[2] not in MULTILINE_CHARS and parts[2].startswith("$"):
             source = parts[2].replace("$", "").strip()
             content = self._str_to_json(key, source, rfile, num)
+            if content is None:
+                return None
 
         item.data[key][parts[1]] = content
 
         # step4 check for multiline description
-        if parts[2] in multiline_char:
+        if parts[2] in MULTILINE_CHARS:
             multiline: Any = []
-            stars_with_annotation = r"(\#\ *[\@][\w]+)"
-            current_file_position = self._file_handler.tell()
             before = ""
             after = ""
 
-            while True:
-                next_line = self._file_handler.readline().lstrip()
+            for raw_line in token.following_lines():
+                next_line = raw_line.lstrip()
 
                 if not next_line.strip():
-                    self._file_handler.seek(current_file_position)
                     break
 
                 # match if annotation in line
-                if re.match(stars_with_annotation, next_line):
-                    self._file_handler.seek(current_file_position)
+                if STARTS_WITH_ANNOTATION.match(next_line):
                     break
 
                 # match if does not start with comment
                 test_line2 = next_line.strip()
                 if test_line2[:1] != "#":
-                    self._file_handler.seek(current_file_position)
                     break
 
-                final = re.findall(r"\#(.*)", next_line)[0].rstrip()
+                final = COMMENT.findall(next_line)[0].rstrip()
                 if final[:1] == " ":
                     final = final[1:]
                 final = before + final
@@ -178,17 +205,29 @@ class Annotation:
 
                 multiline.append(before + final + after)
 
+            if not multiline:
+                self._issues.append(
+                    (rfile, num, "empty-multiline", f"Multiline @{name} {key} has no content")
+                )
+
             if parts[2].startswith("$"):
                 source = "".join([x.strip() for x in multiline])
                 multiline = self._str_to_json(key, source, rfile, num)
+                if multiline is None:
+                    return None
 
             item.data[key][parts[1]] = multiline
         return item
 
-    def _str_to_json(self, key: str, string: str, rfile: str, num: int) -> dict[str, object]:
+    def _str_to_json(
+        self, key: str, string: str, rfile: str, num: int
+    ) -> dict[str, object] | None:
         try:
             return {key: json.loads(string)}
         except ValueError as e:
-            sys_exit_with_message(
+            if not self._strict:
+                self._issues.append((rfile, num, "invalid-json", f"Invalid json of {key}: {e}"))
+                return None
+            raise RoleError(
                 f"ValueError: Failed to parse json in {rfile}:{num!s}", file=rfile, error=e
-            )
+            ) from e
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Find annotation lines in role files."""
+
+import re
+from collections.abc import Iterator
+
+from ansibledoctor.file_registry import Registry
+from ansibledoctor.utils import parallel_map
+
+# Annotation names are followed by the value, `@end` closes multiline values on its own.
+ANNOTATION_LINE = re.compile(r"\#\ *\@(\w+)(?:\ +|$)")
+
+
+class AnnotationToken:
+    """Single annotation line and its position in the file."""
+
+    __slots__ = ("_buffer", "_end", "file", "line", "name", "num")
+
+    def __init__(self, name: str, file: str, num: int, line: str, buffer: bytes, end: int) -> None:
+        self.name = name
+        self.file = file
+        self.num = num
+        self.line = line
+        self._buffer = buffer
+        self._end = end
+
+    def following_lines(self) -> Iterator[str]:
+        """Iterate over the lines after the annotation line, e.g. for multiline values."""
+        buffer = self._buffer
+        pos = self._end
+        while pos < len(buffer):
+            end = buffer.find(b"\n", pos)
+            end = len(buffer) if end == -1 else end + 1
+            yield buffer[pos:end].decode("utf8")
+            pos = end
+
+
+class AnnotationLexer:
+    """
+    Find annotation lines of all annotations in a single pass over the role files.
+
+    Each file is read once as bytes. Only lines that contain an `@` are decoded and matched
+    against the annotation pattern, all other lines are skipped by a byte search. Files
+    without any annotation are released immediately. Files can be scanned on multiple threads,
+    the tokens are always returned in order of the registry files.
+    """
+
+    def __init__(self, files_registry: Registry, workers: int = 1) -> None:
+        self._files_registry = files_registry
+        self._workers = workers
+        self._tokens: dict[str, list[AnnotationToken]] | None = None
+
+    def tokens(self, name: str) -> list[AnnotationToken]:
+        """
+        Get all lines of an annotation in order of appearance.
+
+        :param name: name of the annotation, e.g. `var`
+        """
+        return self._scan().get(name, [])
+
+    def names(self) -> list[str]:
+        """Get the names of all annotations found in the role files, including unknown names."""
+        return list(self._scan())
+
+    def _scan(self) -> dict[str, list[AnnotationToken]]:
+        if self._tokens is None:
+            self._tokens = {}
+            files = self._files_registry.get_files()
+            for tokens in parallel_map(self._scan_file, files, self._workers):
+                for token in tokens:
+                    self._tokens.setdefault(token.name, []).append(token)
+
+        return self._tokens
+
+    def _scan_file(self, rfile: str) -> list[AnnotationToken]:
+        buffer, lines = self._files_registry.cached(
+            "annotations", rfile, lambda: self._scan_buffer(rfile)
+        )
+        return [
+            AnnotationToken(name, rfile, num, line, buffer, end) for name, num, line, end in lines
+        ]
+
+    def _scan_buffer(self, rfile: str) -> tuple[bytes, list[tuple[str, int, str, int]]]:
+        """Find the annotation lines of a file, independent of the path of the file."""
+        with open(rfile, "rb") as f:
+            buffer = f.read()
+
+        lines: list[tuple[str, int, str, int]] = []
+        pos = buffer.find(b"@")
+        if pos == -1:
+            return b"", lines
+
+        # Same line breaks as files opened in text mode.
+        if b"\r" in buffer:
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            pos = buffer.find(b"@")
+
+        num = 1
+        counted = 0
+        while pos != -1:
+            start = buffer.rfind(b"\n", 0, pos) + 1
+            end = buffer.find(b"\n", pos)
+            end = len(buffer) if end == -1 else end + 1
+
+            num += buffer.count(b"\n", counted, start)
+            counted = start
+
+            line = buffer[start:end].decode("utf8")
+            match = ANNOTATION_LINE.match(line.strip())
+            if match:
+                lines.append((match.group(1), num, line, end))
+
+            pos = buffer.find(b"@", end)
+
+        # Files without any annotation are released immediately.
+        return (buffer if lines else b""), lines
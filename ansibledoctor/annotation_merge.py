@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Merge annotation items into the documentation data object."""
+
+from collections.abc import Iterable, Mapping, MutableMapping
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from ansibledoctor.exception import AnnotationError
+from ansibledoctor.model import new_entry
+
+if TYPE_CHECKING:
+    from ansibledoctor.annotation import AnnotationItem
+
+
+class AnnotationMerger:
+    """
+    Merge annotation items in a single linear pass.
+
+    Items of annotations that allow multiple definitions are collected in order of appearance.
+    For all other annotations, later definitions of the same key and subtype take precedence
+    and mappings are merged recursively. Overridden definitions are reported as conflicts
+    including the file and line of both definitions.
+    """
+
+    # Keys added automatically to an annotation item, e.g. the source of a variable.
+    IMPLICIT_KEYS = ("source",)
+
+    def __init__(self) -> None:
+        self.log = structlog.get_logger()
+        self.conflicts: list[dict[str, Any]] = []
+
+    def fold(
+        self, name: str, definition: dict[str, Any], items: Iterable["AnnotationItem"]
+    ) -> dict[str, Any]:
+        """
+        Combine all items of a single annotation.
+
+        :param name: name of the annotation
+        :param definition: annotation definition, see `Config.ANNOTATIONS`
+        :param items: annotation items in order of appearance
+        :return: dict of annotation keys and their combined values
+        """
+        result, _ = self._fold(name, definition, items)
+        return result
+
+    def merge(
+        self,
+        data: MutableMapping[str, Any],
+        name: str,
+        definition: dict[str, Any],
+        items: Iterable["AnnotationItem"],
+    ) -> None:
+        """
+        Merge all items of a single annotation into `data[name]`.
+
+        Annotation values take precedence over values already present in `data`.
+
+        :raises ansibledoctor.exception.AnnotationError: if a mapping would be replaced
+            by a value of another type
+        """
+        result, origins = self._fold(name, definition, items)
+        section = data.setdefault(name, {})
+
+        for key, value in result.items():
+            if key not in section:
+                section[key] = value
+                continue
+
+            origin = origins[key][-1]
+            deep_merge(section, key, value, origin.file, origin.line)
+
+    def _fold(
+        self, name: str, definition: dict[str, Any], items: Iterable["AnnotationItem"]
+    ) -> tuple[dict[str, Any], dict[str, list["AnnotationItem"]]]:
+        result: dict[str, Any] = {}
+        origins: dict[str, list[AnnotationItem]] = {}
+        allow_multiple = definition.get("allow_multiple", False)
+
+        for item in items:
+            for key, value in item.get_obj().items():
+                if key in origins:
+                    origins[key].append(item)
+                else:
+                    origins[key] = [item]
+
+                if allow_multiple:
+                    result.setdefault(key, []).append(value)
+                    continue
+
+                target = result.get(key)
+                if target is None:
+                    result[key] = target = new_entry(name, file=item.file, line=item.line)
+
+                for subtype, content in value.items():
+                    if subtype not in target:
+                        target[subtype] = content
+                        continue
+
+                    if subtype not in self.IMPLICIT_KEYS:
+                        self._report_conflict(name, key, subtype, origins[key], item)
+                    deep_merge(target, subtype, content, item.file, item.line)
+
+        return result, origins
+
+    def _report_conflict(
+        self,
+        name: str,
+        key: str,
+        subtype: str,
+        previous: list["AnnotationItem"],
+        item: "AnnotationItem",
+    ) -> None:
+        # The most recent earlier item that defined the same subtype.
+        first = next(
+            (p for p in reversed(previous[:-1]) if subtype in p.get_obj().get(key, {})), item
+        )
+        second = item
+        conflict = {
+            "annotation": name,
+            "key": key,
+            "subtype": subtype,
+            "first": f"{first.file}:{first.line}",
+            "second": f"{second.file}:{second.line}",
+        }
+        self.conflicts.append(conflict)
+        self.log.warning(f"Conflicting definitions for @{name} {key}:{subtype}", **conflict)
+
+
+def deep_merge(
+    target: MutableMapping[str, Any],
+    key: str,
+    value: Any,
+    file: str | None = None,
+    line: int | None = None,
+) -> None:
+    """
+    Merge `value` into `target[key]`.
+
+    Mappings are merged recursively, all other values replace the existing value.
+
+    :raises ansibledoctor.exception.AnnotationError: if a mapping would be replaced
+        by a value of another type
+    """
+    current = target.get(key)
+
+    if not (isinstance(current, (dict, MutableMapping))):
+        target[key] = value
+        return
+
+    if not (isinstance(value, (dict, Mapping))):
+        location = f"{file}:{line}" if file else "unknown location"
+        raise AnnotationError(
+            f"Can not merge {type(value).__name__} into mapping for key '{key}' at {location}"
+        )
+
+    for sub_key, sub_value in value.items():
+        deep_merge(current, sub_key, sub_value, file, line)
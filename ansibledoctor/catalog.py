@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""SQLite catalog of the documentation data of many roles."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any
+
+from ansibledoctor import __version__
+from ansibledoctor.exception import CatalogError
+from ansibledoctor.model import RoleData, as_plain
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    fingerprint TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    role_id INTEGER NOT NULL REFERENCES roles (id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source TEXT,
+    file TEXT,
+    line INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (section, name);
+CREATE INDEX IF NOT EXISTS entries_role ON entries (role_id);
+"""
+
+
+class Catalog:
+    """
+    Catalog of variables, tags, todos, meta information and examples of all roles.
+
+    Every entry of the role data is stored with its role, source (`defaults` or `vars` for
+    variables), file and line, the entry itself is stored as json document. Roles are updated
+    in a single transaction and only if their fingerprint has changed, so unchanged roles are
+    neither parsed nor written again.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            self._db = sqlite3.connect(path)
+            self._db.execute("PRAGMA foreign_keys = ON")
+            self._db.execute("PRAGMA journal_mode = WAL")
+
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise CatalogError(
+                    f"Unsupported catalog version {version}, remove the catalog to rebuild it",
+                    path,
+                )
+
+            with self._db:
+                self._db.executescript(SCHEMA)
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except sqlite3.Error as e:
+            raise CatalogError("Can not open catalog", str(e)) from e
+
+    def close(self) -> None:
+        self._db.close()
+
+    @staticmethod
+    def fingerprint(files: list[str], options: dict[str, Any] | None = None) -> str:
+        """
+        Fingerprint the role files by path, size and modification time.
+
+        :param files: all files of a role
+        :param options: settings that change the parsed data, e.g. `exclude_tags`
+        """
+        digest = hashlib.sha256(__version__.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+        for path in sorted(files):
+            stat = os.stat(path)
+            digest.update(f"\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+
+        return digest.hexdigest()
+
+    def is_current(self, path: str, fingerprint: str) -> bool:
+        """Check if the role at the given path is stored with the same fingerprint."""
+        row = self._db.execute("SELECT fingerprint FROM roles WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def update(self, name: str, path: str, fingerprint: str, role_data: RoleData) -> None:
+        """
+        Replace all entries of a role.
+
+        :param name: role name
+        :param path: absolute path of the role directory, identifies the role
+        :param fingerprint: fingerprint of the role files, see `fingerprint`
+        :param role_data: parsed role data
+        """
+        rows: list[tuple[Any, ...]] = []
+        for section in role_data.SECTIONS:
+            for key, value in role_data[section].items():
+                entries = value if isinstance(value, list) else [value]
+                for entry in entries:
+                    file = getattr(entry, "file", None)
+                    rows.append(
+                        (
+                            section,
+                            str(key),
+                            _get(entry, "source"),
+                            os.path.relpath(file, path) if file else None,
+                            getattr(entry, "line", None),
+                            json.dumps(as_plain(entry), default=str),
+                        )
+                    )
+
+        with self._db:
+            self._db.execute("DELETE FROM roles WHERE path = ?", (path,))
+            role_id = self._db.execute(
+                "INSERT INTO roles (name, path, fingerprint, updated) VALUES (?, ?, ?, ?)",
+                (name, path, fingerprint, time.time()),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO entries (role_id, section, name, source, file, line, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(role_id, *row) for row in rows],
+            )
+
+    def prune(self, base_dir: str, keep: list[str]) -> int:
+        """
+        Remove roles below a directory that no longer exist.
+
+        :param base_dir: only roles below this directory are removed
+        :param keep: paths of the roles to keep
+        :return: number of removed roles
+        """
+        prefix = os.path.join(base_dir, "")
+        removed = [
+            path
+            for (path,) in self._db.execute("SELECT path FROM roles")
+            if path.startswith(prefix) and path not in keep
+        ]
+        with self._db:
+            self._db.executemany("DELETE FROM roles WHERE path = ?", [(p,) for p in removed])
+
+        return len(removed)
+
+    def query(
+        self,
+        section: str,
+        name: str = "*",
+        role: str = "*",
+        source: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Look up entries of all roles.
+
+        :param section: section of the role data, e.g. `var` or `tag`, or `role` to list roles
+        :param name: name of the entries, supports glob wildcards like `nginx_*`
+        :param role: name of the roles, supports glob wildcards
+        :param source: only return variables of this source, e.g. `defaults`
+        """
+        if section == "role":
+            cursor = self._db.execute(
+                "SELECT name, path, updated FROM roles WHERE name GLOB ? AND name GLOB ? "
+                "ORDER BY name, path",
+                (name, role),
+            )
+            return [{"role": n, "path": p, "updated": u} for n, p, u in cursor]
+
+        sql = (
+            "SELECT r.name, r.path, e.name, e.source, e.file, e.line, e.data "
+            "FROM entries e JOIN roles r ON r.id = e.role_id "
+            "WHERE e.section = ? AND e.name GLOB ? AND r.name GLOB ?"
+        )
+        params: list[Any] = [section, name, role]
+        if source is not None:
+            sql += " AND e.source = ?"
+            params.append(source)
+
+        cursor = self._db.execute(sql + " ORDER BY r.name, e.name, e.file, e.line", params)
+        return [
+            {
+                "role": role_name,
+                "path": path,
+                "name": entry_name,
+                "source": entry_source,
+                "file": file,
+                "line": line,
+                "data": json.loads(data),
+            }
+            for role_name, path, entry_name, entry_source, file, line, data in cursor
+        ]
+
+
+def _get(entry: Any, key: str) -> Any:
+    try:
+        return entry[key]
+    except (KeyError, TypeError):
+        return None
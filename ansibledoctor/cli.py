@@ -2,17 +2,35 @@
 """Entrypoint and CLI handler."""
 
 import argparse
+import json
 import os
+import sys
+from contextlib import AbstractContextManager, nullcontext
 from typing import Any
 
 import structlog
 
 import ansibledoctor.exception
 from ansibledoctor import __version__
+from ansibledoctor.catalog import Catalog
 from ansibledoctor.config import SingleConfig
+from ansibledoctor.constants import META_FILE_KEY
 from ansibledoctor.doc_generator import Generator
-from ansibledoctor.doc_parser import Parser
-from ansibledoctor.utils import sys_exit_with_message
+from ansibledoctor.doc_parser import Parser, read_meta_files
+from ansibledoctor.file_registry import Registry
+from ansibledoctor.lint import Finding, Linter
+from ansibledoctor.output_archive import OutputArchive
+from ansibledoctor.pipeline import Prefetcher, RolePlan, files_to_overwrite
+from ansibledoctor.render_cache import RENDER_SETTINGS, RenderCache, file_digests
+from ansibledoctor.role_graph import RoleGraph, RoleNode
+from ansibledoctor.search_index import SearchIndex
+from ansibledoctor.template import Template
+from ansibledoctor.template_usage import TemplateUsage
+from ansibledoctor.utils import FileUtils, sys_exit, sys_exit_with_message
+from ansibledoctor.utils.error_report import ErrorReport
+from ansibledoctor.utils.file_utils import write_file_atomic
+from ansibledoctor.utils.memory_report import MemoryReport
+from ansibledoctor.utils.shared_files import SharedFiles
 
 
 class AnsibleDoctor:
@@ -96,6 +114,83 @@ class AnsibleDoctor:
             default=self.config.config.role.autodetect,
             help="disable automatic role detection",
         )
+        parser.add_argument(
+            "--memory-report",
+            dest="memory_report",
+            action="store_true",
+            default=self.config.config.memory_report,
+            help="print peak and retained memory per role and stage",
+        )
+        parser.add_argument(
+            "-j",
+            "--workers",
+            dest="workers",
+            action="store",
+            type=int,
+            default=self.config.config.workers,
+            help="number of threads to process the files of a role",
+            metavar="WORKERS",
+        )
+        parser.add_argument(
+            "-k",
+            "--keep-going",
+            dest="keep_going",
+            action="store_true",
+            default=self.config.config.keep_going,
+            help="continue with the next role if a role fails",
+        )
+        parser.add_argument(
+            "--error-report",
+            dest="error_report",
+            action="store",
+            default=self.config.config.error_report,
+            help="write errors of failed roles to a json file",
+            metavar="REPORT_FILE",
+        )
+        parser.add_argument(
+            "--catalog",
+            dest="catalog",
+            action="store",
+            default=self.config.config.catalog,
+            help="update a SQLite catalog of the roles instead of rendering",
+            metavar="CATALOG_FILE",
+        )
+        parser.add_argument(
+            "--search-index",
+            dest="search_index",
+            action="store",
+            default=self.config.config.search_index,
+            help="update a json search index of the rendered roles",
+            metavar="INDEX_FILE",
+        )
+        parser.add_argument(
+            "--archive",
+            dest="archive",
+            action="store",
+            default=self.config.config.archive,
+            help="write the rendered files of all roles to a tar archive, '-' for stdout",
+            metavar="ARCHIVE_FILE",
+        )
+        parser.add_argument(
+            "--render-cache",
+            dest="render_cache__dir",
+            action="store",
+            default=argparse.SUPPRESS,
+            help="reuse rendered files of unchanged roles from this cache directory",
+            metavar="CACHE_DIR",
+        )
+        parser.add_argument(
+            "--query",
+            action="store_true",
+            default=argparse.SUPPRESS,
+            help="search the role catalog instead, see '--query --help'",
+        )
+        parser.add_argument(
+            "--lint",
+            action="store_true",
+            default=argparse.SUPPRESS,
+            help="check the annotations of roles instead, see '--lint --help'",
+        )
         parser.add_argument(
             "-v",
             dest="logging.level",
@@ -123,27 +218,413 @@ class AnsibleDoctor:
         walk_dir = [cwd]
 
         if self.config.config.recursive:
-            walk_dir = [f.path for f in os.scandir(cwd) if f.is_dir()]
+            walk_dir = sorted(f.path for f in os.scandir(cwd) if f.is_dir())
 
+        report = MemoryReport() if self.config.config.memory_report else None
+        keep_going = self.config.config.keep_going
+        error_report = self.config.config.error_report
+        errors = ErrorReport()
+
+        if error_report:
+            error_report = os.path.abspath(error_report)
+
+        catalog = None
+        if self.config.config.catalog:
+            catalog = Catalog(os.path.abspath(self.config.config.catalog))
+
+        search_index = None
+        if self.config.config.search_index and not catalog and not self.config.config.dry_run:
+            search_index = SearchIndex(os.path.abspath(self.config.config.search_index))
+
+        render_cache = None
+        if self.config.config.render_cache.dir and not catalog and not self.config.config.dry_run:
+            render_cache = RenderCache(
+                os.path.abspath(self.config.config.render_cache.dir),
+                self.config.config.render_cache.max_size,
+            )
+
+        archive_path = self.config.config.archive
+        if archive_path and archive_path != "-":
+            archive_path = os.path.abspath(archive_path)
+
+        # Plan all roles first, so existing output files of all roles are confirmed at once and
+        # the files of the next role can be read while the current role is processed.
+        plans: list[RolePlan] = []
+        graph = RoleGraph()
+        shared_files = SharedFiles()
         for item in walk_dir:
-            os.chdir(item)
-            self.config.load(root_path=os.getcwd())
+            errors.roles += 1
+            try:
+                with self._track(report, os.path.basename(item), "plan"):
+                    plans.append(self._plan_role(item, catalog, graph, shared_files))
+            except Exception as e:  # noqa: BLE001
+                self._fail_role(errors, item, e, keep_going)
 
-            self.log.debug("Switch working directory", path=item)
-            self.log.info("Lookup config file", path=self.config.config_files)
+        graph.link()
 
-            if self.config.config.role.autodetect:
-                if self.config.is_role():
-                    structlog.contextvars.bind_contextvars(role=self.config.config.role_name)
-                    self.log.info("Ansible role detected")
-                else:
-                    sys_exit_with_message("No Ansible role detected")
+        archive = None
+        try:
+            # The output archive doesn't touch existing output files.
+            if archive_path and not catalog and not self.config.config.dry_run:
+                archive = OutputArchive(archive_path, cwd)
             else:
-                self.log.info("Ansible role detection disabled")
+                self._confirm_overwrite(plans)
+
+            for plan in Prefetcher(plans):
+                try:
+                    self._execute_role(
+                        plan,
+                        report,
+                        catalog,
+                        graph.get(plan.path),
+                        search_index,
+                        archive,
+                        render_cache,
+                    )
+                except Exception as e:  # noqa: BLE001
+                    self._fail_role(errors, plan.path, e, keep_going)
+                finally:
+                    # Results of files shared with other roles that this role skipped.
+                    plan.registry.release()
+
+            if archive:
+                archive.close()
+                self.log.info("Output archive written", path=archive.path, files=archive.members)
+        finally:
+            if archive:
+                archive.discard()
+            Template.cleanup_all()
+
+        if shared_files.hits:
+            self.log.info(
+                "Reused files shared between roles",
+                hits=shared_files.hits,
+                misses=shared_files.misses,
+            )
+
+        if render_cache:
+            self.log.info(
+                "Render cache used",
+                hits=render_cache.hits,
+                misses=render_cache.misses,
+                evicted=render_cache.evict(),
+            )
+
+        if catalog:
+            if self.config.config.recursive:
+                removed = catalog.prune(cwd, walk_dir)
+                self.log.info("Removed roles from catalog", count=removed)
+            catalog.close()
+
+        if search_index:
+            if self.config.config.recursive:
+                removed = search_index.prune(cwd, walk_dir)
+                self.log.info("Removed roles from search index", count=removed)
+            if search_index.write():
+                self.log.info(
+                    "Search index updated", path=search_index.path, roles=len(search_index)
+                )
+
+        if report:
+            report.stop()
+            sys.stderr.write(report.format())
+
+        if error_report:
+            errors.write(error_report)
+
+        if errors.records:
+            self.log.error(f"{len(errors.records)} of {errors.roles} roles failed")
+            sys_exit(1)
+
+    def _fail_role(
+        self,
+        errors: ErrorReport,
+        path: str,
+        e: Exception,
+        keep_going: bool,
+    ) -> None:
+        if not isinstance(e, ansibledoctor.exception.DoctorError):
+            # Unexpected errors, e.g. of a filter or a broken file, only fail the current role.
+            error = ansibledoctor.exception.RoleError(
+                "Unexpected error while processing role", error=f"{type(e).__name__}: {e}"
+            )
+            error.__cause__ = e
+            e = error
+
+        msg: Any = e
+        context: dict[str, Any] = {}
+        if isinstance(e, ansibledoctor.exception.RoleError):
+            msg, context = e.msg, e.context
+
+        role = os.path.basename(path)
+        if not keep_going:
+            sys_exit_with_message(msg, role=role, **context)
+
+        # Collect the error and continue with the next role
+        self.log.error(str(msg).strip(), role=role, **context)
+        errors.add(role, path, msg, **context)
+
+    def _load_role(self, path: str) -> bool | None:
+        """
+        Load the config of a role and set its name.
+
+        :return: whether the directory is a role, `None` if role detection is disabled
+        """
+        os.chdir(path)
+        self.config.load(root_path=os.getcwd())
+        if self.config.config.role.autodetect:
+            return self.config.is_role()
+        return None
+
+    def _plan_role(
+        self,
+        path: str,
+        catalog: Catalog | None = None,
+        graph: RoleGraph | None = None,
+        shared_files: SharedFiles | None = None,
+    ) -> RolePlan:
+        """
+        Detect a role and collect its files, template and output files without parsing it.
+
+        Roles that are rendered are added to the dependency graph with their meta files. Files
+        that are part of several roles, e.g. symlinked roles, are only read once.
+        """
+        is_role = self._load_role(path)
+
+        self.log.debug("Switch working directory", path=path)
+        self.log.info("Lookup config file", path=self.config.config_files)
+
+        role_context: dict[str, Any] = {}
+        if is_role is None:
+            self.log.info("Ansible role detection disabled")
+        elif is_role:
+            role_context["role"] = self.config.config.role_name
+            self.log.info("Ansible role detected", **role_context)
+        else:
+            raise ansibledoctor.exception.RoleError("No Ansible role detected")
+
+        with structlog.contextvars.bound_contextvars(**role_context):
+            if catalog is not None:
+                return RolePlan(path, role_context, Registry(shared_files))
+
+            template = Template(
+                self.config.config.get("template.name"),
+                self.config.config.get("template.src"),
+            )
+            outputs = {tf: self.config.get_output_path(tf) for tf in template.files}
+            registry = Registry(shared_files)
+            if graph is not None:
+                try:
+                    meta = read_meta_files(registry.get_files(META_FILE_KEY))
+                except Exception:
+                    registry.release()
+                    raise
+                name = self.config.config.get("role_name") or os.path.basename(path)
+                graph.add(name, path, meta)
+
+        return RolePlan(
+            path,
+            role_context,
+            registry,
+            template,
+            outputs,
+            confirm=not self.config.config.renderer.force_overwrite
+            and not self.config.config.dry_run,
+        )
+
+    def _confirm_overwrite(self, plans: list[RolePlan]) -> None:
+        """Ask once before existing output files of any role are overwritten."""
+        existing = files_to_overwrite(plans)
+        if not existing:
+            return
+
+        existing_string = "\n".join(existing)
+        prompt = f"These files will be overwritten:\n{existing_string}".replace("\n", "\n... ")
+
+        try:
+            if not FileUtils.query_yes_no(f"{prompt}\nDo you want to continue?"):
+                sys_exit_with_message("Aborted...")
+        except KeyboardInterrupt:
+            sys_exit_with_message("Aborted...")
+
+    def _execute_role(
+        self,
+        plan: RolePlan,
+        report: MemoryReport | None = None,
+        catalog: Catalog | None = None,
+        role_node: RoleNode | None = None,
+        search_index: SearchIndex | None = None,
+        archive: OutputArchive | None = None,
+        render_cache: RenderCache | None = None,
+    ) -> None:
+        """
+        Parse and render a planned role, the role data is released on return.
+
+        The entry of the role in the search index is replaced after the role is rendered. Roles
+        found in the render cache are neither parsed nor rendered, unless the search index
+        requires the role data.
+        """
+        name = os.path.basename(plan.path)
+
+        with self._track(report, name):
+            with self._track(report, name, "load"):
+                self._load_role(plan.path)
+
+            with structlog.contextvars.bound_contextvars(**plan.context):
+                if catalog is not None:
+                    with self._track(report, name, "parse"):
+                        self._update_catalog(catalog, plan.path, plan.registry)
+                    return
+
+                cache_key = None
+                cached = None
+                if render_cache is not None:
+                    cache_key = self._render_key(render_cache, plan, role_node)
+                    cached = render_cache.get(cache_key)
+
+                if cached is not None and search_index is None:
+                    self._restore_outputs(plan, cached, archive)
+                    return
+
+                # Only parse the sections the template uses, the search index needs all sections.
+                sections = None
+                if plan.template is not None and search_index is None:
+                    sections = self._template_sections(plan.template)
+
+                with self._track(report, name, "parse"):
+                    doc_parser = Parser(
+                        plan.registry, role_node.meta if role_node else None, sections
+                    )
+
+                if cached is not None:
+                    self._restore_outputs(plan, cached, archive)
+                else:
+                    with self._track(report, name, "render"):
+                        doc_generator = Generator(
+                            doc_parser,
+                            plan.template,
+                            role_node,
+                            archive,
+                            record=render_cache is not None,
+                        )
+                        doc_generator.render()
 
-            doc_parser = Parser()
-            doc_generator = Generator(doc_parser)
-            doc_generator.render()
+                    if render_cache is not None and cache_key and doc_generator.written:
+                        root = _output_root(plan)
+                        render_cache.put(
+                            cache_key,
+                            {
+                                os.path.relpath(path, root): content
+                                for path, content in doc_generator.written.items()
+                            },
+                        )
+                    del doc_generator
+
+                if search_index is not None:
+                    search_index.update(
+                        role_node.name if role_node else name,
+                        plan.path,
+                        doc_parser.get_role_data(),
+                        list(plan.outputs.values()),
+                    )
+
+                # Release the role data before the next role is processed
+                del doc_parser
+
+    def _template_sections(self, template: Template) -> frozenset[str]:
+        """Find the sections of the role data used by the template, including overrides."""
+        base_dir = os.path.abspath(self.config.args["base_dir"])
+        usage = TemplateUsage(
+            template.path,
+            [os.path.join(base_dir, ".ansibledoctor"), base_dir, template.path],
+        )
+        return usage.sections(template.files)
+
+    def _render_key(
+        self, render_cache: RenderCache, plan: RolePlan, role_node: RoleNode | None = None
+    ) -> str:
+        """Hash everything that changes the rendered output of a role, without absolute paths."""
+        template_path = plan.template.path if plan.template else ""
+        template_names = [
+            os.path.relpath(os.path.join(root, name), template_path)
+            for root, _, names in os.walk(template_path)
+            for name in names
+        ]
+        base_dir = os.path.abspath(self.config.args["base_dir"])
+        overrides = [
+            os.path.join(directory, name)
+            for directory in (os.path.join(base_dir, ".ansibledoctor"), base_dir)
+            for name in template_names
+        ]
+        header = self.config.config.get("renderer.include_header")
+        root = _output_root(plan)
+
+        return render_cache.key(
+            {
+                "role": file_digests(plan.registry.get_files(), plan.path),
+                "aliases": sorted(
+                    os.path.relpath(alias, plan.path) for alias in plan.registry.get_aliases()
+                ),
+                "template": render_cache.tree_digest(template_path),
+                "overrides": file_digests(overrides, base_dir),
+                "header": file_digests([header], plan.path) if header else {},
+                "settings": {key: self.config.config.get(key) for key in RENDER_SETTINGS},
+                "outputs": {tf: os.path.relpath(out, root) for tf, out in plan.outputs.items()},
+                "dependencies": [node.summary(role_node) for node in role_node.dependencies]
+                if role_node
+                else [],
+                "used_by": [node.summary(role_node) for node in role_node.used_by]
+                if role_node
+                else [],
+            }
+        )
+
+    def _restore_outputs(
+        self, plan: RolePlan, files: dict[str, bytes], archive: OutputArchive | None = None
+    ) -> None:
+        """Write the output files of a role from the render cache."""
+        root = _output_root(plan)
+        for relpath, content in files.items():
+            path = os.path.join(root, relpath)
+            if archive is not None:
+                archive.add(path, content)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_file_atomic(path, content)
+
+        self.log.info("Role output restored from render cache", files=len(files))
+
+    def _update_catalog(self, catalog: Catalog, path: str, registry: Registry) -> None:
+        """Parse a role into the catalog, roles with unchanged files are skipped."""
+        fingerprint = catalog.fingerprint(
+            registry.get_files(),
+            {key: self.config.config.get(key) for key in ("exclude_tags", "annotations")},
+        )
+        if catalog.is_current(path, fingerprint):
+            self.log.info("Role in catalog is up to date")
+            return
+
+        doc_parser = Parser(registry)
+        name = self.config.config.get("role_name") or os.path.basename(path)
+        catalog.update(name, path, fingerprint, doc_parser.get_role_data())
+        self.log.info("Role in catalog updated", path=catalog.path)
+
+    @staticmethod
+    def _track(
+        report: MemoryReport | None, role: str, stage: str | None = None
+    ) -> AbstractContextManager[None]:
+        if report is None:
+            return nullcontext()
+        if stage is None:
+            return report.role(role)
+        return report.stage(role, stage)
+
+
+def _output_root(plan: RolePlan) -> str:
+    """Get the common directory of all output files of a role."""
+    if not plan.outputs:
+        return plan.path
+    return os.path.commonpath([os.path.dirname(path) for path in plan.outputs.values()])
 
 
 def valid_directory(path: str) -> str:
@@ -159,5 +640,174 @@ def valid_directory(path: str) -> str:
     return path
 
 
+class CatalogQuery:
+    """Look up variables, tags, todos and meta information of all roles in the catalog."""
+
+    SECTIONS = ("var", "tag", "todo", "meta", "example", "role")
+
+    def __init__(self, argv: list[str]) -> None:
+        try:
+            self.config = SingleConfig()
+            args = self._parse_args(argv)
+            self._execute(args)
+        except ansibledoctor.exception.DoctorError as e:
+            sys_exit_with_message(e)
+
+    def _parse_args(self, argv: list[str]) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            prog="ansible-doctor --query",
+            description="Look up variables, tags, todos and meta information in the role catalog",
+        )
+        parser.add_argument("section", choices=self.SECTIONS, help="type of the entries")
+        parser.add_argument(
+            "name",
+            nargs="?",
+            default="*",
+            help="name of the entries, supports wildcards like 'nginx_*' (default: all)",
+        )
+        parser.add_argument(
+            "--catalog",
+            dest="catalog",
+            default=self.config.config.catalog,
+            help="path to the catalog file",
+            metavar="CATALOG_FILE",
+        )
+        parser.add_argument(
+            "--role", dest="role", default="*", help="only search roles matching this name"
+        )
+        parser.add_argument(
+            "--source",
+            dest="source",
+            choices=["defaults", "vars"],
+            help="only search variables of this source",
+        )
+        parser.add_argument(
+            "--json", dest="json", action="store_true", help="print results as json"
+        )
+
+        return parser.parse_args(argv)
+
+    def _execute(self, args: argparse.Namespace) -> None:
+        if not args.catalog:
+            raise ansibledoctor.exception.CatalogError("No catalog file configured")
+        if not os.path.isfile(args.catalog):
+            raise ansibledoctor.exception.CatalogError("Catalog file not found", args.catalog)
+
+        catalog = Catalog(args.catalog)
+        results = catalog.query(args.section, args.name, args.role, args.source)
+        catalog.close()
+
+        if args.json:
+            sys.stdout.write(json.dumps(results, indent=2, default=str) + "\n")
+            return
+
+        for result in results:
+            if args.section == "role":
+                columns = [result["role"], result["path"]]
+            else:
+                data = result["data"]
+                value = data.get("value", data) if isinstance(data, dict) else data
+                location = f"{result['file']}:{result['line']}" if result["line"] else ""
+                columns = [
+                    result["role"],
+                    result["name"],
+                    location or result["file"] or "",
+                    json.dumps(value, default=str),
+                ]
+            sys.stdout.write("\t".join(columns) + "\n")
+
+
+class RoleLint:
+    """Check the annotations of roles without rendering, e.g. on every commit."""
+
+    def __init__(self, argv: list[str]) -> None:
+        try:
+            self.config = SingleConfig()
+            self.log = structlog.get_logger()
+            args = self._parse_args(argv)
+            self._execute(args)
+        except ansibledoctor.exception.DoctorError as e:
+            sys_exit_with_message(e)
+        except KeyboardInterrupt:
+            sys_exit_with_message("Aborted...")
+
+    def _parse_args(self, argv: list[str]) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(
+            prog="ansible-doctor --lint",
+            description="Check the annotations of Ansible roles without rendering",
+        )
+        parser.add_argument(
+            "base_dir",
+            nargs="?",
+            default=self.config.config.base_dir,
+            type=valid_directory,
+            help="base directory (default: current working directory)",
+        )
+        parser.add_argument(
+            "-c",
+            "--config",
+            dest="config_file",
+            help="path to configuration file",
+        )
+        parser.add_argument(
+            "-r",
+            "--recursive",
+            dest="recursive",
+            action="store_true",
+            default=self.config.config.recursive,
+            help="check all roles in the base directory",
+        )
+        parser.add_argument(
+            "--json", dest="json", action="store_true", help="print findings as json"
+        )
+
+        return parser.parse_args(argv)
+
+    def _execute(self, args: argparse.Namespace) -> None:
+        self.config.load(args={"base_dir": args.base_dir, "config_file": args.config_file})
+        workdir = os.getcwd()
+        cwd = os.path.abspath(args.base_dir)
+        walk_dir = [cwd]
+        if args.recursive:
+            walk_dir = sorted(f.path for f in os.scandir(cwd) if f.is_dir())
+
+        findings: list[Finding] = []
+        for path in walk_dir:
+            os.chdir(path)
+            self.config.load(root_path=os.getcwd())
+            if self.config.config.role.autodetect and not self.config.is_role():
+                if not args.recursive:
+                    raise ansibledoctor.exception.RoleError("No Ansible role detected")
+                self.log.debug("Skip directory without role", path=path)
+                continue
+
+            linter = Linter(Registry(), self.config.config["workers"])
+            for finding in linter.findings():
+                finding.file = os.path.relpath(os.path.abspath(finding.file), workdir)
+                findings.append(finding)
+
+        os.chdir(workdir)
+        if args.json:
+            sys.stdout.write(json.dumps([f.as_dict() for f in findings], indent=2) + "\n")
+        else:
+            for finding in findings:
+                location = f"{finding.file}:{finding.line}" if finding.line else finding.file
+                sys.stdout.write(f"{location}: {finding.check}: {finding.message}\n")
+
+        if findings:
+            sys_exit(1)
+
+
 def main() -> None:
-    AnsibleDoctor()
+    # Modes are selected with flags, positional arguments are always the base directory.
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("--query", action="store_true")
+    parser.add_argument("--lint", action="store_true")
+    mode, argv = parser.parse_known_args()
+
+    if mode.query:
+        CatalogQuery(argv)
+    elif mode.lint:
+        RoleLint(argv)
+    else:
+        AnsibleDoctor()
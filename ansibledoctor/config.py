@@ -1,20 +1,28 @@
 #!/usr/bin/env python3
 """Global settings definition."""
 
+import copy
+import functools
 import logging
 import os
 import re
+import sys
+import threading
 from collections.abc import MutableMapping
 from io import StringIO
-from typing import Any
+from typing import Any, TextIO
 
 import colorama
 import structlog
 from appdirs import AppDirs
 from dynaconf import Dynaconf, ValidationError, Validator
+from dynaconf.loaders import env_loader
+from dynaconf.utils.functional import empty
 
 import ansibledoctor.exception
+from ansibledoctor.render_limits import MAX_INCLUDE_DEPTH
 from ansibledoctor.utils import Singleton
+from ansibledoctor.utils.yaml_emitter import YAML_EMITTERS
 
 
 class Config:
@@ -63,12 +71,11 @@ class Config:
         ]
         self.config_merge = True
         self.args: dict[str, Any] = {}
+        self._layers: dict[tuple[Any, ...], Any] = {}
+        self._logger_options: tuple[bool, str, bool] | None = None
         self.load()
 
     def load(self, root_path: str | None = None, args: dict[str, Any] | None = None) -> None:
-        tmpl_src = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
-        tmpl_provider = ["local", "git"]
-
         if args:
             config_file = args.get("config_file")
             if config_file:
@@ -78,134 +85,11 @@ class Config:
 
             self.args = args
 
-        self.config = Dynaconf(
-            envvar_prefix="ANSIBLE_DOCTOR",
-            merge_enabled=self.config_merge,
-            core_loaders=["YAML"],
-            root_path=root_path,
-            settings_files=self.config_files,
-            validators=[
-                Validator(
-                    "base_dir",
-                    default=os.getcwd(),
-                    apply_default_on_none=True,
-                    is_type_of=str,
-                ),
-                Validator(
-                    "dry_run",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "recursive",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "exclude_files",
-                    default=[],
-                    is_type_of=list,
-                ),
-                Validator(
-                    "exclude_tags",
-                    default=[],
-                    is_type_of=list,
-                ),
-                Validator(
-                    "role.name",
-                    is_type_of=str,
-                ),
-                Validator(
-                    "role.autodetect",
-                    default=True,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "logging.level",
-                    default="WARNING",
-                    is_in=[
-                        "DEBUG",
-                        "INFO",
-                        "WARNING",
-                        "ERROR",
-                        "CRITICAL",
-                        "debug",
-                        "info",
-                        "warning",
-                        "error",
-                        "critical",
-                    ],
-                ),
-                Validator(
-                    "logging.json",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "recursive",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "template.src",
-                    default=f"local>{tmpl_src}",
-                    is_type_of=str,
-                    condition=lambda x: re.match(r"^(local|git)\s*>\s*", x),
-                    messages={
-                        "condition": f"Template provider must be one of {tmpl_provider}.",
-                    },
-                ),
-                Validator(
-                    "template.name",
-                    default="readme",
-                    is_type_of=str,
-                ),
-                Validator(
-                    "template.options.tabulate_vars",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "template.options.sort_vars",
-                    default=True,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "renderer.autotrim",
-                    default=True,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "renderer.include_header",
-                    default="",
-                    is_type_of=str,
-                ),
-                Validator(
-                    "renderer.dest",
-                    default=os.path.relpath(os.getcwd()),
-                    is_type_of=str,
-                ),
-                Validator(
-                    "renderer.force_overwrite",
-                    default=False,
-                    is_type_of=bool,
-                ),
-                Validator(
-                    "annotations",
-                    default={},
-                    is_type_of=dict,
-                    condition=lambda x: all(
-                        key.lower() in map(str.lower, self.ANNOTATIONS.keys()) for key in x
-                    ),
-                    messages={
-                        "condition": f"Invalid annotation name. "
-                        f"Valid annotations are: {', '.join(self.ANNOTATIONS.keys())}",
-                    },
-                ),
-            ],
-        )
-
-        self.validate()
+        shared_files, role_files = self._find_config_files(root_path)
+        layer = self._get_layer(shared_files, root_path)
+        if role_files:
+            layer = self._get_role_layer(layer, role_files)
+        self.config = self._clone_layer(layer)
 
         # Override correct log level from argparse
         levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -219,14 +103,341 @@ class Config:
         if root_path:
             self.args["base_dir"] = root_path
 
+        # Settings that are not changed by arguments are already validated.
+        changed = [
+            key for key, value in self.args.items() if self.config.get(_dotted(key)) != value
+        ]
         self.config.update(self.args)
-        self.validate()
+        self.validate(only=changed)
 
         self._init_logger()
 
-    def validate(self) -> None:
+    def _find_config_files(self, root_path: str | None) -> tuple[list[str], list[str]]:
+        """
+        Split the existing config files into shared and role-local files.
+
+        Relative config files are looked up in the role directory first and then in its parent
+        directories and the parent directories of the working directory. Only files found in the
+        role directory are role-local, all other files are shared between roles.
+
+        :param root_path: role directory, defaults to the working directory
+        """
+        role_dir = os.path.abspath(root_path or os.getcwd())
+        local_dirs = [role_dir, os.path.join(role_dir, "config")]
+        search_dirs = list(dict.fromkeys(_walk_to_root(role_dir) + _walk_to_root(os.getcwd())))
+
+        shared_files: list[str] = []
+        role_files: list[str] = []
+        for name in self.config_files:
+            if os.path.isabs(name):
+                if os.path.isfile(name):
+                    shared_files.append(name)
+                continue
+
+            for directory in search_dirs:
+                path = os.path.join(directory, name)
+                if os.path.isfile(path):
+                    (role_files if directory in local_dirs else shared_files).append(path)
+                    break
+
+        return shared_files, role_files
+
+    def _get_layer(self, config_files: list[str], root_path: str | None) -> Any:
+        """
+        Get the validated settings of the shared config files.
+
+        Layers are cached for the whole run, so the user-level and repository-level config files
+        are only loaded and validated once and not again for every role.
+
+        :param config_files: absolute paths of the shared config files
+        :param root_path: role directory, the layer depends on the working directory without it
+        """
+        # The default of `base_dir` is the working directory, it is always overwritten for roles.
+        key = (tuple(config_files), self.config_merge, None if root_path else os.getcwd())
+        layer = self._layers.get(key)
+        if layer is None:
+            layer = Dynaconf(
+                envvar_prefix="ANSIBLE_DOCTOR",
+                merge_enabled=self.config_merge,
+                core_loaders=["YAML"],
+                settings_files=config_files,
+                validators=self._get_validators(),
+            )
+            try:
+                layer.validators.validate_all()
+            except ValidationError as e:
+                raise ansibledoctor.exception.ConfigError("Configuration error", e.message) from e
+
+            self._layers[key] = layer
+
+        return layer
+
+    def _get_role_layer(self, layer: Any, role_files: list[str]) -> Any:
+        """
+        Get the validated settings of the role-local config files on top of a shared layer.
+
+        Role layers are cached as well, so a role that is loaded again, e.g. to render it after
+        all roles were planned, doesn't read its config files and the environment again.
+
+        :param layer: shared layer, see `_get_layer`
+        :param role_files: absolute paths of the role-local config files
+        """
+        key = (id(layer), tuple(role_files))
+        role_layer = self._layers.get(key)
+        if role_layer is None:
+            role_layer = self._clone_layer(layer)
+            loaded = set(role_layer.loaded_by_loaders)
+            role_layer.load_file(path=role_files)
+            # Environment variables take precedence over all config files.
+            env_loader.load(role_layer, env=role_layer.current_env, silent=True)
+            self._validate_layer(
+                role_layer,
+                [
+                    name
+                    for source, data in role_layer.loaded_by_loaders.items()
+                    if source not in loaded
+                    for name in data
+                ],
+            )
+            self._layers[key] = role_layer
+
+        return role_layer
+
+    @staticmethod
+    def _clone_layer(layer: Any) -> Any:
+        # Validators keep the `empty` marker for missing defaults, it must not be copied.
+        return copy.deepcopy(layer, {id(empty): empty})
+
+    def _get_validators(self) -> list[Validator]:
+        tmpl_src = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
+        tmpl_provider = ["local", "git", "archive"]
+
+        return [
+            Validator(
+                "base_dir",
+                default=os.getcwd(),
+                apply_default_on_none=True,
+                is_type_of=str,
+            ),
+            Validator(
+                "dry_run",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "recursive",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "memory_report",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "workers",
+                default=1,
+                is_type_of=int,
+                gte=1,
+            ),
+            Validator(
+                "keep_going",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "error_report",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "catalog",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "search_index",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "archive",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "render_cache.dir",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "render_cache.max_size",
+                default=0,
+                is_type_of=int,
+                gte=0,
+            ),
+            Validator(
+                "exclude_files",
+                default=[],
+                is_type_of=list,
+            ),
+            Validator(
+                "exclude_tags",
+                default=[],
+                is_type_of=list,
+            ),
+            Validator(
+                "role.name",
+                is_type_of=str,
+            ),
+            Validator(
+                "role.autodetect",
+                default=True,
+                is_type_of=bool,
+            ),
+            Validator(
+                "logging.level",
+                default="WARNING",
+                is_in=[
+                    "DEBUG",
+                    "INFO",
+                    "WARNING",
+                    "ERROR",
+                    "CRITICAL",
+                    "debug",
+                    "info",
+                    "warning",
+                    "error",
+                    "critical",
+                ],
+            ),
+            Validator(
+                "logging.json",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "recursive",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "template.src",
+                default=f"local>{tmpl_src}",
+                is_type_of=str,
+                condition=lambda x: re.match(r"^(local|git|archive)\s*>\s*", x),
+                messages={
+                    "condition": f"Template provider must be one of {tmpl_provider}.",
+                },
+            ),
+            Validator(
+                "template.name",
+                default="readme",
+                is_type_of=str,
+            ),
+            Validator(
+                "template.options.tabulate_vars",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "template.options.sort_vars",
+                default=True,
+                is_type_of=bool,
+            ),
+            Validator(
+                "renderer.autotrim",
+                default=True,
+                is_type_of=bool,
+            ),
+            Validator(
+                "renderer.include_header",
+                default="",
+                is_type_of=str,
+            ),
+            Validator(
+                "renderer.dest",
+                default=os.path.relpath(os.getcwd()),
+                is_type_of=str,
+            ),
+            Validator(
+                "renderer.force_overwrite",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "renderer.sandbox",
+                default=False,
+                is_type_of=bool,
+            ),
+            Validator(
+                "renderer.timeout",
+                default=0,
+                is_type_of=(int, float),
+                gte=0,
+            ),
+            Validator(
+                "renderer.max_output_size",
+                default=0,
+                is_type_of=int,
+                gte=0,
+            ),
+            Validator(
+                "renderer.max_include_depth",
+                default=0,
+                is_type_of=int,
+                gte=0,
+                lte=MAX_INCLUDE_DEPTH,
+            ),
+            Validator(
+                "renderer.yaml_emitter",
+                default="ruamel",
+                is_in=YAML_EMITTERS,
+            ),
+            Validator(
+                "renderer.max_value_size",
+                default=0,
+                is_type_of=int,
+                gte=0,
+            ),
+            Validator(
+                "renderer.oversized_values",
+                default="preview",
+                is_in=["preview", "export"],
+            ),
+            Validator(
+                "annotations",
+                default={},
+                is_type_of=dict,
+                condition=lambda x: all(
+                    key.lower() in map(str.lower, self.ANNOTATIONS.keys()) for key in x
+                ),
+                messages={
+                    "condition": f"Invalid annotation name. "
+                    f"Valid annotations are: {', '.join(self.ANNOTATIONS.keys())}",
+                },
+            ),
+        ]
+
+    def validate(self, only: list[str] | None = None) -> None:
+        """
+        Validate the current settings.
+
+        :param only: only validate these settings and their children, e.g. `renderer`,
+            validates all settings if not set
+        """
+        self._validate_layer(self.config, only)
+
+    @staticmethod
+    def _validate_layer(layer: Any, only: list[str] | None = None) -> None:
+        if only is not None:
+            # Nested settings can be passed as `renderer.dest` or `renderer__dest`.
+            only = list({_dotted(key).split(".")[0].lower() for key in only})
+            if not only:
+                return
+
         try:
-            self.config.validators.validate_all()
+            layer.validators.validate_all(only=only)
         except ValidationError as e:
             raise ansibledoctor.exception.ConfigError("Configuration error", e.message) from e
 
@@ -292,6 +503,17 @@ class Config:
         return output_path.rstrip(os.sep), None
 
     def _init_logger(self) -> None:
+        # Only reconfigure structlog if the logging settings of a role differ.
+        options = (
+            bool(self.config.logging.json),
+            str(self.config.get("logging.level")),
+            bool(self.config.get("archive") == "-"),
+        )
+        # Keep stdout free for the output archive.
+        stream = sys.stderr if options[2] else sys.stdout
+        if options == self._logger_options:
+            return
+
         styles = structlog.dev.ConsoleRenderer.get_default_level_styles()
         styles["debug"] = colorama.Fore.BLUE
 
@@ -303,15 +525,19 @@ class Config:
             structlog.processors.TimeStamper(fmt="%Y-%m-%d %H:%M:%S", utc=False),
         ]
 
+        logger_factory: Any
         if self.config.logging.json:
             processors.append(ErrorStringifier())
             processors.append(structlog.processors.JSONRenderer())
+            logger_factory = functools.partial(BufferedLogger, file=stream)
         else:
             processors.append(MultilineConsoleRenderer(level_styles=styles))
+            logger_factory = structlog.PrintLoggerFactory(file=stream)
 
         try:
             structlog.configure(
                 processors=processors,
+                logger_factory=logger_factory,
                 wrapper_class=structlog.make_filtering_bound_logger(
                     logging.getLevelName(self.config.get("logging.level")),
                 ),
@@ -320,6 +546,24 @@ class Config:
         except KeyError as e:
             raise ansibledoctor.exception.ConfigError(f"Can not set log level: {e!s}") from e
 
+        self._logger_options = options
+
+
+def _dotted(key: str) -> str:
+    """Convert a nested setting name like `renderer__dest` to `renderer.dest`."""
+    return key.replace("__", ".")
+
+
+def _walk_to_root(path: str) -> list[str]:
+    """Get a directory, its `config` subdirectory and the same for all parent directories."""
+    directories: list[str] = []
+    while True:
+        directories.extend([path, os.path.join(path, "config")])
+        parent = os.path.dirname(path)
+        if parent == path:
+            return directories
+        path = parent
+
 
 class ErrorStringifier:
     """A processor that converts exceptions to a string representation."""
@@ -336,6 +580,33 @@ class ErrorStringifier:
         return event_dict
 
 
+class BufferedLogger:
+    """
+    Write rendered log events to stdout or the given file without flushing after every event.
+
+    Used as sink for json logging, where output is usually piped to another process. Events
+    are written when the output buffer is full, on `error` and `critical` events and on exit,
+    instead of a write and flush per event.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, *_: Any, file: TextIO = sys.stdout) -> None:
+        self._file = file
+
+    def msg(self, message: str) -> None:
+        with self._lock:
+            self._file.write(message + "\n")
+
+    def failure(self, message: str) -> None:
+        with self._lock:
+            self._file.write(message + "\n")
+            self._file.flush()
+
+    log = debug = info = warn = warning = msg
+    error = critical = exception = fatal = failure
+
+
 class MultilineConsoleRenderer(structlog.dev.ConsoleRenderer):
     """A processor for printing multiline strings."""
 
@@ -5,3 +5,17 @@ DOCTOR_CONF_FILE = "doctor.conf.yaml"
 YAML_EXTENSIONS = ["yaml", "yml"]
 VARS_FILE_KEY = "vars"
 DEFAULTS_FILE_KEY = "defaults"
+META_FILE_KEY = "meta"
+ARGUMENT_SPECS_FILE_KEY = "argument_specs"
+TASKS_FILE_KEY = "tasks"
+HANDLERS_FILE_KEY = "handlers"
+OTHER_FILE_KEY = "other"
+FILE_TYPES = [
+    DEFAULTS_FILE_KEY,
+    VARS_FILE_KEY,
+    META_FILE_KEY,
+    ARGUMENT_SPECS_FILE_KEY,
+    TASKS_FILE_KEY,
+    HANDLERS_FILE_KEY,
+    OTHER_FILE_KEY,
+]
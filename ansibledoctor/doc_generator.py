@@ -1,21 +1,41 @@
 #!/usr/bin/env python3
 """Prepare output and write compiled jinja2 templates."""
 
+import functools
+import hashlib
 import json
 import os
 import re
-from collections.abc import Callable
-from typing import Any
+import threading
+from collections.abc import Callable, Mapping
+from contextvars import ContextVar
+from typing import Any, ClassVar
 
 import jinja2.exceptions
-import ruamel.yaml
 import structlog
 from jinja2 import BaseLoader, Environment, TemplateNotFound, pass_eval_context
 
 from ansibledoctor.config import SingleConfig
 from ansibledoctor.doc_parser import Parser
+from ansibledoctor.exception import RenderLimitError, RoleError
+from ansibledoctor.output_archive import OutputArchive
+from ansibledoctor.render_limits import (
+    LimitedEnvironment,
+    LimitedSandboxedEnvironment,
+    RenderLimits,
+)
+from ansibledoctor.role_graph import RoleNode
 from ansibledoctor.template import Template
-from ansibledoctor.utils import FileUtils, sys_exit_with_message
+from ansibledoctor.template_views import TemplateViews
+from ansibledoctor.utils import format_size, parallel_map
+from ansibledoctor.utils.value_size import estimate_size, truncate_value
+from ansibledoctor.utils.yaml_emitter import YamlEmitter
+
+# Directory for oversized values, relative to the output file.
+EXPORT_DIR = "values"
+
+# Output directory of the template file that is currently rendered, set per thread.
+_output_dir: ContextVar[str] = ContextVar("output_dir", default="")
 
 
 class SafeFileSystemLoader(BaseLoader):
@@ -55,31 +75,61 @@ class SafeFileSystemLoader(BaseLoader):
 class Generator:
     """Generate documentation from jinja2 templates."""
 
-    def __init__(self, doc_parser: Parser) -> None:
+    # Emitters are shared between generators to reuse memoised output across roles.
+    _yaml_emitters: ClassVar[dict[str, YamlEmitter]] = {}
+
+    def __init__(
+        self,
+        doc_parser: Parser,
+        template: Template | None = None,
+        role_node: RoleNode | None = None,
+        archive: OutputArchive | None = None,
+        record: bool = False,
+    ) -> None:
+        """
+        Create a generator for a parsed role.
+
+        :param doc_parser: parsed role
+        :param template: template to render, the configured template is loaded if not set,
+            a given template is not cleaned up after rendering
+        :param role_node: role in the dependency graph of the run, used for dependency views
+        :param archive: add the rendered files to this archive instead of writing them
+        :param record: keep the content of all written files in `written`, e.g. to cache them
+        """
         self.log = structlog.get_logger()
         self.config = SingleConfig()
-        self.template = Template(
+        self._owns_template = template is None
+        self.template = template or Template(
             self.config.config.get("template.name"),
             self.config.config.get("template.src"),
         )
         self._parser = doc_parser
+        self._role_node = role_node
+        self._archive = archive
+        self.written: dict[str, bytes] | None = {} if record else None
+
+        backend = self.config.config.get("renderer.yaml_emitter")
+        if backend not in self._yaml_emitters:
+            self._yaml_emitters[backend] = YamlEmitter(backend)
+        self._yaml = self._yaml_emitters[backend]
+        # Exported values by output directory and id, the value is kept with the path, so its id
+        # is not reused by another value while it is cached.
+        self._exported: dict[tuple[str, int], tuple[Any, str]] = {}
+        self._export_lock = threading.Lock()
 
     def _create_dir(self, directory: str) -> None:
+        # The output archive doesn't need the destination tree.
+        if self._archive is not None:
+            return
+
         if not self.config.config["dry_run"] and not os.path.isdir(directory):
             try:
                 os.makedirs(directory, exist_ok=True)
                 self.log.info(f"Creating dir: {directory}")
             except FileExistsError as e:
-                sys_exit_with_message(e)
+                raise RoleError(e) from e
 
     def _write_doc(self) -> None:
-        files_to_overwrite = []
-
-        for tf in self.template.files:
-            doc_file = self.config.get_output_path(tf)
-            if os.path.isfile(doc_file):
-                files_to_overwrite.append(doc_file)
-
         header_file = self.config.config.get("renderer.include_header")
         role_data = self._parser.get_data()
         header_content = ""
@@ -89,91 +139,174 @@ class Generator:
                 with open(header_file) as a:
                     header_content = a.read()
             except FileNotFoundError as e:
-                sys_exit_with_message("Can not open custom header file", path=header_file, error=e)
-
-        if (
-            len(files_to_overwrite) > 0
-            and self.config.config.get("renderer.force_overwrite") is False
-            and not self.config.config["dry_run"]
-        ):
-            files_to_overwrite_string = "\n".join(files_to_overwrite)
-            prompt = f"These files will be overwritten:\n{files_to_overwrite_string}".replace(
-                "\n", "\n... "
-            )
+                raise RoleError(
+                    "Can not open custom header file", path=header_file, error=e
+                ) from e
+
+        template_options = self.config.config.get("template.options")
+        views = TemplateViews(role_data, template_options, self._role_node)
+
+        render = functools.partial(
+            self._render_file,
+            role_data=role_data,
+            header_content=header_content,
+            template_options=template_options,
+            views=views,
+        )
+        parallel_map(render, self.template.files, self.config.config["workers"])
 
-            try:
-                if not FileUtils.query_yes_no(f"{prompt}\nDo you want to continue?"):
-                    sys_exit_with_message("Aborted...")
-            except KeyboardInterrupt:
-                sys_exit_with_message("Aborted...")
-
-        for tf in self.template.files:
-            doc_file = self.config.get_output_path(tf)
-            template = os.path.join(self.template.path, tf)
-
-            self.log.debug("Writing renderer output", path=doc_file, src=os.path.dirname(template))
-
-            # make sure the directory exists
-            self._create_dir(os.path.dirname(doc_file))
-
-            if os.path.exists(template) and os.path.isfile(template):
-                with open(template) as tmpl:
-                    data = tmpl.read()
-                    if data is not None:
-                        try:
-                            # Validate base_dir is a safe, absolute path
-                            base_dir = os.path.abspath(self.config.args["base_dir"])
-                            if not os.path.isdir(base_dir):
-                                sys_exit_with_message(
-                                    "Invalid base_dir: directory does not exist", path=base_dir
-                                )
-
-                            jinja_env = Environment(  # nosec
-                                loader=SafeFileSystemLoader(
-                                    [
-                                        os.path.join(base_dir, ".ansibledoctor"),
-                                        base_dir,
-                                        self.template.path,
-                                    ]
-                                ),
-                                lstrip_blocks=True,
-                                trim_blocks=True,
-                                autoescape=jinja2.select_autoescape(),
-                            )
-                            jinja_env.filters["to_nice_yaml"] = self._to_nice_yaml
-                            jinja_env.filters["to_code"] = self._to_code
-                            jinja_env.filters["deep_get"] = self._deep_get
-                            jinja_env.filters["safe_join"] = self._safe_join
-                            # keep the old name of the function to not break custom templates.
-                            jinja_env.filters["save_join"] = self._safe_join
-                            jinja_env.filters["filter_dict"] = self._filter_dict
-                            template_options = self.config.config.get("template.options")
-                            data = jinja_env.from_string(data).render(
-                                role_data, role=role_data, options=template_options
-                            )
-                            if not self.config.config["dry_run"]:
-                                with open(doc_file, "wb") as outfile:
-                                    outfile.write(header_content.encode("utf-8"))
-                                    outfile.write(data.encode("utf-8"))
-                        except (
-                            jinja2.exceptions.UndefinedError,
-                            jinja2.exceptions.TemplateSyntaxError,
-                            jinja2.exceptions.TemplateRuntimeError,
-                        ) as e:
-                            sys_exit_with_message(
-                                "Jinja2 template error while loading file", path=tf, error=e
+    def _render_file(
+        self,
+        tf: str,
+        role_data: dict[str, Any],
+        header_content: str,
+        template_options: dict[str, Any],
+        views: TemplateViews,
+    ) -> None:
+        """Render a single template file, may run on multiple threads for different files."""
+        limits = RenderLimits(
+            timeout=self.config.config.get("renderer.timeout"),
+            max_output_size=self.config.config.get("renderer.max_output_size"),
+            max_include_depth=self.config.config.get("renderer.max_include_depth"),
+        )
+
+        doc_file = self.config.get_output_path(tf)
+        template = os.path.join(self.template.path, tf)
+
+        self.log.debug("Writing renderer output", path=doc_file, src=os.path.dirname(template))
+
+        # make sure the directory exists
+        _output_dir.set(os.path.dirname(doc_file))
+        self._create_dir(_output_dir.get())
+
+        if os.path.exists(template) and os.path.isfile(template):
+            with open(template) as tmpl:
+                data = tmpl.read()
+                if data is not None:
+                    try:
+                        # Validate base_dir is a safe, absolute path
+                        base_dir = os.path.abspath(self.config.args["base_dir"])
+                        if not os.path.isdir(base_dir):
+                            raise RoleError(
+                                "Invalid base_dir: directory does not exist", path=base_dir
                             )
-                        except UnicodeEncodeError as e:
-                            sys_exit_with_message("Failed to print special characters", error=e)
+
+                        env_class = (
+                            LimitedSandboxedEnvironment
+                            if self.config.config.get("renderer.sandbox")
+                            else LimitedEnvironment
+                        )
+                        jinja_env = env_class(  # nosec
+                            loader=SafeFileSystemLoader(
+                                [
+                                    os.path.join(base_dir, ".ansibledoctor"),
+                                    base_dir,
+                                    self.template.path,
+                                ]
+                            ),
+                            lstrip_blocks=True,
+                            trim_blocks=True,
+                            autoescape=jinja2.select_autoescape(),
+                        )
+                        jinja_env.filters["to_nice_yaml"] = self._to_nice_yaml
+                        jinja_env.filters["to_code"] = self._to_code
+                        jinja_env.filters["deep_get"] = self._deep_get
+                        jinja_env.filters["safe_join"] = self._safe_join
+                        # keep the old name of the function to not break custom templates.
+                        jinja_env.filters["save_join"] = self._safe_join
+                        jinja_env.filters["filter_dict"] = self._filter_dict
+                        jinja_env.render_limits = limits
+                        data = limits.render(
+                            jinja_env.from_string(data),
+                            role_data,
+                            role=role_data,
+                            options=template_options,
+                            views=views,
+                        )
+                        content = header_content.encode("utf-8") + data.encode("utf-8")
+                        self._write_file(doc_file, content)
+                    except RenderLimitError as e:
+                        raise RoleError(
+                            "Template render limit exceeded",
+                            path=tf,
+                            elapsed=f"{e.elapsed:.2f}s",
+                            error=e,
+                        ) from e
+                    except (
+                        jinja2.exceptions.UndefinedError,
+                        jinja2.exceptions.TemplateSyntaxError,
+                        jinja2.exceptions.TemplateRuntimeError,
+                    ) as e:
+                        raise RoleError(
+                            "Jinja2 template error while loading file", path=tf, error=e
+                        ) from e
+                    except UnicodeEncodeError as e:
+                        raise RoleError("Failed to print special characters", error=e) from e
+                    except RoleError:
+                        raise
+                    except Exception as e:
+                        # E.g. `{{ 1 // 0 }}` or a filter called with wrong arguments.
+                        raise RoleError(
+                            "Unexpected error while rendering template",
+                            path=tf,
+                            error=f"{type(e).__name__}: {e}",
+                        ) from e
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        """Write an output file or add it to the output archive, nothing is written in dry runs."""
+        if self.config.config["dry_run"]:
+            return
+
+        if self.written is not None:
+            self.written[path] = content
+
+        if self._archive is not None:
+            self._archive.add(path, content)
+            return
+
+        with open(path, "wb") as outfile:
+            outfile.write(content)
 
     def _to_nice_yaml(self, a: str, indent: int = 4, **kw: Any) -> str:
         """Make verbose, human readable yaml."""
-        yaml = ruamel.yaml.YAML()
-        yaml.indent(mapping=indent, sequence=(indent * 2), offset=indent)
-        yaml.width = 4096
-        stream = ruamel.yaml.compat.StringIO()
-        yaml.dump(a, stream, **kw)
-        return stream.getvalue().rstrip()
+        limit = self.config.config.get("renderer.max_value_size")
+        if not limit or estimate_size(a, limit) <= limit:
+            return self._yaml.dump(a, indent, **kw)
+
+        # The size is only estimated up to the limit, huge values are not walked completely.
+        size = format_size(limit)
+        if self.config.config.get("renderer.oversized_values") == "export":
+            path = self._export_value(a)
+            return f"# Value too large to display (more than {size}), see {path}"
+
+        preview = self._yaml.dump(truncate_value(a, limit), indent)
+        return f"{preview}\n# Value truncated (more than {size} in total)"
+
+    def _export_value(self, a: Any) -> str:
+        """Write an oversized value to a yaml file next to the output file and return its path."""
+        output_dir = _output_dir.get()
+        cache_key = (output_dir, id(a))
+        with self._export_lock:
+            if cache_key in self._exported:
+                return self._exported[cache_key][1]
+            return self._export_value_file(a, output_dir, cache_key)
+
+    def _export_value_file(self, a: Any, output_dir: str, cache_key: tuple[str, int]) -> str:
+        content = self._yaml.dump(a, 2)
+        if isinstance(a, Mapping) and len(a) == 1 and re.match(r"^[\w.-]+$", str(next(iter(a)))):
+            name = str(next(iter(a)))
+        else:
+            name = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+        path = os.path.join(EXPORT_DIR, f"{name}.yml")
+        export_file = os.path.join(output_dir, path)
+        self._create_dir(os.path.dirname(export_file))
+        if not self.config.config["dry_run"]:
+            self.log.info("Exporting oversized value", path=export_file)
+            self._write_file(export_file, (content + "\n").encode("utf-8"))
+
+        self._exported[cache_key] = (a, path)
+        return path
 
     def _to_code(
         self,
@@ -184,6 +317,30 @@ class Generator:
         lang: str = "plain",
     ) -> str:
         """Wrap a string in backticks."""
+        limit = self.config.config.get("renderer.max_value_size")
+        if not limit or estimate_size(a, limit) <= limit:
+            return self._format_code(a, to_multiline, tab_var, preserve_ms, lang)
+
+        size = format_size(limit)
+        if self.config.config.get("renderer.oversized_values") == "export":
+            return f"Value too large to display (more than {size}), see {self._export_value(a)}"
+
+        note = f"(truncated, more than {size} in total)"
+        preview = self._format_code(
+            truncate_value(a, limit), to_multiline, tab_var, preserve_ms, lang
+        )
+        if isinstance(preview, list):
+            return [*preview, note]
+        return f"{preview} {note}"
+
+    def _format_code(
+        self,
+        a: str,
+        to_multiline: bool,
+        tab_var: bool,
+        preserve_ms: bool,
+        lang: str,
+    ) -> str:
         if a is None or a == "":
             return ""
 
@@ -242,4 +399,9 @@ class Generator:
         return jinja2.filters.do_mark_safe(normalized)
 
     def render(self) -> None:
-        self._write_doc()
+        """Render all template files, existing output files are overwritten without asking."""
+        try:
+            self._write_doc()
+        finally:
+            if self._owns_template:
+                self.template.cleanup()
@@ -1,192 +1,304 @@
 #!/usr/bin/env python3
 """Parse static files."""
 
-import fnmatch
-from collections import defaultdict
+import copy
+import time
+from collections.abc import Iterable
 from typing import Any
 
-import anyconfig
 import structlog
 
 from ansibledoctor.annotation import Annotation
+from ansibledoctor.annotation_lexer import AnnotationLexer
+from ansibledoctor.annotation_merge import AnnotationMerger
 from ansibledoctor.config import SingleConfig
-from ansibledoctor.constants import DEFAULTS_FILE_KEY, VARS_FILE_KEY, YAML_EXTENSIONS
-from ansibledoctor.exception import YAMLError
+from ansibledoctor.constants import (
+    ARGUMENT_SPECS_FILE_KEY,
+    DEFAULTS_FILE_KEY,
+    META_FILE_KEY,
+    VARS_FILE_KEY,
+)
+from ansibledoctor.exception import AnnotationError, RoleError, YAMLError
 from ansibledoctor.file_registry import Registry
-from ansibledoctor.utils import flatten, sys_exit_with_message
-from ansibledoctor.utils.file_utils import classify_var_file
-from ansibledoctor.utils.yaml_helper import parse_yaml, parse_yaml_ansible
+from ansibledoctor.model import Meta, RoleData, Tag, Variable
+from ansibledoctor.task_graph import TaskGraph
+from ansibledoctor.utils import parallel_map
+from ansibledoctor.utils.yaml_helper import (
+    compact_yaml,
+    parse_yaml,
+    parse_yaml_lines,
+)
 
 
 class Parser:
     """Parse yaml files."""
 
-    def __init__(self) -> None:
-        self._annotation_objs: dict[str, Any] = {}
-        self._data: defaultdict[Any, dict[Any, Any]] = defaultdict(dict)
+    def __init__(
+        self,
+        files_registry: Registry | None = None,
+        meta: dict[str, Meta] | None = None,
+        sections: Iterable[str] | None = None,
+    ) -> None:
+        """
+        Parse a role.
+
+        :param files_registry: files of the role, the files are discovered if not set
+        :param meta: entries of the meta files if they are already read, see `read_meta_files`
+        :param sections: only parse these sections of the role data, e.g. the sections a
+            template uses (see `ansibledoctor.template_usage.TemplateUsage`), other sections
+            stay empty; all sections are parsed if not set
+        """
+        start = time.monotonic()
+        self._data = RoleData()
         self.config = SingleConfig()
         self.log = structlog.get_logger()
-        self._files_registry = Registry()
-        self._parse_meta_file()
-        self._parse_var_files()
-        self._parse_argument_specs()
-        self._parse_task_tags()
+        self._files_registry = files_registry or Registry()
+        self._workers = self.config.config["workers"]
+        self._sections = frozenset(RoleData.SECTIONS if sections is None else sections)
+        self._annotation_counts: dict[str, int] = {}
+        self._parse_meta_file(meta)
+        if "var" in self._sections:
+            self._parse_var_files()
+            self._resolve_var_references()
+        if self._sections & {"meta", "var"}:
+            self._parse_argument_specs()
+        if "tag" in self._sections:
+            self._parse_task_tags()
         self._populate_doc_data()
 
+        # Single summary instead of an event per file or annotation.
+        skipped = [section for section in RoleData.SECTIONS if section not in self._sections]
+        self.log.info(
+            "Role parsed",
+            files=len(self._files_registry.get_files()),
+            **{section: len(self._data[section]) for section in self._data.SECTIONS},
+            annotations=self._annotation_counts,
+            elapsed=f"{time.monotonic() - start:.2f}s",
+            **({"skipped": skipped} if skipped else {}),
+        )
+
     def _parse_var_files(self) -> None:
-        for rfile in self._files_registry.get_files():
-            file_type = classify_var_file(rfile)
-            if file_type == VARS_FILE_KEY:
-                self._parse_single_var_file(rfile, file_type)
+        files = [
+            (rfile, file_type)
+            for file_type in (VARS_FILE_KEY, DEFAULTS_FILE_KEY)
+            for rfile in self._files_registry.get_files(file_type)
+        ]
+        results = parallel_map(self._read_var_file, [f[0] for f in files], self._workers)
+
+        for (rfile, file_type), variables in zip(files, results, strict=True):
+            for key, value, line in variables:
+                # vars/ takes precedence over defaults/ in Ansible, so skip defaults
+                # if a var with the same name has already been defined
+                if file_type == DEFAULTS_FILE_KEY and key in self._data["var"]:
+                    continue
+
+                self._data["var"][key] = Variable(
+                    file=rfile, line=line, value={key: value}, source=file_type
+                )
 
-        for rfile in self._files_registry.get_files():
-            file_type = classify_var_file(rfile)
-            if file_type == DEFAULTS_FILE_KEY:
-                self._parse_single_var_file(rfile, file_type)
+    def _read_var_file(self, rfile: str) -> list[tuple[Any, Any, int | None]]:
+        """Read a vars file and return each top-level key with its value and line number."""
+        return self._files_registry.cached("vars", rfile, lambda: self._load_var_file(rfile))
 
-    def _parse_single_var_file(self, rfile: str, file_type: str) -> None:
+    def _load_var_file(self, rfile: str) -> list[tuple[Any, Any, int | None]]:
         with open(rfile, encoding="utf8") as yaml_file:
             try:
-                raw = parse_yaml(yaml_file)
+                data, lines = parse_yaml_lines(yaml_file)
             except YAMLError as e:
-                sys_exit_with_message("Failed to read yaml file", path=rfile, error=e)
+                raise RoleError("Failed to read yaml file", path=rfile, error=e) from e
 
-            data: defaultdict[Any, dict[Any, Any]] = defaultdict(dict, raw or {})
+        return [(key, compact_yaml(value), lines.get(key)) for key, value in data.items()]
 
-            for key, value in data.items():
-                # vars/ takes precedence over defaults/ in Ansible, so skip defaults
-                # if a var with the same name has already been defined
-                if file_type == DEFAULTS_FILE_KEY and key in self._data["var"]:
-                    continue
+    def _resolve_var_references(self) -> None:
+        """
+        Resolve variables whose value is a reference to another variable, e.g. `{{ other }}`.
+
+        All references are collected into a dependency graph first and every chain is followed
+        only once, so the result does not depend on the order of definition. References to
+        unknown variables are resolved as far as possible, circular references are kept as is.
+        """
+        variables = self._data["var"]
+        references: dict[str, str] = {}
+        for key, item in variables.items():
+            name = _var_reference(item["value"][key])
+            if name is not None:
+                references[key] = name
+
+        resolved: dict[str, Any] = {}
+        unresolved: set[str] = set()
+        for start in references:
+            path: list[str] = []
+            on_path: set[str] = set()
+            key = start
+            while key in references and key not in resolved and key not in unresolved:
+                if key in on_path:
+                    cycle = [*path[path.index(key) :], key]
+                    self.log.warning("Circular variable reference", path=" -> ".join(cycle))
+                    break
+                path.append(key)
+                on_path.add(key)
+                key = references[key]
+
+            if key in on_path or key in unresolved:
+                unresolved.update(path)
+                continue
+
+            if key in resolved:
+                value = resolved[key]
+            elif key in variables:
+                value = variables[key]["value"][key]
+            else:
+                # Unknown variable, keep the last reference of the chain.
+                value = variables[path[-1]]["value"][path[-1]]
+
+            for name in path:
+                resolved[name] = value
+
+        for key, value in resolved.items():
+            variables[key]["value"] = {key: value}
+
+    def _parse_meta_file(self, meta: dict[str, Meta] | None = None) -> None:
+        self._data["meta"]["name"] = Meta(value=self.config.config["role_name"])
+        if "meta" not in self._sections:
+            return
 
-                self._data["var"][key] = {"value": {key: value}, "source": file_type}
-
-                # Check if the value is a variable reference pattern
-                if isinstance(value, str) and value.startswith("{{ ") and value.endswith(" }}"):
-                    # Extract the variable name from the reference
-                    var_name = value[3:-2].strip()
-                    # Resolve the variable reference if it exists in vars data
-                    resolved = (
-                        self._data["var"]
-                        .get(var_name, {"value": {var_name: value}})
-                        .get("value", {})
-                        .get(var_name)
-                    )
-                    self._data["var"][key]["value"] = {key: resolved}
-
-    def _parse_meta_file(self) -> None:
-        self._data["meta"]["name"] = {"value": self.config.config["role_name"]}
-
-        for rfile in self._files_registry.get_files():
-            if any("meta/main." + ext in rfile for ext in YAML_EXTENSIONS):
-                with open(rfile, encoding="utf8") as yaml_file:
-                    try:
-                        raw = parse_yaml(yaml_file)
-                    except YAMLError as e:
-                        sys_exit_with_message("Failed to read yaml file", path=rfile, error=e)
-
-                    data: defaultdict[Any, Any] = defaultdict(dict, raw)
-                    galaxy_info = data.get("galaxy_info")
-                    if galaxy_info:
-                        for key, value in galaxy_info.items():
-                            self._data["meta"][key] = {"value": value}
-
-                    if data.get("dependencies") is not None:
-                        self._data["meta"]["dependencies"] = {"value": data.get("dependencies")}
+        if meta is None:
+            meta = read_meta_files(self._files_registry.get_files(META_FILE_KEY))
+        else:
+            # Entries read during planning are shared with the role graph, annotations are
+            # merged into the entries of the role data.
+            meta = copy.deepcopy(meta)
+        self._data["meta"].update(meta)
 
     def _parse_argument_specs(self) -> None:
         """Parse meta/argument_specs.yaml to discover role arguments."""
-        for rfile in self._files_registry.get_files():
-            if any("meta/argument_specs." + ext in rfile for ext in YAML_EXTENSIONS):
-                with open(rfile, encoding="utf8") as yaml_file:
-                    try:
-                        raw = parse_yaml(yaml_file)
-                    except YAMLError as e:
-                        sys_exit_with_message("Failed to read yaml file", path=rfile, error=e)
-
-                    if raw.get("argument_specs") and (
-                        first_entry := next(iter(raw["argument_specs"]), None)
-                    ):
-                        description_attributes = {
-                            "short_description": "short_description",
+        for rfile in self._files_registry.get_files(ARGUMENT_SPECS_FILE_KEY):
+            with open(rfile, encoding="utf8") as yaml_file:
+                try:
+                    raw = parse_yaml(yaml_file)
+                except YAMLError as e:
+                    raise RoleError("Failed to read yaml file", path=rfile, error=e) from e
+
+                if (
+                    "meta" in self._sections
+                    and raw.get("argument_specs")
+                    and (first_entry := next(iter(raw["argument_specs"]), None))
+                ):
+                    description_attributes = {
+                        "short_description": "short_description",
+                        "description": "description",
+                    }
+
+                    first_entry_specs = raw["argument_specs"][first_entry]
+                    for attr_key, attr_name in description_attributes.items():
+                        if attr_key in first_entry_specs:
+                            self._data["meta"][attr_name] = Meta(
+                                file=rfile, value=compact_yaml(first_entry_specs[attr_key])
+                            )
+
+                # Process argument specs for the first entry point
+                if (
+                    "var" in self._sections
+                    and raw.get("argument_specs")
+                    and (first_entry := next(iter(raw["argument_specs"]), None))
+                    and "options" in raw["argument_specs"][first_entry]
+                ):
+                    for arg_name, arg_spec in raw["argument_specs"][first_entry][
+                        "options"
+                    ].items():
+                        role_attributes = {
                             "description": "description",
+                            "type": "type",
+                            "required": "required",
                         }
 
-                        first_entry_specs = raw["argument_specs"][first_entry]
-                        for attr_key, attr_name in description_attributes.items():
-                            if attr_key in first_entry_specs:
-                                self._data["meta"][attr_name] = {
-                                    "value": first_entry_specs[attr_key]
-                                }
-
-                    # Process argument specs for the first entry point
-                    if (
-                        raw.get("argument_specs")
-                        and (first_entry := next(iter(raw["argument_specs"]), None))
-                        and "options" in raw["argument_specs"][first_entry]
-                    ):
-                        for arg_name, arg_spec in raw["argument_specs"][first_entry][
-                            "options"
-                        ].items():
-                            role_attributes = {
-                                "description": "description",
-                                "type": "type",
-                                "required": "required",
-                            }
-
-                            # If the variable already exists in defaults, update its metadata
-                            if arg_name not in self._data["var"]:
-                                # Add new variable from argument specs
-                                default_value = (
-                                    "_unset_"
-                                    if arg_spec.get("required", False)
-                                    else arg_spec.get("default", "_unset_")
-                                )
-                                self._data["var"][arg_name] = {
-                                    "value": {arg_name: default_value},
-                                    "source": DEFAULTS_FILE_KEY,
-                                }
+                        # If the variable already exists in defaults, update its metadata
+                        if arg_name not in self._data["var"]:
+                            # Add new variable from argument specs
+                            default_value = (
+                                "_unset_"
+                                if arg_spec.get("required", False)
+                                else arg_spec.get("default", "_unset_")
+                            )
+                            self._data["var"][arg_name] = Variable(
+                                file=rfile,
+                                value={arg_name: compact_yaml(default_value)},
+                                source=DEFAULTS_FILE_KEY,
+                            )
 
-                            for attr_key, attr_name in role_attributes.items():
-                                if attr_key in arg_spec:
-                                    self._data["var"][arg_name][attr_name] = arg_spec[attr_key]
+                        for attr_key, attr_name in role_attributes.items():
+                            if attr_key in arg_spec:
+                                self._data["var"][arg_name][attr_name] = compact_yaml(
+                                    arg_spec[attr_key]
+                                )
 
     def _parse_task_tags(self) -> None:
-        for rfile in self._files_registry.get_files():
-            if any(fnmatch.fnmatch(rfile, "*/tasks/*." + ext) for ext in YAML_EXTENSIONS):
-                with open(rfile, encoding="utf8") as yaml_file:
-                    try:
-                        raw = parse_yaml_ansible(yaml_file)
-                    except YAMLError as e:
-                        sys_exit_with_message("Failed to read yaml file", path=rfile, error=e)
-
-                    tags = []
-                    for task in raw:
-                        task_tags = task.get("tags", [])
-                        if isinstance(task_tags, str):
-                            task_tags = [task_tags]
-
-                        for tag in task_tags:
-                            if tag not in self.config.config["exclude_tags"]:
-                                tags.append(tag)
-
-                    for tag in flatten(tags):
-                        self._data["tag"][tag] = {"value": tag}
+        """Collect the tags of all task and handler files reachable from the main files."""
+        exclude_tags = self.config.config["exclude_tags"]
+        for task_file in TaskGraph(self._files_registry, self._workers).files():
+            for tag in task_file.tags:
+                if tag not in exclude_tags:
+                    self._data["tag"][tag] = Tag(file=task_file.path, value=tag)
 
     def _populate_doc_data(self) -> None:
         """Generate the documentation data object."""
-        tags: defaultdict[Any, dict[Any, Any]] = defaultdict(dict)
+        # All annotations are found in a single pass over the role files.
+        lexer = AnnotationLexer(self._files_registry, self._workers)
+        annotation_objs: dict[str, Annotation] = {}
         for annotation in self.config.get_annotations_names(automatic=True):
-            self.log.info(f"Lookup annotation @{annotation}")
-            self._annotation_objs[annotation] = Annotation(
-                name=annotation, files_registry=self._files_registry
+            if annotation not in self._sections:
+                continue
+            self.log.debug(f"Lookup annotation @{annotation}")
+            annotation_objs[annotation] = Annotation(
+                name=annotation, files_registry=self._files_registry, lexer=lexer
             )
-            tags[annotation] = self._annotation_objs[annotation].get_details()
+            self._annotation_counts[annotation] = len(annotation_objs[annotation].get_items())
 
-        try:
-            anyconfig.merge(self._data, tags, ac_merge=anyconfig.MS_DICTS)
-        except ValueError as e:
-            sys_exit_with_message("Failed to merge annotation values", error=e)
+        # Annotation items are only kept until they are merged into the role data.
+        merger = AnnotationMerger()
+        for annotation, obj in annotation_objs.items():
+            try:
+                merger.merge(self._data, annotation, obj.get_definition(), obj.get_items())
+            except AnnotationError as e:
+                raise RoleError("Failed to merge annotation values", error=e) from e
+
+    def get_data(self) -> dict[str, Any]:
+        """Get the role data as plain dicts and lists, ready to be passed to templates."""
+        return self._data.as_dict()
 
-    def get_data(self) -> defaultdict[Any, dict[Any, Any]]:
+    def get_role_data(self) -> RoleData:
+        """Get the role data as entries, including the source file and line of each entry."""
         return self._data
+
+
+def read_meta_files(files: list[str]) -> dict[str, Meta]:
+    """
+    Read the galaxy info and dependencies of the meta files of a role.
+
+    :param files: meta files, later files take precedence
+    :return: meta entries by name, e.g. `description` or `dependencies`
+    """
+    meta: dict[str, Meta] = {}
+    for rfile in files:
+        with open(rfile, encoding="utf8") as yaml_file:
+            try:
+                raw = parse_yaml(yaml_file)
+            except YAMLError as e:
+                raise RoleError("Failed to read yaml file", path=rfile, error=e) from e
+
+        galaxy_info = raw.get("galaxy_info")
+        if galaxy_info:
+            for key, value in galaxy_info.items():
+                meta[key] = Meta(file=rfile, value=compact_yaml(value))
+
+        if raw.get("dependencies") is not None:
+            meta["dependencies"] = Meta(file=rfile, value=compact_yaml(raw.get("dependencies")))
+
+    return meta
+
+
+def _var_reference(value: Any) -> str | None:
+    """Get the variable name if the value is a plain reference like `{{ name }}`."""
+    if isinstance(value, str) and value.startswith("{{ ") and value.endswith(" }}"):
+        return value[3:-2].strip()
+    return None
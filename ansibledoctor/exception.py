@@ -26,3 +26,46 @@ class ConfigError(DoctorError):
 
 class TemplateError(DoctorError):
     """Errors related to template file handling."""
+
+    pass
+
+
+class CatalogError(DoctorError):
+    """Errors while reading or writing the role catalog."""
+
+    pass
+
+
+class OutputArchiveError(DoctorError):
+    """Errors while writing the output archive."""
+
+    pass
+
+
+class SearchIndexError(DoctorError):
+    """Errors while reading or writing the search index."""
+
+    pass
+
+
+class AnnotationError(DoctorError):
+    """Errors related to annotation parsing and merging."""
+
+    pass
+
+
+class RoleError(DoctorError):
+    """Errors that stop the processing of a single role."""
+
+    def __init__(self, msg: Any, **context: Any):
+        super().__init__(msg, context.get("error", ""))
+        self.msg = msg
+        self.context = context
+
+
+class RenderLimitError(TemplateError):
+    """Rendering of a template exceeded a configured limit."""
+
+    def __init__(self, msg: Any, elapsed: float = 0.0):
+        super().__init__(msg)
+        self.elapsed = elapsed
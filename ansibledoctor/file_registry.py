@@ -1,31 +1,119 @@
 #!/usr/bin/env python3
 """File registry to encapsulate file system related operations."""
 
+import contextlib
 import glob
+import logging
 import os
+from collections.abc import Callable
+from typing import TypeVar
 
 import pathspec
 import structlog
 
 from ansibledoctor.config import SingleConfig
-from ansibledoctor.constants import YAML_EXTENSIONS
+from ansibledoctor.constants import FILE_TYPES, OTHER_FILE_KEY, YAML_EXTENSIONS
+from ansibledoctor.utils.file_utils import classify_file
+from ansibledoctor.utils.shared_files import FileId, SharedFiles
+
+T = TypeVar("T")
 
 
 class Registry:
-    """Register all yaml files."""
+    """
+    Register all yaml files.
+
+    Every file is classified once during discovery. The resulting index allows to look up
+    files by type (see `ansibledoctor.constants.FILE_TYPES`) and role as well as the type
+    and role of a given file without scanning the file list again.
+
+    Files are identified by device and inode. If the same file is found through several paths,
+    e.g. a symlinked directory, only the first path of each file type is registered. Results of
+    reading files can be shared with other roles of the run through `SharedFiles`.
+    """
 
     _doc: list[str] = []
     log: structlog.stdlib.BoundLogger
     config: SingleConfig
 
-    def __init__(self) -> None:
+    def __init__(self, shared_files: SharedFiles | None = None) -> None:
+        """
+        Discover and classify all files of the current base directory.
+
+        :param shared_files: share results of reading files with other roles of the run
+        """
         self._doc: list[str] = []
+        self._index: dict[str, list[str]] = {file_type: [] for file_type in FILE_TYPES}
+        self._role_index: dict[str, dict[str, list[str]]] = {}
+        self._file_types: dict[str, str] = {}
+        self._file_roles: dict[str, str] = {}
+        self._file_ids: dict[str, FileId] = {}
+        self._aliases: dict[str, str] = {}
+        self._shared_files = shared_files
+        self._shared_used: set[tuple[str, FileId]] = set()
         self.config = SingleConfig()
         self.log = structlog.get_logger()
         self._scan_for_yaml_files()
+        self._build_index()
+
+        if shared_files is not None:
+            for file_id in set(self._file_ids.values()):
+                shared_files.add(file_id)
+
+    def get_files(self, file_type: str | None = None, role: str | None = None) -> list[str]:
+        """
+        Get registered files.
+
+        :param file_type: only return files of the given type
+        :param role: only return files of the given role directory
+        :return: list of file paths in discovery order
+        """
+        if role is not None:
+            index = self._role_index.get(role, {})
+            if file_type is None:
+                return [f for f in self._doc if self._file_roles.get(f) == role]
+            return index.get(file_type, [])
+
+        if file_type is None:
+            return self._doc
+        return self._index.get(file_type, [])
+
+    def cached(self, kind: str, path: str, compute: Callable[[], T]) -> T:
+        """
+        Read a file or reuse the result of another role that contains the same file.
+
+        :param kind: type of the result, e.g. `vars`
+        :param path: registered file
+        :param compute: function that reads the file, the result must not depend on the path
+        """
+        if self._shared_files is None:
+            return compute()
+        file_id = self._file_ids.get(path)
+        if file_id is not None:
+            self._shared_used.add((kind, file_id))
+        return self._shared_files.get(kind, file_id, compute)
+
+    def release(self) -> None:
+        """Release the shared results this role has not read, call once the role is done."""
+        if self._shared_files is not None:
+            self._shared_files.release(self._file_ids.values(), self._shared_used)
+            self._shared_files = None
+
+    def get_aliases(self) -> dict[str, str]:
+        """Get the skipped paths of files that are registered with another path."""
+        return self._aliases
+
+    def get_file_type(self, path: str) -> str:
+        """Get the type of a registered file."""
+        return self._file_types.get(path, OTHER_FILE_KEY)
 
-    def get_files(self) -> list[str]:
-        return self._doc
+    def get_role(self, path: str) -> str | None:
+        """Get the role directory a registered file belongs to."""
+        return self._file_roles.get(path)
+
+    def get_roles(self) -> list[str]:
+        """Get all role directories found during discovery."""
+        return list(self._role_index.keys())
 
     def _scan_for_yaml_files(self) -> None:
         """
@@ -39,13 +127,69 @@ class Registry:
         excludes = self.config.config.get("exclude_files")
         exclude_spec = pathspec.PathSpec.from_lines("gitwildmatch", excludes)
 
-        self.log.debug("Lookup role files", path=base_dir)
+        # Resolve the lazy logger once and only format per-file events if they are logged.
+        log = self.log.bind()
+        debug = log.is_enabled_for(logging.DEBUG)
+        log.debug("Lookup role files", path=base_dir)
 
+        skipped = 0
         for extension in extensions:
             pattern = os.path.join(base_dir, "**/*." + extension)
             for filename in glob.iglob(pattern, recursive=True):
                 if not exclude_spec.match_file(filename):
-                    self.log.debug("Found role file", path=os.path.relpath(filename, base_dir))
+                    if debug:
+                        log.debug("Found role file", path=os.path.relpath(filename, base_dir))
                     self._doc.append(filename)
+                    with contextlib.suppress(OSError):
+                        stat = os.stat(filename)
+                        self._file_ids[filename] = (stat.st_dev, stat.st_ino)
                 else:
-                    self.log.debug("Skipped role file", path=os.path.relpath(filename, base_dir))
+                    if debug:
+                        log.debug("Skipped role file", path=os.path.relpath(filename, base_dir))
+                    skipped += 1
+
+        log.debug("Role files found", count=len(self._doc), skipped=skipped)
+
+    def _build_index(self) -> None:
+        """Classify all registered files by type and role."""
+        base_dir = self.config.config.base_dir
+        unassigned: list[str] = []
+        files: list[str] = []
+        seen: dict[tuple[FileId, str], str] = {}
+
+        for filename in self._doc:
+            file_type, role = classify_file(filename, base_dir)
+            file_id = self._file_ids.get(filename)
+            if file_id is not None:
+                if (file_id, file_type) in seen:
+                    self.log.debug("Skipped alias of role file", path=filename)
+                    self._aliases[filename] = seen[(file_id, file_type)]
+                    del self._file_ids[filename]
+                    continue
+                seen[(file_id, file_type)] = filename
+
+            files.append(filename)
+            self._file_types[filename] = file_type
+            self._index[file_type].append(filename)
+
+            if role is None:
+                unassigned.append(filename)
+                continue
+
+            self._add_to_role(filename, file_type, role)
+
+        # Files outside of the known role layout belong to the closest role directory.
+        roles = sorted(self._role_index.keys(), key=len, reverse=True)
+        for filename in unassigned:
+            role = next(
+                (r for r in roles if filename.startswith(os.path.join(r, ""))),
+                os.path.normpath(base_dir),
+            )
+            self._add_to_role(filename, self._file_types[filename], role)
+
+        self._doc = files
+
+    def _add_to_role(self, filename: str, file_type: str, role: str) -> None:
+        self._file_roles[filename] = role
+        index = self._role_index.setdefault(role, {ft: [] for ft in FILE_TYPES})
+        index[file_type].append(filename)
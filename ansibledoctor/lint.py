@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Check the annotations of a role without rendering its documentation."""
+
+import re
+from collections.abc import Mapping
+from typing import Any
+
+from ansibledoctor.annotation import MULTILINE_CHARS, STARTS_WITH_ANNOTATION, Annotation
+from ansibledoctor.annotation_lexer import ANNOTATION_LINE, AnnotationLexer, AnnotationToken
+from ansibledoctor.config import SingleConfig
+from ansibledoctor.constants import ARGUMENT_SPECS_FILE_KEY, DEFAULTS_FILE_KEY
+from ansibledoctor.exception import YAMLError
+from ansibledoctor.file_registry import Registry
+from ansibledoctor.utils.yaml_helper import parse_yaml
+
+# Top-level keys of a defaults file, values of top-level keys are always indented.
+TOP_LEVEL_KEY = re.compile(r"^[\"']?([A-Za-z_]\w*)[\"']?[ \t]*:(?:[ \t]|$)", re.MULTILINE)
+
+# Closes multiline values, it is not an annotation on its own.
+END_MARKER = "end"
+
+
+class Finding:
+    """
+    Problem found in a role file.
+
+    :param file: path of the file
+    :param line: line number, `None` if the problem is not bound to a line
+    :param check: name of the check, e.g. `unknown-subtype`
+    :param message: description of the problem
+    """
+
+    __slots__ = ("check", "file", "line", "message")
+
+    def __init__(self, file: str, line: int | None, check: str, message: str) -> None:
+        self.file = file
+        self.line = line
+        self.check = check
+        self.message = message
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"file": self.file, "line": self.line, "check": self.check, "message": self.message}
+
+
+class Linter:
+    """
+    Check the annotations of a role.
+
+    Only the files of the role are discovered and the annotation lines are extracted, the role
+    is not parsed and no template is loaded. Defaults files are scanned for top-level keys
+    without reading them as yaml, only argument specs are read as yaml. The following problems
+    are reported:
+
+    - `unknown-annotation`: annotation name that is not defined, e.g. `@vars`
+    - `unknown-subtype`: subtype that is not defined for the annotation
+    - `missing-value`: annotation without a value
+    - `invalid-json`: value with `$` prefix that is not valid json
+    - `empty-multiline`: multiline value (`>` or `$>`) without any comment line after it
+    - `unterminated-multiline`: multiline value that runs into the next annotation or the end
+      of the file instead of being closed by `@end`
+    - `orphaned-multiline`: `@end` that does not close a multiline value, e.g. because the
+      comment block was interrupted by an empty line or the annotation is not multiline
+    - `undocumented-default`: default variable without `@var ...:description` annotation or
+      description in the argument specs
+    - `invalid-yaml`: argument specs that can't be read
+    """
+
+    def __init__(self, files_registry: Registry, workers: int = 1) -> None:
+        self.config = SingleConfig()
+        self._files_registry = files_registry
+        self._workers = workers
+
+    def findings(self) -> list[Finding]:
+        """Run all checks, the findings are sorted by file and line."""
+        lexer = AnnotationLexer(self._files_registry, self._workers)
+        definitions = self.config.get_annotations_definition()
+        findings: list[Finding] = []
+
+        for name in lexer.names():
+            if name in definitions or name == END_MARKER:
+                continue
+            findings.extend(
+                Finding(token.file, token.num, "unknown-annotation", f"Unknown annotation @{name}")
+                for token in lexer.tokens(name)
+            )
+
+        documented: set[str] = set()
+        for name in definitions:
+            annotation = Annotation(name, self._files_registry, lexer, strict=False)
+            findings.extend(Finding(*issue) for issue in annotation.get_issues())
+            if name == "var":
+                documented.update(
+                    key
+                    for item in annotation.get_items()
+                    for key, entry in item.get_obj().items()
+                    if "description" in entry
+                )
+
+        findings.extend(self._check_multiline(lexer))
+        findings.extend(self._check_defaults(documented, findings))
+        findings.sort(key=lambda f: (f.file, f.line or 0))
+        return findings
+
+    def _check_multiline(self, lexer: AnnotationLexer) -> list[Finding]:
+        """Follow the comment block of every multiline value like `Annotation` does."""
+        findings: list[Finding] = []
+        closed: set[tuple[str, int]] = set()
+        for name in lexer.names():
+            if name == END_MARKER:
+                continue
+            for token in lexer.tokens(name):
+                if token.line.rsplit(":", 1)[-1].strip() not in MULTILINE_CHARS:
+                    continue
+                end = _block_end(token)
+                if end:
+                    closed.add((token.file, end))
+                if end is not None:
+                    continue
+                key = token.line.split(f"@{name}", 1)[-1].split(":", 1)[0].strip()
+                findings.append(
+                    Finding(
+                        token.file,
+                        token.num,
+                        "unterminated-multiline",
+                        f"Multiline @{name} {key} is not closed by @{END_MARKER}",
+                    )
+                )
+
+        findings.extend(
+            Finding(
+                token.file,
+                token.num,
+                "orphaned-multiline",
+                f"@{END_MARKER} does not close a multiline value",
+            )
+            for token in lexer.tokens(END_MARKER)
+            if (token.file, token.num) not in closed
+        )
+        return findings
+
+    def _check_defaults(self, documented: set[str], findings: list[Finding]) -> list[Finding]:
+        documented = documented | self._argument_spec_descriptions(findings)
+        undocumented: list[Finding] = []
+        seen: set[str] = set()
+        for rfile in self._files_registry.get_files(DEFAULTS_FILE_KEY):
+            with open(rfile, encoding="utf8") as defaults_file:
+                content = defaults_file.read()
+
+            for match in TOP_LEVEL_KEY.finditer(content):
+                key = match.group(1)
+                if key in documented or key in seen:
+                    continue
+                seen.add(key)
+                undocumented.append(
+                    Finding(
+                        rfile,
+                        content.count("\n", 0, match.start()) + 1,
+                        "undocumented-default",
+                        f"Default variable {key} has no description",
+                    )
+                )
+
+        return undocumented
+
+    def _argument_spec_descriptions(self, findings: list[Finding]) -> set[str]:
+        """Get the options of all entry points that have a description in the argument specs."""
+        described: set[str] = set()
+        for rfile in self._files_registry.get_files(ARGUMENT_SPECS_FILE_KEY):
+            with open(rfile, encoding="utf8") as yaml_file:
+                try:
+                    raw = parse_yaml(yaml_file)
+                except YAMLError as e:
+                    findings.append(Finding(rfile, None, "invalid-yaml", str(e).strip()))
+                    continue
+
+            specs = raw.get("argument_specs") if isinstance(raw, Mapping) else None
+            for entry_point in (specs or {}).values():
+                options = entry_point.get("options") if isinstance(entry_point, Mapping) else None
+                described.update(
+                    name
+                    for name, spec in (options or {}).items()
+                    if isinstance(spec, Mapping) and spec.get("description")
+                )
+
+        return described
+
+
+def _block_end(token: AnnotationToken) -> int | None:
+    """
+    Get the line of the `@end` that closes a multiline value.
+
+    :return: line number, `None` if the value runs into another annotation or the end of the
+        file; `0` if the block ends at an empty line or yaml content, which is valid without
+        `@end`
+    """
+    for num, raw_line in enumerate(token.following_lines(), token.num + 1):
+        line = raw_line.strip()
+        if not line or not line.startswith("#"):
+            return 0
+        if STARTS_WITH_ANNOTATION.match(line):
+            match = ANNOTATION_LINE.match(line)
+            return num if match and match.group(1) == END_MARKER else None
+    return None
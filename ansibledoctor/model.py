@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Compact data model for parsed role documentation."""
+
+from collections.abc import Iterator, MutableMapping
+from typing import Any, ClassVar
+
+
+class Entry(MutableMapping[str, Any]):
+    """
+    Documentation entry backed by slots.
+
+    Known attributes are stored in slots, custom subtypes in a dict that is only allocated if
+    required. Unset attributes are not part of the mapping, so templates can keep using
+    `is defined` tests. The source file and line are kept separately and are not part of the
+    mapping.
+    """
+
+    __slots__ = ("_extra", "file", "line")
+
+    FIELDS: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, file: str | None = None, line: int | None = None, **fields: Any) -> None:
+        self._extra: dict[str, Any] | None = None
+        self.file = file
+        self.line = line
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            setattr(self, key, value)
+            return
+
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
+
+    def as_dict(self) -> dict[str, Any]:
+        """Convert the entry to a plain dict."""
+        return dict(self.items())
+
+
+class Variable(Entry):
+    """Role variable from defaults, vars, argument specs or `@var` annotations."""
+
+    __slots__ = ("deprecated", "description", "example", "required", "source", "type", "value")
+
+    FIELDS = ("value", "source", "description", "example", "type", "deprecated", "required")
+
+
+class Tag(Entry):
+    """Role tag from tasks or `@tag` annotations."""
+
+    __slots__ = ("description", "value")
+
+    FIELDS = ("value", "description")
+
+
+class Todo(Entry):
+    """Single `@todo` annotation."""
+
+    __slots__ = ("value",)
+
+    FIELDS = ("value",)
+
+
+class Meta(Entry):
+    """Role meta information from `meta/main.yml` or `@meta` annotations."""
+
+    __slots__ = ("value",)
+
+    FIELDS = ("value",)
+
+
+class Example(Entry):
+    """Example from `@example` annotations."""
+
+    __slots__ = ()
+
+
+ENTRY_TYPES: dict[str, type[Entry]] = {
+    "var": Variable,
+    "tag": Tag,
+    "todo": Todo,
+    "meta": Meta,
+    "example": Example,
+}
+
+
+def new_entry(section: str, file: str | None = None, line: int | None = None) -> Entry:
+    """Create an empty entry for the given section, e.g. `var`."""
+    return ENTRY_TYPES.get(section, Entry)(file=file, line=line)
+
+
+class RoleData(MutableMapping[str, Any]):
+    """
+    Parsed documentation data of a role.
+
+    Each section maps names to entries, except `todo` which maps names to a list of entries.
+    Use `as_dict` to get the plain data structure passed to templates.
+    """
+
+    __slots__ = ("example", "meta", "tag", "todo", "var")
+
+    SECTIONS: ClassVar[tuple[str, ...]] = ("meta", "var", "tag", "todo", "example")
+
+    def __init__(self) -> None:
+        self.meta: dict[str, Any] = {}
+        self.var: dict[str, Any] = {}
+        self.tag: dict[str, Any] = {}
+        self.todo: dict[str, Any] = {}
+        self.example: dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.SECTIONS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.SECTIONS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("Role data sections can not be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.SECTIONS)
+
+    def __len__(self) -> int:
+        return len(self.SECTIONS)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Convert the role data to plain dicts and lists for templates."""
+        data: dict[str, Any] = {
+            section: {key: as_plain(value) for key, value in self[section].items()}
+            for section in self.SECTIONS
+        }
+        data["internal"] = {}
+        return data
+
+
+def as_plain(value: Any) -> Any:
+    """Convert an entry or a list of entries to plain dicts, other values are returned as is."""
+    if isinstance(value, Entry):
+        return value.as_dict()
+    if isinstance(value, list):
+        return [v.as_dict() if isinstance(v, Entry) else v for v in value]
+    return value
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Stream the rendered files of a run into a tar archive."""
+
+import contextlib
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from typing import IO, Literal
+
+from ansibledoctor.exception import OutputArchiveError, RoleError
+
+StreamMode = Literal["w|", "w|gz", "w|bz2", "w|xz"]
+
+# Compression by file extension, stdout is never compressed.
+STREAM_MODES: dict[str, StreamMode] = {
+    ".tar.gz": "w|gz",
+    ".tgz": "w|gz",
+    ".tar.bz2": "w|bz2",
+    ".tar.xz": "w|xz",
+}
+
+
+class OutputArchive:
+    """
+    Tar archive that receives all rendered files of a run instead of the destination tree.
+
+    Files are added in the order they are rendered and streamed to the archive file or to
+    stdout (`-`), nothing is written to the destination tree. Member names are the output paths
+    relative to the base directory, output paths outside of the base directory are stored with
+    their absolute path without the leading `/`, like `tar` does.
+
+    Archive files are written to a temporary file next to the archive that replaces it on
+    `close`, so a failed run never leaves a partial archive and keeps an existing one.
+
+    :param path: path of the archive file or `-` for stdout
+    :param base_dir: base directory of the run
+    """
+
+    def __init__(self, path: str, base_dir: str) -> None:
+        self.path = path
+        self.base_dir = base_dir
+        self.members = 0
+        self._mtime = int(time.time())
+        self._lock = threading.Lock()
+
+        self._file: IO[bytes] | None = None
+        self._temp_path: str | None = None
+        try:
+            if path == "-":
+                fileobj: IO[bytes] = sys.stdout.buffer
+                mode: StreamMode = "w|"
+            else:
+                fd, self._temp_path = tempfile.mkstemp(
+                    prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(path)
+                )
+                self._file = fileobj = os.fdopen(fd, "wb")
+                mode = next((m for ext, m in STREAM_MODES.items() if path.endswith(ext)), "w|")
+            self._tar = tarfile.open(fileobj=fileobj, mode=mode)  # noqa: SIM115
+        except OSError as e:
+            self.discard()
+            raise OutputArchiveError("Can not open output archive", e) from e
+
+    def member_name(self, output_path: str) -> str:
+        """Get the member name of an output file, see `Config.get_output_path`."""
+        output_path = os.path.abspath(output_path)
+        name = os.path.relpath(output_path, self.base_dir)
+        if name == os.pardir or name.startswith(os.pardir + os.sep):
+            name = output_path.lstrip(os.sep)
+        return name.replace(os.sep, "/")
+
+    def add(self, output_path: str, content: bytes) -> None:
+        """
+        Add a rendered file, may be called from multiple threads.
+
+        :param output_path: output path of the file as if it was written to the destination
+        :param content: content of the file
+        """
+        info = tarfile.TarInfo(self.member_name(output_path))
+        info.size = len(content)
+        info.mode = 0o644
+        info.mtime = self._mtime
+
+        with self._lock:
+            try:
+                self._tar.addfile(info, io.BytesIO(content))
+            except OSError as e:
+                raise RoleError("Can not write output archive", path=self.path, error=e) from e
+            self.members += 1
+
+    def close(self) -> None:
+        """Finish the archive, must be called after the last file was added."""
+        try:
+            self._tar.close()
+            if self._file is None:
+                sys.stdout.buffer.flush()
+                return
+
+            self._file.close()
+            if self._temp_path is not None:
+                try:
+                    mode = os.stat(self.path).st_mode & 0o777
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(self._temp_path, mode)
+                os.replace(self._temp_path, self.path)
+                self._temp_path = None
+        except OSError as e:
+            self.discard()
+            raise OutputArchiveError("Can not write output archive", e) from e
+
+    def discard(self) -> None:
+        """Remove the unfinished archive file, e.g. after an error, does nothing after `close`."""
+        if self._file is not None:
+            self._file.close()
+        if self._temp_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._temp_path)
+            self._temp_path = None
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Plan the roles of a run and prefetch their files while other roles are processed."""
+
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from ansibledoctor.file_registry import Registry
+from ansibledoctor.template import Template
+from ansibledoctor.utils.file_utils import existing_files, prefetch_files
+
+
+class RolePlan:
+    """
+    Everything that is known about a role before it is parsed.
+
+    :param path: role directory
+    :param context: log context of the role, e.g. the detected role name
+    :param registry: files of the role
+    :param template: template to render, `None` if the role is only parsed
+    :param outputs: output path by template file
+    :param confirm: ask before existing output files are overwritten
+    """
+
+    __slots__ = ("confirm", "context", "outputs", "path", "registry", "template")
+
+    def __init__(
+        self,
+        path: str,
+        context: dict[str, Any],
+        registry: Registry,
+        template: Template | None = None,
+        outputs: dict[str, str] | None = None,
+        confirm: bool = False,
+    ) -> None:
+        self.path = path
+        self.context = context
+        self.registry = registry
+        self.template = template
+        self.outputs = outputs or {}
+        self.confirm = confirm
+
+
+def files_to_overwrite(plans: list[RolePlan]) -> list[str]:
+    """Get the existing output files of all roles that require a confirmation."""
+    outputs = [output for plan in plans if plan.confirm for output in plan.outputs.values()]
+    existing = existing_files(outputs)
+    return [output for output in outputs if output in existing]
+
+
+class Prefetcher:
+    """
+    Read the files of the next role in the background while the current role is processed.
+
+    Reads run on a single thread, so the latency of slow filesystems overlaps with parsing and
+    rendering of the previous role, and the files of the next role are already in the page
+    cache when they are parsed.
+    """
+
+    def __init__(self, plans: list[RolePlan]) -> None:
+        self._plans = plans
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self._pending: Future[None] | None = None
+
+    def __iter__(self) -> Iterator[RolePlan]:
+        try:
+            for index, plan in enumerate(self._plans):
+                self._wait()
+                if index + 1 < len(self._plans):
+                    files = self._plans[index + 1].registry.get_files()
+                    self._pending = self._pool.submit(prefetch_files, files)
+                yield plan
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _wait(self) -> None:
+        # Don't read ahead more than one role, the page cache might drop files otherwise.
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of rendered role documentation, shared between runs."""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Any
+
+import structlog
+
+from ansibledoctor import __version__
+from ansibledoctor.utils.file_utils import write_file_atomic
+
+CACHE_VERSION = 1
+ENTRY_SUFFIX = ".json.gz"
+
+# Settings that change the rendered output, the output paths and the header file are part of
+# the key by their relative path and content.
+RENDER_SETTINGS = (
+    "role_name",
+    "exclude_tags",
+    "annotations",
+    "template.options",
+    "renderer.autotrim",
+    "renderer.sandbox",
+    "renderer.timeout",
+    "renderer.max_output_size",
+    "renderer.max_include_depth",
+    "renderer.yaml_emitter",
+    "renderer.max_value_size",
+    "renderer.oversized_values",
+)
+
+
+class RenderCache:
+    """
+    Rendered output files of roles by a hash of everything that goes into rendering.
+
+    The key covers the content of the role files, the template files, the resolved settings
+    that change the output and the summaries of related roles, but no absolute paths or
+    modification times, so the cache can be shared between checkouts, branches and CI runners,
+    e.g. on a mounted volume. Entries are written atomically and only read completely, so
+    several runs can use the same cache directory at the same time.
+
+    Entries are kept until the cache exceeds the size limit, the least recently used entries
+    are removed first. Reading an entry marks it as used.
+
+    :param path: cache directory
+    :param max_size: size limit of all entries in bytes, `0` disables the limit
+    """
+
+    def __init__(self, path: str, max_size: int = 0) -> None:
+        self.log = structlog.get_logger()
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._digests: dict[str, str] = {}
+
+    def key(self, inputs: dict[str, Any]) -> str:
+        """
+        Hash the inputs of a role.
+
+        :param inputs: json serialisable inputs, e.g. file digests and settings
+        """
+        digest = hashlib.sha256(f"{CACHE_VERSION}\0{__version__}\0".encode())
+        digest.update(json.dumps(inputs, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def tree_digest(self, directory: str) -> str:
+        """Hash the relative paths and content of all files below a directory, once per run."""
+        if directory not in self._digests:
+            files = [
+                os.path.join(root, name) for root, _, names in os.walk(directory) for name in names
+            ]
+            self._digests[directory] = json.dumps(file_digests(files, directory), sort_keys=True)
+        return self._digests[directory]
+
+    def get(self, key: str) -> dict[str, bytes] | None:
+        """
+        Get the output files of an entry by path relative to the output directory.
+
+        Missing and unreadable entries are counted as miss.
+        """
+        entry = self._entry_path(key)
+        try:
+            with gzip.open(entry, "rt", encoding="utf-8") as entry_file:
+                data = json.load(entry_file)
+            files = {path: content.encode("utf-8") for path, content in data["files"].items()}
+            os.utime(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            self.log.warning("Ignore invalid render cache entry", path=entry, error=str(e))
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return files
+
+    def put(self, key: str, files: dict[str, bytes]) -> None:
+        """
+        Store the output files of a role, errors are logged and don't fail the role.
+
+        :param key: key of the role inputs, see `key`
+        :param files: content of the output files by path relative to the output directory
+        """
+        entry = self._entry_path(key)
+        data = {"files": {path: content.decode("utf-8") for path, content in files.items()}}
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            content = gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            write_file_atomic(entry, content)
+        except OSError as e:
+            self.log.warning("Can not write render cache entry", path=entry, error=str(e))
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries until the cache fits into the size limit.
+
+        :return: number of removed entries
+        """
+        if not self.max_size:
+            return 0
+
+        entries: list[tuple[float, int, str]] = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        removed = 0
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            # Another run may have removed the entry already.
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+        return removed
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + ENTRY_SUFFIX)
+
+
+def file_digests(files: list[str], root: str) -> dict[str, str]:
+    """
+    Hash the content of files.
+
+    :param files: files to hash, missing files are skipped
+    :param root: paths of the result are relative to this directory
+    :return: sha256 digest by relative path
+    """
+    digests: dict[str, str] = {}
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                digests[os.path.relpath(path, root)] = hashlib.file_digest(f, "sha256").hexdigest()
+        except (FileNotFoundError, IsADirectoryError):
+            continue
+    return digests
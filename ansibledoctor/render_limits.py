@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Limit time, output size and include depth of template rendering."""
+
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+from jinja2 import Environment, Template, nodes
+from jinja2.compiler import CodeGenerator, Frame
+from jinja2.runtime import Context
+from jinja2.sandbox import SandboxedEnvironment
+
+from ansibledoctor.exception import RenderLimitError
+
+# Context variable that holds the include depth of the current template.
+DEPTH_VAR = "__include_depth__"
+# Include depth that is never exceeded, far below the recursion limit of Python.
+MAX_INCLUDE_DEPTH = 100
+# Number of loop iterations between two time checks.
+LOOP_CHECK_INTERVAL = 100
+
+
+class RenderLimits:
+    """
+    Limits for rendering a single template file, `0` disables a limit.
+
+    The output is rendered as stream, so time and output size are checked after every chunk
+    of output. The time is also checked in every loop, which catches loops that don't produce
+    any output. In a sandboxed environment, the time is checked on every call and attribute
+    lookup as well, and repeated strings and lists are checked against the output size before
+    they are built. Includes are limited to `MAX_INCLUDE_DEPTH` even if the include depth limit
+    is disabled.
+    """
+
+    def __init__(
+        self, timeout: float = 0, max_output_size: int = 0, max_include_depth: int = 0
+    ) -> None:
+        self.timeout = timeout
+        self.max_output_size = max_output_size
+        self.max_include_depth = min(max_include_depth or MAX_INCLUDE_DEPTH, MAX_INCLUDE_DEPTH)
+        self._start = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def render(self, template: Template, *args: Any, **kwargs: Any) -> str:
+        """
+        Render a template within the limits.
+
+        :raises ansibledoctor.exception.RenderLimitError: if a limit is exceeded
+        """
+        self._start = time.monotonic()
+        chunks: list[str] = []
+        size = 0
+
+        for chunk in template.generate(*args, **kwargs):
+            chunks.append(chunk)
+            size += len(chunk)
+            self.check_size(size)
+            self.check_time()
+        return "".join(chunks)
+
+    def check_size(self, size: int) -> None:
+        if self.max_output_size and size > self.max_output_size:
+            raise RenderLimitError(
+                f"Output exceeds the size limit of {self.max_output_size} characters",
+                elapsed=self.elapsed,
+            )
+
+    def check_time(self) -> None:
+        if self.timeout and self.elapsed > self.timeout:
+            raise RenderLimitError(
+                f"Rendering exceeds the time limit of {self.timeout}s", elapsed=self.elapsed
+            )
+
+    def check_depth(self, depth: int) -> None:
+        if depth > self.max_include_depth:
+            raise RenderLimitError(
+                f"Includes exceed the depth limit of {self.max_include_depth}",
+                elapsed=self.elapsed,
+            )
+
+
+class LimitedTemplate(Template):
+    """Template that tracks the include depth, see `RenderLimits`."""
+
+    def new_context(
+        self,
+        vars: dict[str, Any] | None = None,  # noqa: A002
+        shared: bool = False,
+        locals: Mapping[str, Any] | None = None,  # noqa: A002
+    ) -> Context:
+        # Included templates get the variables of the including template.
+        depth = (vars or {}).get(DEPTH_VAR, -1) + 1
+        limits = getattr(self.environment, "render_limits", None)
+        if limits is not None:
+            limits.check_depth(depth)
+
+        context = super().new_context(vars, shared, locals)
+        context.vars[DEPTH_VAR] = depth
+        return context
+
+
+class LimitedCodeGenerator(CodeGenerator):
+    """Code generator that passes the items of every loop through `LimitedEnvironment.loop`."""
+
+    def visit_For(self, node: nodes.For, frame: Frame) -> None:  # noqa: N802
+        node.iter = nodes.Call(
+            nodes.EnvironmentAttribute("loop"), [node.iter], [], None, None, lineno=node.lineno
+        )
+        super().visit_For(node, frame)
+
+
+class LimitedEnvironment(Environment):
+    """Jinja2 environment for rendering with `RenderLimits`."""
+
+    code_generator_class = LimitedCodeGenerator
+    template_class = LimitedTemplate
+    render_limits = RenderLimits()
+
+    def loop(self, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Check the time limit while a loop runs, even if it doesn't produce output."""
+        for count, item in enumerate(iterable):
+            if count % LOOP_CHECK_INTERVAL == 0:
+                self.render_limits.check_time()
+            yield item
+
+
+class LimitedSandboxedEnvironment(SandboxedEnvironment, LimitedEnvironment):
+    """Sandboxed Jinja2 environment that checks the limits on every call, lookup and `*`."""
+
+    intercepted_binops = frozenset(["*"])
+
+    def call(self, context: Context, obj: Any, /, *args: Any, **kwargs: Any) -> Any:
+        self.render_limits.check_time()
+        try:
+            return super().call(context, obj, *args, **kwargs)
+        except OverflowError as e:
+            # E.g. `range` with more items than the sandbox allows.
+            raise RenderLimitError(str(e), elapsed=self.render_limits.elapsed) from e
+
+    def call_binop(self, context: Context, operator: str, left: Any, right: Any) -> Any:
+        # Repeated strings and lists are checked before they are built.
+        for value, count in ((left, right), (right, left)):
+            if isinstance(value, (str, list, tuple)) and isinstance(count, int):
+                self.render_limits.check_size(len(value) * count)
+        return super().call_binop(context, operator, left, right)
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        self.render_limits.check_time()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj: Any, argument: Any) -> Any:
+        self.render_limits.check_time()
+        return super().getitem(obj, argument)
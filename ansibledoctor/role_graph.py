@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Dependency graph of all roles of a run."""
+
+import os
+import re
+from collections.abc import Mapping
+from typing import Any
+
+from ansibledoctor.model import Meta
+
+
+class RoleNode:
+    """
+    Role in the dependency graph.
+
+    :param name: role name
+    :param path: role directory
+    :param meta: entries of the meta files, the parser of the role gets a copy
+    """
+
+    __slots__ = ("dependencies", "description", "meta", "name", "path", "used_by")
+
+    def __init__(self, name: str, path: str, meta: dict[str, Meta]) -> None:
+        self.name = name
+        self.path = path
+        self.meta = meta
+        # Fixed while the run is planned, so summaries don't depend on the order of the roles.
+        entry = meta.get("description")
+        self.description = _join(entry["value"] if entry is not None else None)
+        self.dependencies: list[RoleNode] = []
+        self.used_by: list[RoleNode] = []
+
+    def summary(self, origin: "RoleNode | None" = None) -> dict[str, Any]:
+        """
+        Summarise the role for the documentation of another role.
+
+        :param origin: role that links to this role, the path is relative to its directory
+        """
+        return {
+            "name": self.name,
+            "path": os.path.relpath(self.path, origin.path) if origin else self.path,
+            "description": self.description,
+            "dependencies": [node.name for node in self.dependencies],
+        }
+
+
+class RoleGraph:
+    """
+    Dependencies between the roles of a run.
+
+    Roles are added with the meta entries that are read once during planning, the parser of
+    each role gets a copy of the entries. Dependencies are resolved by role name or by the last
+    path component of the dependency, e.g. `../roles/nginx`, dependencies on roles outside of
+    the run are not part of the graph.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: dict[str, RoleNode] = {}
+        self._names: dict[str, RoleNode] = {}
+
+    def add(self, name: str, path: str, meta: dict[str, Meta]) -> RoleNode:
+        """
+        Add a role to the graph, call `link` after all roles are added.
+
+        :param name: role name, e.g. from `role.name` or the role directory
+        :param path: role directory, identifies the role
+        :param meta: entries of the meta files of the role
+        """
+        node = RoleNode(name, path, meta)
+        self._nodes[path] = node
+        self._names.setdefault(name, node)
+        self._names.setdefault(os.path.basename(path), node)
+        return node
+
+    def get(self, path: str) -> RoleNode | None:
+        return self._nodes.get(path)
+
+    def find(self, name: str) -> RoleNode | None:
+        """Find a role by name or path as used in the dependencies of a role."""
+        return self._names.get(name) or self._names.get(os.path.basename(name.rstrip("/")))
+
+    def link(self) -> None:
+        """Resolve the dependencies of all roles."""
+        for node in self._nodes.values():
+            node.dependencies = []
+            node.used_by = []
+
+        for node in self._nodes.values():
+            entry = node.meta.get("dependencies")
+            for name in dependency_names(entry["value"] if entry is not None else None):
+                dependency = self.find(name)
+                if dependency is None or dependency is node or dependency in node.dependencies:
+                    continue
+                node.dependencies.append(dependency)
+                dependency.used_by.append(node)
+
+        for node in self._nodes.values():
+            node.used_by.sort(key=lambda n: n.name.lower())
+
+
+def dependency_names(dependencies: Any) -> list[str]:
+    """
+    Get the role names of a `dependencies` value of a meta file.
+
+    Dependencies are either role names or mappings with a `role` or `name` key, the list can
+    also be nested in a `dependencies` mapping.
+    """
+    if isinstance(dependencies, Mapping):
+        dependencies = dependencies.get("dependencies")
+    if not isinstance(dependencies, list):
+        return []
+
+    names: list[str] = []
+    for item in dependencies:
+        if isinstance(item, Mapping):
+            item = item.get("role") or item.get("name")
+        if isinstance(item, str) and item:
+            names.append(item)
+
+    return names
+
+
+def _join(value: Any) -> str | None:
+    """Join multiline values like the `safe_join` filter, empty values are `None`."""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        value = " ".join(re.sub(r"\n\n+", "\n", str(item)) for item in value)
+    return str(value).strip() or None
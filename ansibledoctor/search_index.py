@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Compact JSON search index of the rendered roles for documentation sites."""
+
+import json
+import os
+import tempfile
+from typing import Any
+
+import structlog
+
+from ansibledoctor import __version__
+from ansibledoctor.exception import SearchIndexError
+from ansibledoctor.model import RoleData
+
+INDEX_VERSION = 1
+
+
+class SearchIndex:
+    """
+    Search index of role names, descriptions, variables, tags and todos.
+
+    The index is built from the parsed role data, so the rendered pages don't need to be read
+    again. Existing entries are loaded on start and only the entries of rendered roles are
+    replaced, entries of roles that were not rendered in this run are kept. Paths are stored
+    relative to the directory of the index file, so the index can be deployed with the site.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.log = structlog.get_logger()
+        self.path = path
+        self._dir = os.path.dirname(path)
+        self._roles: dict[str, dict[str, Any]] = {}
+        self._changed = False
+
+        try:
+            with open(path, encoding="utf-8") as index_file:
+                data = json.load(index_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            raise SearchIndexError("Can not read search index", e) from e
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            self.log.warning("Unsupported search index version, rebuilding index", path=path)
+            self._changed = True
+            return
+
+        self._roles = {role["path"]: role for role in data.get("roles", [])}
+
+    def update(self, name: str, path: str, role_data: RoleData, pages: list[str]) -> None:
+        """
+        Replace the entry of a role, the index is only changed if the entry is different.
+
+        :param name: role name
+        :param path: absolute path of the role directory, identifies the role
+        :param role_data: parsed role data
+        :param pages: absolute paths of the rendered output files of the role
+        """
+        key = os.path.relpath(path, self._dir)
+        role: dict[str, Any] = {
+            "name": name,
+            "path": key,
+            "pages": [os.path.relpath(page, self._dir) for page in pages],
+            "description": _text(_value(role_data.meta.get("description"))),
+            "vars": [
+                {"name": str(var), "description": _text(_get(entry, "description"))}
+                for var, entry in role_data.var.items()
+            ],
+            "tags": [
+                {"name": str(tag), "description": _text(_get(entry, "description"))}
+                for tag, entry in role_data.tag.items()
+            ],
+            "todos": [
+                _text(_value(entry))
+                for entries in role_data.todo.values()
+                for entry in (entries if isinstance(entries, list) else [entries])
+            ],
+        }
+        if self._roles.get(key) != role:
+            self._roles[key] = role
+            self._changed = True
+
+    def prune(self, base_dir: str, keep: list[str]) -> int:
+        """
+        Remove roles below a directory that no longer exist.
+
+        :param base_dir: only roles below this directory are removed
+        :param keep: absolute paths of the roles to keep
+        :return: number of removed roles
+        """
+        prefix = os.path.join(base_dir, "")
+        keep_keys = {os.path.relpath(path, self._dir) for path in keep}
+        removed = [
+            key
+            for key in self._roles
+            if os.path.normpath(os.path.join(self._dir, key)).startswith(prefix)
+            and key not in keep_keys
+        ]
+        for key in removed:
+            del self._roles[key]
+
+        self._changed = self._changed or bool(removed)
+        return len(removed)
+
+    def write(self) -> bool:
+        """
+        Write the index if it has changed, the file is replaced atomically.
+
+        :return: `True` if the index was written
+        """
+        if not self._changed:
+            return False
+
+        data = {
+            "version": INDEX_VERSION,
+            "generator": f"ansible-doctor {__version__}",
+            "roles": sorted(self._roles.values(), key=lambda role: (role["name"], role["path"])),
+        }
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".search-index-", dir=self._dir)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as index_file:
+                    json.dump(data, index_file, separators=(",", ":"), default=str)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            raise SearchIndexError("Can not write search index", e) from e
+
+        self._changed = False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+
+def _get(entry: Any, key: str) -> Any:
+    try:
+        return entry[key]
+    except (KeyError, TypeError):
+        return None
+
+
+def _value(entry: Any) -> Any:
+    return _get(entry, "value")
+
+
+def _text(value: Any) -> str:
+    """Join multiline annotation values to a single string."""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value if item is not None).strip()
+    return str(value).strip()
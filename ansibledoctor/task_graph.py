@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Follow static includes and imports of task and handler files."""
+
+import os
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+import structlog
+
+from ansibledoctor.constants import HANDLERS_FILE_KEY, TASKS_FILE_KEY, YAML_EXTENSIONS
+from ansibledoctor.exception import RoleError, YAMLError
+from ansibledoctor.file_registry import Registry
+from ansibledoctor.utils import flatten, parallel_map
+from ansibledoctor.utils.yaml_helper import parse_yaml_ansible
+
+INCLUDE_ACTIONS = frozenset(
+    f"{prefix}{action}"
+    for prefix in ("", "ansible.builtin.", "ansible.legacy.")
+    for action in ("include_tasks", "import_tasks", "include")
+)
+BLOCK_KEYS = ("block", "rescue", "always")
+
+
+class TaskFile:
+    """Tags and includes of a single task or handler file."""
+
+    __slots__ = ("dynamic", "includes", "path", "tags")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.tags: list[Any] = []
+        self.includes: list[str] = []
+        self.dynamic = False
+
+
+class TaskGraph:
+    """
+    Static include and import graph of the task and handler files of all roles.
+
+    The graph starts at `tasks/main.yml` and `handlers/main.yml` of each role and follows
+    `include_tasks`, `import_tasks` and `include`, also within blocks. Every file is parsed once,
+    no matter how often it is included, and cycles are only followed once. Includes with
+    templated file names can't be resolved statically, all files of the same type of such a
+    role are considered reachable in this case. The same applies to roles without a main file.
+    """
+
+    def __init__(self, files_registry: Registry, workers: int = 1) -> None:
+        self.log = structlog.get_logger()
+        self._files_registry = files_registry
+        self._workers = workers
+        self._parsed: dict[str, TaskFile] = {}
+        # Registered task and handler files by normalized path to resolve includes.
+        self._known = {
+            os.path.normpath(path): path
+            for file_type in (TASKS_FILE_KEY, HANDLERS_FILE_KEY)
+            for path in files_registry.get_files(file_type)
+        }
+        # Includes of a skipped alias resolve to the registered path of the same file.
+        for alias, path in files_registry.get_aliases().items():
+            if os.path.normpath(path) in self._known:
+                self._known.setdefault(os.path.normpath(alias), path)
+
+    def files(self) -> list[TaskFile]:
+        """Get all reachable files in order of execution, files are parsed on first call."""
+        registry = self._files_registry
+        ordered: list[TaskFile] = []
+        visited: set[str] = set()
+
+        for role in registry.get_roles():
+            for file_type in (TASKS_FILE_KEY, HANDLERS_FILE_KEY):
+                candidates = registry.get_files(file_type, role)
+                if not candidates:
+                    continue
+
+                mains = [os.path.join(role, file_type, f"main.{ext}") for ext in YAML_EXTENSIONS]
+                entries = [
+                    path
+                    for main in mains
+                    if (path := self._known.get(os.path.normpath(main))) in set(candidates)
+                ]
+                self._parse_reachable(entries)
+                reached = list(self._walk(entries, visited))
+                ordered.extend(reached)
+
+                if not entries or any(task_file.dynamic for task_file in reached):
+                    self.log.debug(
+                        "Include graph incomplete, using all files", role=role, type=file_type
+                    )
+                    remaining = [path for path in candidates if path not in visited]
+                    self._parse(remaining)
+                    visited.update(remaining)
+                    ordered.extend(self._parsed[path] for path in remaining)
+
+        return ordered
+
+    def _parse_reachable(self, entries: list[str]) -> None:
+        """Parse the files level by level, each level may be parsed on multiple threads."""
+        expanded: set[str] = set()
+        pending = entries
+        while pending:
+            self._parse(pending)
+            expanded.update(pending)
+            pending = list(
+                dict.fromkeys(
+                    include
+                    for path in pending
+                    for include in self._parsed[path].includes
+                    if include not in expanded
+                )
+            )
+
+    def _parse(self, paths: list[str]) -> None:
+        paths = [path for path in paths if path not in self._parsed]
+        for task_file in parallel_map(self._read_file, paths, self._workers):
+            self._parsed[task_file.path] = task_file
+
+    def _walk(self, entries: list[str], visited: set[str]) -> Iterator[TaskFile]:
+        """Visit the parsed files depth first in order of their includes."""
+        stack = list(reversed(entries))
+        while stack:
+            path = stack.pop()
+            if path in visited:
+                continue
+            visited.add(path)
+
+            task_file = self._parsed[path]
+            yield task_file
+            stack.extend(reversed(task_file.includes))
+
+    def _read_file(self, rfile: str) -> TaskFile:
+        tags, targets, dynamic = self._files_registry.cached(
+            "tasks", rfile, lambda: self._scan_file(rfile)
+        )
+
+        task_file = TaskFile(rfile)
+        task_file.tags = tags
+        task_file.dynamic = dynamic
+        for target in targets:
+            include = self._resolve(rfile, target)
+            if include is None:
+                self.log.debug("Included file not found", path=rfile, include=target)
+            elif include not in task_file.includes:
+                task_file.includes.append(include)
+
+        return task_file
+
+    def _scan_file(self, rfile: str) -> tuple[list[Any], list[str], bool]:
+        """Get the tags, static include targets and if there are dynamic includes of a file."""
+        with open(rfile, encoding="utf8") as yaml_file:
+            try:
+                raw = parse_yaml_ansible(yaml_file)
+            except YAMLError as e:
+                raise RoleError("Failed to read yaml file", path=rfile, error=e) from e
+
+        tags: list[Any] = []
+        targets: list[str] = []
+        dynamic = False
+        for task in _iter_tasks(raw):
+            task_tags = task.get("tags", [])
+            tags.append([task_tags] if isinstance(task_tags, str) else task_tags)
+
+            for action in INCLUDE_ACTIONS.intersection(task):
+                target = task[action]
+                if isinstance(target, Mapping):
+                    target = target.get("file") or target.get("_raw_params")
+                if not isinstance(target, str) or "{{" in target or "{%" in target:
+                    dynamic = True
+                    continue
+                targets.append(str(target))
+
+        # Drop the position info of ansible strings
+        return (
+            [str(tag) if isinstance(tag, str) else tag for tag in flatten(tags)],
+            targets,
+            dynamic,
+        )
+
+    def _resolve(self, rfile: str, target: str) -> str | None:
+        """Find an included file relative to the including file or the role directories."""
+        role = self._files_registry.get_role(rfile) or os.path.dirname(rfile)
+        for directory in (
+            os.path.dirname(rfile),
+            os.path.join(role, TASKS_FILE_KEY),
+            os.path.join(role, HANDLERS_FILE_KEY),
+        ):
+            path = self._known.get(os.path.normpath(os.path.join(directory, target)))
+            if path is not None:
+                return path
+        return None
+
+
+def _iter_tasks(tasks: Any) -> Iterator[Mapping[str, Any]]:
+    """Iterate over all tasks including blocks and the tasks within blocks."""
+    if not isinstance(tasks, list):
+        return
+
+    for task in tasks:
+        if not isinstance(task, Mapping):
+            continue
+        yield task
+        for key in BLOCK_KEYS:
+            yield from _iter_tasks(task.get(key))
@@ -2,30 +2,44 @@
 
 import atexit
 import glob
+import hashlib
 import ntpath
 import os
+import re
 import shutil
+import tarfile
 import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+from typing import ClassVar
 
 import structlog
+from appdirs import AppDirs
 from git import GitCommandError, Repo
 
 import ansibledoctor.exception
-from ansibledoctor.utils import sys_exit_with_message
+
+# Extracted template archives, one directory per SHA-256 digest of the archive.
+ARCHIVE_CACHE_DIR = os.path.join(AppDirs("ansible-doctor").user_cache_dir, "templates")
+ARCHIVE_PIN = "sha256="
+SHA256_DIGEST = re.compile(r"[0-9a-f]{64}")
 
 
 class Template:
     """
     Represents a template that can be used to generate content.
 
-    Templates can be sourced from a local file or a Git repository. The `Template` class handles
-    the initialization and setup of a template, including cloning a Git repository if necessary.
+    Templates can be sourced from a local file, a Git repository or a tar or zip archive. The
+    `Template` class handles the initialization and setup of a template, including cloning a Git
+    repository or extracting an archive if necessary.
 
     Args:
     ----
         name (str): The name of the template.
         src (str): The source of the template, in the format `<provider>><path>`.
-        Supported providers are `local` and `git`.
+        Supported providers are `local`, `git` and `archive`.
 
     Raises:
     ------
@@ -33,10 +47,18 @@ class Template:
 
     """
 
+    _temp_dirs: ClassVar[set[str]] = set()
+    _cleanup_registered: ClassVar[bool] = False
+    # Extracted archives of the current run by source and pinned digest.
+    _archives: ClassVar[dict[tuple[str, str | None], str]] = {}
+    # Cloned repositories of the current run by url and branch or tag.
+    _clones: ClassVar[dict[tuple[str, str | None], str]] = {}
+
     def __init__(self, name: str, src: str) -> None:
         self.log = structlog.get_logger()
         self.name = name
         self.src = src
+        self._temp_dir: str | None = None
 
         try:
             provider, path = self.src.split(">", 1)
@@ -54,8 +76,26 @@ class Template:
             repo_url, branch_or_tag = (
                 self.path.split("#", 1) if "#" in self.path else (self.path, None)
             )
-            temp_dir = self._clone_repo(repo_url, branch_or_tag)
+            temp_dir = Template._clones.get((repo_url, branch_or_tag)) or self._clone_repo(
+                repo_url, branch_or_tag
+            )
             self.path = os.path.join(temp_dir, self.name)
+        elif self.provider == "archive":
+            source, sha256 = self.path, None
+            if "#" in self.path:
+                source, pin = self.path.rsplit("#", 1)
+                if not pin.startswith(ARCHIVE_PIN):
+                    raise ansibledoctor.exception.TemplateError(
+                        f"Invalid archive checksum, expected '{ARCHIVE_PIN}<digest>': {pin}"
+                    )
+                sha256 = pin.removeprefix(ARCHIVE_PIN).lower()
+                # The digest is used as directory name in the archive cache.
+                if not SHA256_DIGEST.fullmatch(sha256):
+                    raise ansibledoctor.exception.TemplateError(
+                        f"Invalid archive checksum, expected 64 hex digits: {pin}"
+                    )
+            archive_dir = self._fetch_archive(source, sha256)
+            self.path = os.path.join(archive_dir, self.name)
         else:
             raise ansibledoctor.exception.TemplateError(
                 f"Unsupported template provider: {provider}"
@@ -65,7 +105,7 @@ class Template:
 
     def _clone_repo(self, repo_url: str, branch_or_tag: str | None = None) -> str:
         temp_dir = tempfile.mkdtemp(prefix="ansibledoctor-")
-        atexit.register(self._cleanup_temp_dir, temp_dir)
+        self._register_temp_dir(temp_dir)
 
         try:
             self.log.debug("Cloning template repo", src=repo_url)
@@ -78,9 +118,12 @@ class Template:
                     raise ansibledoctor.exception.TemplateError(
                         f"Error checking out branch or tag: {branch_or_tag}: {e}"
                     ) from e
+        except BaseException as e:
+            # Later templates of the run clone again instead of using a partial clone.
+            self.cleanup()
+            if not isinstance(e, GitCommandError):
+                raise
 
-            return temp_dir
-        except GitCommandError as e:
             msg = e.stderr.strip("'").strip()
             msg = msg.removeprefix("stderr: ")
 
@@ -88,6 +131,121 @@ class Template:
                 f"Error cloning Git repository: {msg}"
             ) from e
 
+        Template._clones[(repo_url, branch_or_tag)] = temp_dir
+        return temp_dir
+
+    def _fetch_archive(self, source: str, sha256: str | None = None) -> str:
+        """
+        Extract a template archive into the cache and return the extracted directory.
+
+        Archives are extracted once into a directory named after the SHA-256 digest of the
+        archive and reused by later runs. If the digest is pinned and already in the cache, the
+        archive is not read or downloaded at all.
+
+        :param source: path, `file://` or `http(s)://` URL of a tar or zip archive
+        :param sha256: expected SHA-256 digest of the archive
+        """
+        key = (source, sha256)
+        if key in Template._archives:
+            return Template._archives[key]
+
+        if sha256 and os.path.isdir(os.path.join(ARCHIVE_CACHE_DIR, sha256)):
+            self.log.debug("Use cached template archive", src=source, sha256=sha256)
+            archive_dir = os.path.join(ARCHIVE_CACHE_DIR, sha256)
+        else:
+            os.makedirs(ARCHIVE_CACHE_DIR, exist_ok=True)
+            archive, digest, temporary = self._read_archive(source)
+            try:
+                if sha256 and digest != sha256:
+                    raise ansibledoctor.exception.TemplateError(
+                        f"Template archive checksum mismatch: expected {sha256}, got {digest}"
+                    )
+
+                archive_dir = os.path.join(ARCHIVE_CACHE_DIR, digest)
+                if not os.path.isdir(archive_dir):
+                    self.log.debug("Extract template archive", src=source, sha256=digest)
+                    self._extract_archive(archive, archive_dir)
+            finally:
+                if temporary:
+                    os.remove(archive)
+
+        Template._archives[key] = archive_dir
+        return archive_dir
+
+    def _read_archive(self, source: str) -> tuple[str, str, bool]:
+        """Get the local path, SHA-256 digest and whether the file is a temporary download."""
+        url = urllib.parse.urlparse(source)
+        if url.scheme == "file":
+            source = urllib.request.url2pathname(url.path)
+        elif url.scheme in ("http", "https"):
+            self.log.debug("Download template archive", src=source)
+            fd, path = tempfile.mkstemp(prefix=".download-", dir=ARCHIVE_CACHE_DIR)
+            digest = hashlib.sha256()
+            try:
+                with (
+                    os.fdopen(fd, "wb") as out,
+                    urllib.request.urlopen(source, timeout=60) as response,  # noqa: S310
+                ):
+                    for chunk in iter(lambda: response.read(1 << 16), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+            except (OSError, urllib.error.URLError) as e:
+                os.remove(path)
+                raise ansibledoctor.exception.TemplateError(
+                    f"Error downloading template archive: {source}: {e}"
+                ) from e
+
+            return path, digest.hexdigest(), True
+
+        try:
+            with open(source, "rb") as f:
+                return source, hashlib.file_digest(f, "sha256").hexdigest(), False
+        except OSError as e:
+            raise ansibledoctor.exception.TemplateError(
+                f"Error reading template archive: {source}: {e.strerror}"
+            ) from e
+
+    @staticmethod
+    def _extract_archive(archive: str, archive_dir: str) -> None:
+        # Extract next to the final directory and move it in place, so concurrent runs never
+        # see a partially extracted archive.
+        temp_dir = tempfile.mkdtemp(prefix=".extract-", dir=os.path.dirname(archive_dir))
+        try:
+            if zipfile.is_zipfile(archive):
+                with zipfile.ZipFile(archive) as zf:
+                    _check_members(zf.namelist(), temp_dir)
+                    zf.extractall(temp_dir)  # noqa: S202
+            elif tarfile.is_tarfile(archive):
+                with tarfile.open(archive) as tf:
+                    for member in tf.getmembers():
+                        if not (member.isfile() or member.isdir()):
+                            raise ansibledoctor.exception.TemplateError(
+                                f"Unsupported file in template archive: {member.name}"
+                            )
+                    _check_members(tf.getnames(), temp_dir)
+                    if hasattr(tarfile, "data_filter"):
+                        tf.extractall(temp_dir, filter="data")
+                    else:
+                        tf.extractall(temp_dir)  # noqa: S202
+            else:
+                raise ansibledoctor.exception.TemplateError(
+                    f"Unsupported template archive format: {archive}"
+                )
+
+            try:
+                os.rename(temp_dir, archive_dir)
+            except OSError:
+                # Already extracted by a concurrent run.
+                if not os.path.isdir(archive_dir):
+                    raise
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            raise ansibledoctor.exception.TemplateError(
+                f"Error extracting template archive: {archive}: {e}"
+            ) from e
+        finally:
+            if os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
+
     def _scan_files(self) -> list[str]:
         """Search for Jinja2 (.j2) files to apply to the destination."""
         template_files = []
@@ -95,7 +253,9 @@ class Template:
         if os.path.isdir(self.path):
             self.log.info("Lookup template files", src=self.src)
         else:
-            sys_exit_with_message("Can not open template directory", path=self.path)
+            raise ansibledoctor.exception.RoleError(
+                "Can not open template directory", path=self.path
+            )
 
         for file in glob.iglob(self.path + "/**/*.j2", recursive=True):
             relative_file = file[len(self.path) + 1 :]
@@ -107,7 +267,51 @@ class Template:
 
         return template_files
 
+    def cleanup(self) -> None:
+        """
+        Remove temporary files of the template, e.g. a cloned Git repository.
+
+        Templates that were created from the same repository share the clone, it must only be
+        removed if no other template uses it anymore, see `cleanup_all`.
+        """
+        if self._temp_dir:
+            self._cleanup_temp_dir(self._temp_dir)
+            Template._temp_dirs.discard(self._temp_dir)
+            Template._clones = {
+                key: path for key, path in Template._clones.items() if path != self._temp_dir
+            }
+            self._temp_dir = None
+
+    def _register_temp_dir(self, temp_dir: str) -> None:
+        # Temporary directories are removed by `cleanup` as soon as the template is no longer
+        # used, the exit handler only catches leftovers, e.g. after an error.
+        self._temp_dir = temp_dir
+        Template._temp_dirs.add(temp_dir)
+
+        if not Template._cleanup_registered:
+            atexit.register(Template.cleanup_all)
+            Template._cleanup_registered = True
+
+    @classmethod
+    def cleanup_all(cls) -> None:
+        """Remove temporary files of all templates, e.g. after all roles are processed."""
+        for temp_dir in list(cls._temp_dirs):
+            cls._cleanup_temp_dir(temp_dir)
+        cls._temp_dirs.clear()
+        cls._clones.clear()
+
     @staticmethod
     def _cleanup_temp_dir(temp_dir: str) -> None:
         if temp_dir and os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
+
+
+def _check_members(names: list[str], target: str) -> None:
+    """Ensure that all files of an archive are extracted inside the target directory."""
+    target = os.path.realpath(target)
+    for name in names:
+        path = os.path.realpath(os.path.join(target, name))
+        if os.path.commonpath([target, path]) != target:
+            raise ansibledoctor.exception.TemplateError(
+                f"Template archive contains a file outside of the archive: {name}"
+            )
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Find the sections of the role data that a template uses."""
+
+import os
+import threading
+from typing import ClassVar
+
+import jinja2
+from jinja2 import nodes
+
+from ansibledoctor.model import RoleData
+
+ALL_SECTIONS = frozenset(RoleData.SECTIONS)
+
+# Sections used by the views of `ansibledoctor.template_views.TemplateViews`.
+VIEW_SECTIONS: dict[str, frozenset[str]] = {
+    "var_sources": frozenset({"var"}),
+    "vars": frozenset({"var"}),
+    "var_columns": frozenset({"var"}),
+    "tags": frozenset({"tag"}),
+    "todos": frozenset({"todo"}),
+    "dependencies": frozenset(),
+    "used_by": frozenset(),
+    "dependency": frozenset(),
+}
+
+# Keys of the role data that are not parsed from the role.
+INTERNAL_KEYS = frozenset({"internal"})
+
+
+class TemplateUsage:
+    """
+    Static analysis of the role data sections used by the files of a template.
+
+    The sections are passed to templates as `role.<section>`, as top-level variables and through
+    the `views` object. All files of a template are parsed once per run, includes, imports and
+    `extends` are followed with the same search paths as the template loader. If a file uses the
+    role data in a way that can't be resolved statically, e.g. `role[name]`, a loop over `role`
+    or an include with a variable name, all sections are considered used.
+    """
+
+    # Analysis by absolute file path, shared by all roles of a run.
+    _files: ClassVar[dict[str, tuple[frozenset[str], tuple[str, ...]]]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, template_path: str, search_paths: list[str]) -> None:
+        """
+        Create the analysis for a template.
+
+        :param template_path: directory of the template files
+        :param search_paths: search paths of the template loader for included files
+        """
+        self._template_path = template_path
+        self._search_paths = [os.path.abspath(p) for p in search_paths]
+        self._env = jinja2.Environment(autoescape=True)  # nosec
+
+    def sections(self, template_files: list[str]) -> frozenset[str]:
+        """
+        Get the sections used by the given template files and the files they include.
+
+        :param template_files: template files relative to the template directory
+        """
+        used: set[str] = set()
+        pending = [os.path.join(self._template_path, tf) for tf in template_files]
+        visited: set[str] = set()
+        while pending:
+            path = pending.pop()
+            if path in visited:
+                continue
+            visited.add(path)
+
+            sections, includes = self._analyse(path)
+            used.update(sections)
+            if used >= ALL_SECTIONS:
+                return ALL_SECTIONS
+
+            for include in includes:
+                resolved = self._resolve(include)
+                if resolved is None:
+                    # Unknown files fail on render, the result doesn't matter.
+                    continue
+                pending.append(resolved)
+
+        return frozenset(used)
+
+    def _resolve(self, name: str) -> str | None:
+        """Find an included file like `SafeFileSystemLoader`."""
+        if ".." in name or os.path.isabs(name):
+            return None
+        for search_path in self._search_paths:
+            full_path = os.path.abspath(os.path.join(search_path, name))
+            if not full_path.startswith(search_path + os.sep):
+                continue
+            if os.path.isfile(full_path):
+                return full_path
+        return None
+
+    def _analyse(self, path: str) -> tuple[frozenset[str], tuple[str, ...]]:
+        with self._lock:
+            if path in self._files:
+                return self._files[path]
+
+        try:
+            with open(path) as f:
+                ast = self._env.parse(f.read())
+            result = _used_sections(ast)
+        except (OSError, jinja2.TemplateSyntaxError):
+            result = (ALL_SECTIONS, ())
+
+        with self._lock:
+            self._files[path] = result
+        return result
+
+
+def _used_sections(ast: nodes.Template) -> tuple[frozenset[str], tuple[str, ...]]:
+    """Get the sections and the names of the included files of a parsed template file."""
+    used: set[str] = set()
+    resolved: set[int] = set()
+
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        key: str | None
+        if isinstance(node, nodes.Getattr):
+            target, key = node.node, node.attr
+        elif isinstance(node, nodes.Getitem):
+            target, key = node.node, _const(node.arg)
+        else:
+            continue
+        if not isinstance(target, nodes.Name) or target.name not in ("role", "views"):
+            continue
+
+        if key is None:
+            return ALL_SECTIONS, ()
+
+        if target.name == "role":
+            if key not in ALL_SECTIONS and key not in INTERNAL_KEYS:
+                return ALL_SECTIONS, ()
+            used.update({key} & ALL_SECTIONS)
+        else:
+            if key not in VIEW_SECTIONS:
+                return ALL_SECTIONS, ()
+            used.update(VIEW_SECTIONS[key])
+        resolved.add(id(target))
+
+    # The `deep_get` filter looks up a dotted path, e.g. `deep_get(role, "meta.name")`.
+    for node in ast.find_all(nodes.Filter):
+        if node.name != "deep_get" or len(node.args) < 2:
+            continue
+        target, keys = node.args[0], _const(node.args[1])
+        if isinstance(target, nodes.Name) and target.name == "role" and keys is not None:
+            section = keys.split(".")[0]
+            used.update({section} & ALL_SECTIONS)
+            resolved.add(id(target))
+
+    for variable in ast.find_all(nodes.Name):
+        if variable.ctx != "load":
+            continue
+        if variable.name in ALL_SECTIONS:
+            used.add(variable.name)
+        elif variable.name in ("role", "views") and id(variable) not in resolved:
+            return ALL_SECTIONS, ()
+
+    includes: list[str] = []
+    for include in ast.find_all((nodes.Include, nodes.Import, nodes.FromImport, nodes.Extends)):
+        name = _const(getattr(include, "template", None))
+        if name is None:
+            return ALL_SECTIONS, ()
+        includes.append(name)
+
+    return frozenset(used), tuple(includes)
+
+
+def _const(node: nodes.Node | None) -> str | None:
+    if isinstance(node, nodes.Const) and isinstance(node.value, str):
+        return node.value
+    return None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Precomputed views on the role data for templates."""
+
+import os
+from functools import cached_property
+from typing import Any
+
+from ansibledoctor.role_graph import RoleNode
+
+
+class TemplateViews:
+    """
+    Memoised, read-only views on the role data.
+
+    The views are computed once per role on first access and shared between all template files
+    and includes, so templates don't have to filter and sort the role data again. The raw role
+    data is still passed to templates unchanged.
+
+    If the role is part of a dependency graph, the views also summarise the roles it depends on
+    and the roles that depend on it, see `ansibledoctor.role_graph.RoleGraph`.
+    """
+
+    def __init__(
+        self,
+        role_data: dict[str, Any],
+        options: dict[str, Any] | None = None,
+        role_node: RoleNode | None = None,
+    ) -> None:
+        self._data = role_data
+        self._options = options or {}
+        self._node = role_node
+        self._vars: dict[str | None, list[tuple[str, Any]]] = {}
+        self._var_columns: dict[str | None, list[str]] = {}
+
+    @cached_property
+    def var_sources(self) -> dict[str, dict[str, Any]]:
+        """Variables grouped by source (`defaults` or `vars`), in order of definition."""
+        sources: dict[str, dict[str, Any]] = {}
+        for key, item in self._data.get("var", {}).items():
+            if isinstance(item, dict):
+                sources.setdefault(item.get("source") or "", {})[key] = item
+
+        return sources
+
+    def vars(self, source: str | None = None) -> list[tuple[str, Any]]:
+        """
+        Get variables as list of key and item pairs.
+
+        Variables are sorted by name (case-insensitive) if the `sort_vars` template option is
+        enabled, otherwise the order of definition is kept.
+
+        :param source: only return variables of this source, e.g. `defaults`
+        """
+        if source not in self._vars:
+            if source is None:
+                items = list(self._data.get("var", {}).items())
+            else:
+                items = list(self.var_sources.get(source, {}).items())
+
+            if self._options.get("sort_vars", True):
+                items.sort(key=_sort_key)
+
+            self._vars[source] = items
+
+        return self._vars[source]
+
+    def var_columns(self, source: str | None = None) -> list[str]:
+        """
+        Get all attributes that are set on at least one variable, e.g. `description`.
+
+        :param source: only consider variables of this source, e.g. `defaults`
+        """
+        if source not in self._var_columns:
+            columns: dict[str, None] = {}
+            for _, item in self.vars(source):
+                columns.update(dict.fromkeys(item))
+
+            self._var_columns[source] = list(columns)
+
+        return self._var_columns[source]
+
+    @cached_property
+    def tags(self) -> list[tuple[str, Any]]:
+        """Tags as list of key and item pairs, sorted by name (case-insensitive)."""
+        return sorted(self._data.get("tag", {}).items(), key=_sort_key)
+
+    @cached_property
+    def todos(self) -> list[tuple[str, Any]]:
+        """
+        Todos as flat list of key and item pairs.
+
+        Unscoped todos (key `default`) come first, followed by all other todos sorted
+        by key (case-insensitive).
+        """
+        todos = sorted(self._data.get("todo", {}).items(), key=_sort_key)
+        default = [("default", item) for key, items in todos if key == "default" for item in items]
+        scoped = [(key, item) for key, items in todos if key != "default" for item in items]
+
+        return default + scoped
+
+    @cached_property
+    def dependencies(self) -> list[dict[str, Any]]:
+        """Summaries of all dependencies that are part of the run, in order of the meta file."""
+        if self._node is None:
+            return []
+        return [node.summary(self._node) for node in self._node.dependencies]
+
+    @cached_property
+    def used_by(self) -> list[dict[str, Any]]:
+        """Summaries of all roles of the run that depend on this role, sorted by name."""
+        if self._node is None:
+            return []
+        return [node.summary(self._node) for node in self._node.used_by]
+
+    def dependency(self, name: str) -> dict[str, Any] | None:
+        """
+        Get the summary of a dependency, `None` if the role is not part of the run.
+
+        :param name: role name or path as used in the meta file
+        """
+        if self._node is None:
+            return None
+
+        basename = os.path.basename(name.rstrip("/"))
+        for summary, node in zip(self.dependencies, self._node.dependencies, strict=True):
+            if name == node.name or basename == os.path.basename(node.path):
+                return summary
+        return None
+
+
+def _sort_key(item: tuple[Any, Any]) -> Any:
+    # Same order as the Jinja2 `dictsort` filter.
+    key = item[0]
+    return key.lower() if isinstance(key, str) else key
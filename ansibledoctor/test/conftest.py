@@ -0,0 +1,63 @@
+"""Shared fixtures to run ansible-doctor against roles created in a temporary directory."""
+
+import os
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+RunDoctor = Callable[..., subprocess.CompletedProcess[str]]
+
+
+def write_files(root: Path, files: dict[str, str]) -> None:
+    """
+    Create files below a directory.
+
+    :param root: base directory
+    :param files: file content by relative path, values starting with `@link:` create a symlink
+        to the given target instead
+    """
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if content.startswith("@link:"):
+            path.symlink_to(content.removeprefix("@link:"))
+        else:
+            path.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def run_doctor(tmp_path_factory: pytest.TempPathFactory) -> RunDoctor:
+    """Run the command line with the local `readme` template and an isolated environment."""
+    home = tmp_path_factory.mktemp("home")
+
+    def run(
+        *args: str, env: dict[str, str] | None = None, cwd: Path | None = None
+    ) -> subprocess.CompletedProcess[str]:
+        run_env = {
+            key: value for key, value in os.environ.items() if not key.startswith("ANSIBLE_DOCTOR")
+        }
+        run_env.update(
+            {
+                "HOME": str(home),
+                "XDG_CONFIG_HOME": str(home / ".config"),
+                "ANSIBLE_DOCTOR_TEMPLATE__SRC": f"local>{TEMPLATES_DIR}",
+                "ANSIBLE_DOCTOR_TEMPLATE__NAME": "readme",
+                "ANSIBLE_DOCTOR_LOGGING__JSON": "true",
+            }
+        )
+        run_env.update(env or {})
+        return subprocess.run(
+            [sys.executable, "-c", "from ansibledoctor.cli import main; main()", *args],
+            capture_output=True,
+            text=True,
+            env=run_env,
+            cwd=cwd,
+            check=False,
+        )
+
+    return run
@@ -0,0 +1,89 @@
+"""Tests for the role catalog and its query mode."""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+TASKS = "---\n- name: x\n  debug: {}\n"
+
+
+def test_role_named_query_is_documented(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    write_files(tmp_path, {"query/tasks/main.yml": TASKS})
+
+    result = run_doctor("query", "-f", cwd=tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "query" / "README.md").is_file()
+
+
+def test_query_mode(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    catalog = str(tmp_path / "catalog.db")
+    write_files(
+        tmp_path,
+        {
+            "roles/nginx/defaults/main.yml": "---\nnginx_port: 80\n",
+            "roles/nginx/tasks/main.yml": TASKS,
+        },
+    )
+    assert run_doctor("-r", "--catalog", catalog, str(tmp_path / "roles")).returncode == 0
+
+    result = run_doctor("--query", "--catalog", catalog, "var", "nginx_*", "--json")
+
+    assert result.returncode == 0, result.stderr
+    assert [(r["role"], r["name"]) for r in json.loads(result.stdout)] == [("nginx", "nginx_port")]
+
+
+def query(run_doctor: RunDoctor, catalog: str, *args: str) -> list[dict[str, Any]]:
+    result = run_doctor("--query", "--catalog", catalog, *args, "--json")
+    assert result.returncode == 0, result.stderr
+    entries: list[dict[str, Any]] = json.loads(result.stdout)
+    return entries
+
+
+def test_changed_roles_are_parsed_again(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    catalog = str(tmp_path / "catalog.db")
+    roles = tmp_path / "roles"
+    write_files(
+        roles,
+        {
+            "a/defaults/main.yml": "---\na_port: 80\n",
+            "a/tasks/main.yml": TASKS,
+            "b/defaults/main.yml": "---\nb_port: 80\n",
+            "b/tasks/main.yml": TASKS,
+        },
+    )
+    assert run_doctor("-r", "--catalog", catalog, str(roles)).returncode == 0
+
+    (roles / "a" / "defaults" / "main.yml").write_text("---\na_port: 8080\na_host: x\n")
+    result = run_doctor("-r", "-vv", "--catalog", catalog, str(roles))
+
+    assert result.returncode == 0, result.stderr
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    updates = {
+        event["role"]: event["event"]
+        for event in events
+        if event["event"].startswith("Role in catalog")
+    }
+    assert updates == {"a": "Role in catalog updated", "b": "Role in catalog is up to date"}
+    assert sorted(entry["name"] for entry in query(run_doctor, catalog, "var")) == [
+        "a_host",
+        "a_port",
+        "b_port",
+    ]
+    assert query(run_doctor, catalog, "var", "a_port")[0]["data"]["value"] == {"a_port": 8080}
+
+
+def test_removed_roles_are_pruned(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    catalog = str(tmp_path / "catalog.db")
+    roles = tmp_path / "roles"
+    write_files(roles, {"a/tasks/main.yml": TASKS, "b/tasks/main.yml": TASKS})
+    assert run_doctor("-r", "--catalog", catalog, str(roles)).returncode == 0
+
+    shutil.rmtree(roles / "b")
+    result = run_doctor("-r", "--catalog", catalog, str(roles))
+
+    assert result.returncode == 0, result.stderr
+    assert [entry["role"] for entry in query(run_doctor, catalog, "role")] == ["a"]
@@ -0,0 +1,47 @@
+"""Tests for config files of roles."""
+
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+TASKS = "---\n- name: x\n  debug: {}\n"
+
+
+def write_roles(roles: Path) -> None:
+    write_files(
+        roles,
+        {
+            ".ansibledoctor.yaml": "---\nexclude_tags:\n  - hidden\n",
+            "r1/.ansibledoctor.yml": "---\nrole:\n  name: first\n",
+            "r1/tasks/main.yml": TASKS + "  tags: [hidden, shown]\n",
+            "r2/tasks/main.yml": TASKS + "  tags: [hidden, shown]\n",
+        },
+    )
+
+
+def test_role_config_stays_in_role(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    roles = tmp_path / "roles"
+    write_roles(roles)
+
+    result = run_doctor("-f", "-r", str(roles))
+
+    assert result.returncode == 0, result.stderr
+    first = (roles / "r1" / "README.md").read_text()
+    second = (roles / "r2" / "README.md").read_text()
+    assert first.startswith("# first\n")
+    assert second.startswith("# r2\n")
+    # The shared config of the parent directory applies to both roles.
+    for readme in (first, second):
+        assert "shown" in readme
+        assert "hidden" not in readme
+
+
+def test_environment_overrides_role_config(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    roles = tmp_path / "roles"
+    write_roles(roles)
+
+    result = run_doctor("-f", "-r", str(roles), env={"ANSIBLE_DOCTOR_ROLE__NAME": "from-env"})
+
+    assert result.returncode == 0, result.stderr
+    for role in ("r1", "r2"):
+        assert (roles / role / "README.md").read_text().startswith("# from-env\n")
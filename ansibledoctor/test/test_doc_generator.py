@@ -0,0 +1,59 @@
+"""Tests for rendering role data."""
+
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+
+def test_oversized_value_reports_limit(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    items = "".join(f"  - item{i}\n" for i in range(1000))
+    write_files(
+        tmp_path,
+        {
+            "defaults/main.yml": f"---\nbig:\n{items}",
+            "tasks/main.yml": "---\n- name: x\n  debug: {}\n",
+        },
+    )
+
+    result = run_doctor(
+        "-f", str(tmp_path), env={"ANSIBLE_DOCTOR_RENDERER__MAX_VALUE_SIZE": "100"}
+    )
+
+    assert result.returncode == 0, result.stderr
+    readme = (tmp_path / "README.md").read_text()
+    assert "# Value truncated (more than 100.0 B in total)" in readme
+    assert "item999" not in readme
+
+
+def test_exported_values_are_not_mixed_up(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    # Each list is freed after its iteration, the next list may get the same id.
+    template = (
+        "{% for name in ['first', 'second', 'third'] %}"
+        "{{ ([name] * 100) | to_nice_yaml }}\n"
+        "{% endfor %}"
+    )
+    write_files(
+        tmp_path,
+        {
+            "templates/custom/README.md.j2": template,
+            "role/tasks/main.yml": "---\n- name: x\n  debug: {}\n",
+        },
+    )
+
+    result = run_doctor(
+        "-f",
+        str(tmp_path / "role"),
+        env={
+            "ANSIBLE_DOCTOR_TEMPLATE__SRC": f"local>{tmp_path / 'templates'}",
+            "ANSIBLE_DOCTOR_TEMPLATE__NAME": "custom",
+            "ANSIBLE_DOCTOR_RENDERER__MAX_VALUE_SIZE": "100",
+            "ANSIBLE_DOCTOR_RENDERER__OVERSIZED_VALUES": "export",
+        },
+    )
+
+    assert result.returncode == 0, result.stderr
+    readme = (tmp_path / "role" / "README.md").read_text()
+    paths = [line.rsplit(" ", 1)[1] for line in readme.splitlines()]
+    assert len(set(paths)) == 3
+    for path, name in zip(paths, ("first", "second", "third"), strict=True):
+        assert f"- {name}\n" in (tmp_path / "role" / path).read_text()
@@ -0,0 +1,53 @@
+"""Tests for keep-going runs."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+TASKS = "---\n- name: x\n  debug: {}\n"
+
+
+@pytest.mark.parametrize(
+    ("expression", "error"),
+    [
+        ("{{ 1 // 0 }}", "ZeroDivisionError"),
+        ("{{ 'a' | truncate('x') }}", "TypeError"),
+    ],
+)
+def test_unexpected_template_error_fails_role(
+    tmp_path: Path, run_doctor: RunDoctor, expression: str, error: str
+) -> None:
+    roles = tmp_path / "roles"
+    write_files(
+        roles,
+        {
+            "broken/tasks/main.yml": TASKS,
+            "broken/.ansibledoctor/_body.j2": f"{expression}\n",
+            "fine/tasks/main.yml": TASKS,
+        },
+    )
+    templates = tmp_path / "templates"
+    write_files(templates, {"custom/README.md.j2": '{% include "_body.j2" ignore missing %}'})
+    report = tmp_path / "errors.json"
+
+    result = run_doctor(
+        "-f",
+        "-r",
+        "-k",
+        "--error-report",
+        str(report),
+        str(roles),
+        env={
+            "ANSIBLE_DOCTOR_TEMPLATE__SRC": f"local>{templates}",
+            "ANSIBLE_DOCTOR_TEMPLATE__NAME": "custom",
+        },
+    )
+
+    assert "Traceback" not in result.stderr
+    assert (roles / "fine" / "README.md").exists()
+    errors = json.loads(report.read_text())["errors"]
+    assert [record["role"] for record in errors] == ["broken"]
+    assert errors[0]["error"].startswith(error)
@@ -0,0 +1,64 @@
+"""Tests for the lint subcommand."""
+
+import json
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+DEFAULTS = """---
+# @var a:description: >
+# runs into the next annotation
+# @var a:example: $ 1
+a: 1
+
+# @var b:description: Single line
+# continued by mistake
+# @end
+b: 2
+
+# @var c:description: >
+# interrupted
+
+# by an empty line
+# @end
+c: 3
+
+# @var d:description: >
+# closed
+# @end
+d: 4
+
+# @var e:description: >
+# runs into the end of the file
+"""
+
+
+def test_multiline_blocks(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    write_files(
+        tmp_path,
+        {"defaults/main.yml": DEFAULTS, "tasks/main.yml": "---\n- name: x\n  debug: {}\n"},
+    )
+
+    result = run_doctor("--lint", "--json", str(tmp_path))
+
+    assert result.returncode == 1, result.stderr
+    findings = [
+        (finding["line"], finding["check"])
+        for finding in json.loads(result.stdout)
+        if finding["check"].endswith("multiline")
+    ]
+    assert findings == [
+        (2, "unterminated-multiline"),
+        (9, "orphaned-multiline"),
+        (16, "orphaned-multiline"),
+        (24, "unterminated-multiline"),
+    ]
+
+
+def test_role_named_lint_is_documented(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    write_files(tmp_path, {"lint/tasks/main.yml": "---\n- name: x\n  debug: {}\n"})
+
+    result = run_doctor("lint", "-f", cwd=tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "lint" / "README.md").is_file()
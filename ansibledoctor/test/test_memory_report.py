@@ -0,0 +1,28 @@
+"""Tests for the memory report."""
+
+import pytest
+
+from ansibledoctor.utils.memory_report import MemoryReport
+
+
+def test_failed_role_is_recorded() -> None:
+    report = MemoryReport()
+    try:
+        with report.stage("r1", "plan"):
+            pass
+
+        with pytest.raises(ValueError), report.role("r1"), report.stage("r1", "parse"):
+            raise ValueError
+
+        with report.role("r2"), report.stage("r2", "parse"):
+            pass
+    finally:
+        report.stop()
+
+    assert [(role, stage) for role, stage, _, _ in report.records] == [
+        ("r1", "plan"),
+        ("r1", "parse"),
+        ("r1", "total"),
+        ("r2", "parse"),
+        ("r2", "total"),
+    ]
@@ -0,0 +1,45 @@
+"""Tests for the tar archive of the rendered files of a run."""
+
+import tarfile
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+TASKS = "---\n- name: x\n  debug: {}\n"
+
+
+def test_outputs_are_written_to_archive(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    roles = tmp_path / "roles"
+    archive = tmp_path / "docs.tar.gz"
+    write_files(roles, {"a/tasks/main.yml": TASKS, "b/tasks/main.yml": TASKS})
+
+    result = run_doctor("-r", "--archive", str(archive), str(roles))
+
+    assert result.returncode == 0, result.stderr
+    with tarfile.open(archive) as tf:
+        assert tf.getnames() == ["a/README.md", "b/README.md"]
+        member = tf.extractfile("a/README.md")
+        assert member is not None
+        assert member.read().startswith(b"# a\n")
+    assert not list(roles.glob("*/README.md"))
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == ["docs.tar.gz"]
+
+
+def test_failed_run_keeps_archive(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    roles = tmp_path / "roles"
+    archive = tmp_path / "docs.tar"
+    archive.write_bytes(b"previous")
+    write_files(
+        roles,
+        {
+            "a/tasks/main.yml": TASKS,
+            "b/defaults/main.yml": "---\nfoo: [\n",
+            "b/tasks/main.yml": TASKS,
+        },
+    )
+
+    result = run_doctor("-r", "--archive", str(archive), str(roles))
+
+    assert result.returncode != 0
+    assert archive.read_bytes() == b"previous"
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == ["docs.tar"]
@@ -0,0 +1,77 @@
+"""Tests for the cache of rendered role documentation."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from ansibledoctor.render_cache import RenderCache
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+ROLE = {
+    "defaults/main.yml": "---\nfoo_port: 80\n",
+    "tasks/main.yml": "---\n- name: x\n  debug: {}\n",
+}
+
+
+def restored(stdout: str) -> int:
+    events = [json.loads(line) for line in stdout.splitlines()]
+    return sum(event["event"] == "Role output restored from render cache" for event in events)
+
+
+def test_unchanged_roles_are_restored(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    cache = str(tmp_path / "cache")
+    write_files(tmp_path / "first" / "role", ROLE)
+    result = run_doctor("-f", "-v", "--render-cache", cache, str(tmp_path / "first" / "role"))
+    assert result.returncode == 0, result.stderr
+    assert restored(result.stdout) == 0
+
+    # The key doesn't contain absolute paths, another checkout of the role is a hit.
+    shutil.copytree(tmp_path / "first", tmp_path / "second")
+    (tmp_path / "second" / "role" / "README.md").unlink()
+    result = run_doctor("-f", "-v", "--render-cache", cache, str(tmp_path / "second" / "role"))
+
+    assert result.returncode == 0, result.stderr
+    assert restored(result.stdout) == 1
+    readme = (tmp_path / "second" / "role" / "README.md").read_text()
+    assert readme == (tmp_path / "first" / "role" / "README.md").read_text()
+
+
+def test_changed_roles_are_rendered(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    cache = str(tmp_path / "cache")
+    write_files(tmp_path / "role", ROLE)
+    assert run_doctor("-f", "-v", "--render-cache", cache, str(tmp_path / "role")).returncode == 0
+
+    (tmp_path / "role" / "defaults" / "main.yml").write_text("---\nfoo_port: 8080\n")
+    result = run_doctor("-f", "-v", "--render-cache", cache, str(tmp_path / "role"))
+
+    assert result.returncode == 0, result.stderr
+    assert restored(result.stdout) == 0
+    assert "8080" in (tmp_path / "role" / "README.md").read_text()
+
+
+def test_invalid_entries_are_misses(tmp_path: Path) -> None:
+    cache = RenderCache(str(tmp_path))
+    key = cache.key({"role": "a"})
+    entry = tmp_path / key[:2] / f"{key}.json.gz"
+    entry.parent.mkdir()
+    entry.write_bytes(b"not gzip")
+
+    assert cache.get(key) is None
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = RenderCache(str(tmp_path))
+    keys = [cache.key({"role": name}) for name in ("a", "b", "c")]
+    for index, key in enumerate(keys):
+        cache.put(key, {"README.md": os.urandom(512).hex().encode()})
+        entry = tmp_path / key[:2] / f"{key}.json.gz"
+        os.utime(entry, (index, index))
+    cache.get(keys[0])
+    cache.max_size = sum(f.stat().st_size for f in tmp_path.rglob("*.json.gz")) - 1
+
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
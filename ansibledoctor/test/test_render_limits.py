@@ -0,0 +1,76 @@
+"""Tests for the render limits of templates."""
+
+import time
+from pathlib import Path
+from typing import Any
+
+import jinja2
+import pytest
+
+from ansibledoctor.exception import RenderLimitError
+from ansibledoctor.render_limits import (
+    MAX_INCLUDE_DEPTH,
+    LimitedEnvironment,
+    LimitedSandboxedEnvironment,
+    RenderLimits,
+)
+
+
+def render(
+    env_class: type[LimitedEnvironment],
+    source: str,
+    loader: jinja2.BaseLoader | None = None,
+    **limits: Any,
+) -> str:
+    render_limits = RenderLimits(**limits)
+    env = env_class(loader=loader)
+    env.render_limits = render_limits
+    return render_limits.render(env.from_string(source))
+
+
+@pytest.mark.parametrize(
+    ("env_class", "source"),
+    [
+        (LimitedEnvironment, "{% for i in range(10 ** 12) if i < 0 %}{% endfor %}"),
+        (
+            LimitedSandboxedEnvironment,
+            "{% for i in range(99999) %}{% for j in range(99999) %}{% endfor %}{% endfor %}",
+        ),
+    ],
+)
+def test_loop_without_output_is_interrupted(
+    env_class: type[LimitedEnvironment], source: str
+) -> None:
+    start = time.monotonic()
+    with pytest.raises(RenderLimitError, match="time limit"):
+        render(env_class, source, timeout=0.2)
+
+    assert time.monotonic() - start < 2
+
+
+def test_loops_keep_working() -> None:
+    source = "{% for i in [3, 1, 2] if i > 1 %}{{ loop.index }}/{{ loop.length }}:{{ i }} "
+    source += "{% else %}none{% endfor %}"
+
+    assert render(LimitedEnvironment, source, timeout=10) == "1/2:3 2/2:2 "
+
+
+def test_sandbox_range_overflow_is_limit() -> None:
+    with pytest.raises(RenderLimitError, match="Range too big"):
+        render(LimitedSandboxedEnvironment, "{{ range(100000000) }}")
+
+
+def test_sandbox_repeated_string_is_checked_before_it_is_built() -> None:
+    with pytest.raises(RenderLimitError, match="size limit"):
+        render(LimitedSandboxedEnvironment, "{{ 'a' * 10 ** 12 }}", max_output_size=1000)
+
+    assert render(LimitedSandboxedEnvironment, "{{ 'a' * 3 }}", max_output_size=1000) == "aaa"
+
+
+@pytest.mark.parametrize(("depth", "limit"), [(0, MAX_INCLUDE_DEPTH), (5, 5)])
+def test_self_include_is_limited(tmp_path: Path, depth: int, limit: int) -> None:
+    (tmp_path / "self.j2").write_text('{% include "self.j2" %}')
+    loader = jinja2.FileSystemLoader(tmp_path)
+
+    with pytest.raises(RenderLimitError, match=f"depth limit of {limit}"):
+        render(LimitedEnvironment, '{% include "self.j2" %}', loader, max_include_depth=depth)
@@ -0,0 +1,38 @@
+"""Tests for dependencies between roles."""
+
+from pathlib import Path
+
+from ansibledoctor.model import Meta
+from ansibledoctor.role_graph import RoleNode
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+DEPENDENT_META = "---\ngalaxy_info:\n  description: Uses BB\ndependencies:\n  - role: bb\n"
+TASKS = "---\n- name: x\n  debug: {}\n"
+
+
+def test_description_joins_multiline_values() -> None:
+    node = RoleNode("bb", "/roles/bb", {"description": Meta(value=["Line one", "line two"])})
+
+    assert node.description == "Line one line two"
+
+
+def test_summary_does_not_depend_on_role_order(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    # Roles are processed by name, `aa` is rendered before `bb` and `zz` after it.
+    write_files(
+        tmp_path,
+        {
+            "aa/meta/main.yml": DEPENDENT_META,
+            "aa/tasks/main.yml": TASKS,
+            "bb/meta/main.yml": "---\ngalaxy_info:\n  description: Galaxy BB\n",
+            "bb/tasks/main.yml": "---\n# @meta description: Annotated BB\n- name: x\n  debug: {}\n",
+            "zz/meta/main.yml": DEPENDENT_META,
+            "zz/tasks/main.yml": TASKS,
+        },
+    )
+
+    result = run_doctor("-f", "-r", str(tmp_path))
+
+    assert result.returncode == 0, result.stderr
+    for name in ("aa", "zz"):
+        assert "- [bb](../bb) - Galaxy BB\n" in (tmp_path / name / "README.md").read_text()
+    assert "Annotated BB" in (tmp_path / "bb" / "README.md").read_text()
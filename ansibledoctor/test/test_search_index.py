@@ -0,0 +1,29 @@
+"""Tests for the search index."""
+
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+
+def test_unchanged_roles_keep_index(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    roles = tmp_path / "roles"
+    write_files(
+        roles,
+        {
+            "r1/defaults/main.yml": "---\n# @var foo:description: Foo\nfoo: 1\n",
+            "r1/tasks/main.yml": "---\n- name: x\n  debug: {}\n  tags: [install]\n",
+            "r2/tasks/main.yml": "---\n# @todo improvement: Add defaults\n- name: x\n  debug: {}\n",
+        },
+    )
+    index = tmp_path / "site" / "search.json"
+
+    result = run_doctor("-f", "-r", "--search-index", str(index), str(roles))
+    assert result.returncode == 0, result.stderr
+    first = index.stat()
+
+    result = run_doctor("-f", "-r", "--search-index", str(index), str(roles))
+    assert result.returncode == 0, result.stderr
+
+    assert index.stat().st_ino == first.st_ino
+    assert index.stat().st_mtime_ns == first.st_mtime_ns
+    assert "Search index updated" not in result.stdout
@@ -0,0 +1,67 @@
+"""Tests for files shared between roles."""
+
+from pathlib import Path
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+from ansibledoctor.utils.shared_files import SharedFiles
+
+
+def test_every_role_gets_own_copy() -> None:
+    shared = SharedFiles()
+    for _ in range(3):
+        shared.add((1, 1))
+
+    results = [shared.get("vars", (1, 1), lambda: [{"a": 1}]) for _ in range(3)]
+    results[0][0]["b"] = 2
+
+    assert results[1] == [{"a": 1}]
+    assert results[2] == [{"a": 1}]
+    assert shared.hits == 2
+
+
+def test_roles_that_skip_a_kind_release_it() -> None:
+    shared = SharedFiles()
+    for _ in range(3):
+        shared.add((1, 1))
+
+    shared.get("vars", (1, 1), lambda: [{"a": 1}])
+    shared.release([(1, 1)], [("vars", (1, 1))])
+    assert shared._results
+
+    # The second role is done without reading the file, e.g. after a render cache hit.
+    shared.release([(1, 1)], [])
+    assert shared._results
+
+    shared.get("vars", (1, 1), lambda: [{"a": 1}])
+    assert not shared._results
+
+
+def test_released_roles_are_not_waited_for() -> None:
+    shared = SharedFiles()
+    for _ in range(3):
+        shared.add((1, 1))
+
+    shared.release([(1, 1)], [])
+    shared.get("vars", (1, 1), lambda: [{"a": 1}])
+    shared.get("vars", (1, 1), lambda: [{"a": 1}])
+
+    assert shared.hits == 1
+    assert not shared._results
+
+
+def test_annotations_stay_in_their_role(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    write_files(
+        tmp_path,
+        {
+            "r1/defaults/main.yml": "---\nfoo:\n  a: 1\n",
+            "r1/tasks/main.yml": '---\n# @var foo:value: $ {"b": 2}\n- name: x\n  debug: {}\n',
+            "r2/defaults/main.yml": "@link:../../r1/defaults/main.yml",
+            "r2/tasks/main.yml": "---\n- name: x\n  debug: {}\n",
+        },
+    )
+
+    result = run_doctor("-f", "-r", str(tmp_path))
+
+    assert result.returncode == 0, result.stderr
+    assert "b: 2" in (tmp_path / "r1" / "README.md").read_text()
+    assert "b: 2" not in (tmp_path / "r2" / "README.md").read_text()
@@ -0,0 +1,87 @@
+"""Tests for the tags collected through includes and blocks of task files."""
+
+from pathlib import Path
+
+import pytest
+
+from ansibledoctor.test.conftest import RunDoctor, write_files
+
+ORPHAN = "---\n- name: orphan\n  debug: {}\n  tags: orphan\n"
+
+
+def rendered_tags(tmp_path: Path, run_doctor: RunDoctor, files: dict[str, str]) -> set[str]:
+    write_files(tmp_path, files)
+    result = run_doctor("-f", str(tmp_path))
+    assert result.returncode == 0, result.stderr
+
+    readme = (tmp_path / "README.md").read_text()
+    tags = readme.split("## Discovered Tags", 1)[1].split("\n## ", 1)[0]
+    return {line.strip("*_") for line in tags.splitlines() if line.startswith("**_")}
+
+
+def test_includes_are_followed(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    tags = rendered_tags(
+        tmp_path,
+        run_doctor,
+        {
+            "tasks/main.yml": (
+                "---\n"
+                "- name: include\n  include_tasks: setup.yml\n"
+                "- name: import\n  ansible.builtin.import_tasks:\n    file: nested/config.yml\n"
+            ),
+            "tasks/setup.yml": "---\n- name: setup\n  debug: {}\n  tags: [setup]\n",
+            # Includes are relative to the including file or the tasks directory of the role,
+            # cycles are only followed once.
+            "tasks/nested/config.yml": (
+                "---\n- name: config\n  debug: {}\n  tags: config\n"
+                "- name: back\n  include_tasks: main.yml\n"
+            ),
+            "tasks/orphan.yml": ORPHAN,
+            "handlers/main.yml": "---\n- name: handler\n  debug: {}\n  tags: handler\n",
+        },
+    )
+
+    assert tags == {"setup", "config", "handler"}
+
+
+def test_tasks_in_blocks_are_collected(tmp_path: Path, run_doctor: RunDoctor) -> None:
+    tags = rendered_tags(
+        tmp_path,
+        run_doctor,
+        {
+            "tasks/main.yml": (
+                "---\n"
+                "- name: block\n  tags: block\n  block:\n"
+                "    - name: inner\n      debug: {}\n      tags: inner\n"
+                "    - name: include\n      include_tasks: setup.yml\n"
+                "  rescue:\n    - name: rescue\n      debug: {}\n      tags: rescue\n"
+                "  always:\n    - block:\n        - name: nested\n          debug: {}\n"
+                "          tags: nested\n"
+            ),
+            "tasks/setup.yml": "---\n- name: setup\n  debug: {}\n  tags: setup\n",
+            "tasks/orphan.yml": ORPHAN,
+        },
+    )
+
+    assert tags == {"block", "inner", "setup", "rescue", "nested"}
+
+
+@pytest.mark.parametrize(
+    "main",
+    [
+        "---\n- name: dynamic\n  include_tasks: '{{ item }}.yml'\n",
+        None,
+    ],
+    ids=["templated-include", "no-main-file"],
+)
+def test_unresolved_roles_use_all_files(
+    tmp_path: Path, run_doctor: RunDoctor, main: str | None
+) -> None:
+    files = {
+        "tasks/other.yml": "---\n- name: other\n  debug: {}\n  tags: other\n",
+        "tasks/orphan.yml": ORPHAN,
+    }
+    if main is not None:
+        files["tasks/main.yml"] = main
+
+    assert rendered_tags(tmp_path, run_doctor, files) == {"other", "orphan"}
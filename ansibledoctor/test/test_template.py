@@ -0,0 +1,118 @@
+"""Tests for template sources."""
+
+import hashlib
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+import ansibledoctor.template
+from ansibledoctor.exception import TemplateError
+from ansibledoctor.template import Template
+from ansibledoctor.test.conftest import write_files
+
+TEMPLATE = b"{{ role.meta.name.value }}\n"
+
+
+@pytest.fixture
+def archive_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Extract template archives into an empty cache directory."""
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(ansibledoctor.template, "ARCHIVE_CACHE_DIR", str(cache))
+    monkeypatch.setattr(Template, "_archives", {})
+    return cache
+
+
+def write_tar(
+    path: Path, members: dict[str, bytes], symlinks: dict[str, str] | None = None
+) -> str:
+    """Write a tar archive and return its SHA-256 digest."""
+    with tarfile.open(path, "w:gz") as tf:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+        for name, target in (symlinks or {}).items():
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            tf.addfile(info)
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "pin",
+    ["sha256=../../x", "sha256=/tmp/x", "sha256=" + "a" * 63, "sha256=" + "g" * 64],
+)
+def test_archive_pin_must_be_digest(pin: str) -> None:
+    with pytest.raises(TemplateError, match="expected 64 hex digits"):
+        Template("readme", f"archive>/nonexistent/templates.tar.gz#{pin}")
+
+
+def test_failed_clone_is_not_reused(tmp_path: Path) -> None:
+    repo = Repo.init(tmp_path / "repo")
+    write_files(tmp_path / "repo", {"readme/README.md.j2": "{{ role.meta.name.value }}\n"})
+    repo.index.add(["readme/README.md.j2"])
+    repo.index.commit("Add template")
+    src = f"git>{tmp_path / 'repo'}#missing"
+
+    for _ in range(2):
+        with pytest.raises(TemplateError, match="Error checking out branch or tag"):
+            Template("readme", src)
+
+    assert not Template._clones
+    assert not Template._temp_dirs
+
+
+def test_archive_is_extracted_once(tmp_path: Path, archive_cache: Path) -> None:
+    archive = tmp_path / "templates.tar.gz"
+    digest = write_tar(archive, {"readme/README.md.j2": TEMPLATE, "readme/_vars.j2": b""})
+
+    template = Template("readme", f"archive>{archive}#sha256={digest}")
+
+    assert template.path == str(archive_cache / digest / "readme")
+    assert template.files == ["README.md.j2"]
+
+    # A pinned archive in the cache is neither read nor extracted again.
+    archive.unlink()
+    Template._archives.clear()
+    assert Template("readme", f"archive>{archive}#sha256={digest}").path == template.path
+
+
+def test_archive_must_match_pin(tmp_path: Path, archive_cache: Path) -> None:
+    archive = tmp_path / "templates.tar.gz"
+    write_tar(archive, {"readme/README.md.j2": TEMPLATE})
+
+    with pytest.raises(TemplateError, match="checksum mismatch"):
+        Template("readme", f"archive>{archive}#sha256={'0' * 64}")
+
+    assert not list(archive_cache.iterdir())
+
+
+@pytest.mark.parametrize("name", ["../README.md.j2", "/tmp/README.md.j2", "readme/../../x.j2"])
+def test_archive_files_stay_in_archive(tmp_path: Path, archive_cache: Path, name: str) -> None:
+    archive = tmp_path / "templates.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("readme/README.md.j2", TEMPLATE)
+        zf.writestr(name, TEMPLATE)
+
+    with pytest.raises(TemplateError, match="outside of the archive"):
+        Template("readme", f"archive>{archive}")
+
+    assert not list(archive_cache.iterdir())
+    assert not (tmp_path / "README.md.j2").exists()
+
+
+def test_archive_links_are_rejected(tmp_path: Path, archive_cache: Path) -> None:
+    archive = tmp_path / "templates.tar.gz"
+    write_tar(
+        archive, {"readme/README.md.j2": TEMPLATE}, symlinks={"readme/_vars.j2": "/etc/passwd"}
+    )
+
+    with pytest.raises(TemplateError, match="Unsupported file in template archive"):
+        Template("readme", f"archive>{archive}")
+
+    assert not list(archive_cache.iterdir())
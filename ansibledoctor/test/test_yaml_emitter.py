@@ -0,0 +1,22 @@
+"""Tests for the yaml emitter."""
+
+from ansibledoctor.utils.yaml_emitter import YamlEmitter
+
+
+def test_small_values_are_memoised() -> None:
+    emitter = YamlEmitter()
+    value = {"a": [1, 2], "b": "x"}
+
+    assert emitter.dump(value) == emitter.dump({"a": [1, 2], "b": "x"})
+    assert (emitter.hits, emitter.misses) == (1, 1)
+    # Values with the same output in python but another type get their own entry.
+    emitter.dump({"a": [1, 2], "b": True})
+    assert emitter.misses == 2
+
+
+def test_large_values_are_not_memoised() -> None:
+    emitter = YamlEmitter()
+    value = {"items": [f"item{i}" for i in range(10000)]}
+
+    assert emitter.dump(value) == emitter.dump(value)
+    assert (emitter.hits, emitter.misses) == (0, 0)
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """Global utility methods and classes."""
 
+import contextvars
 import os
 import sys
-from collections.abc import Iterable
-from typing import Any, NoReturn
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NoReturn, TypeVar
 
 import structlog
 
@@ -45,7 +47,42 @@ def flatten(items: Iterable[Any]) -> Iterable[Any]:
             yield x
 
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], workers: int = 1) -> list[R]:
+    """
+    Apply `func` to all items on a thread pool and return the results in order of the items.
+
+    Each call runs in a copy of the current context, so bound log context is kept. If a call
+    raises an exception, the exception of the first item in order is raised.
+
+    :param workers: number of threads, the items are processed sequentially if `1`
+    """
+    items = list(items)
+    if workers <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def format_size(size: float) -> str:
+    """Format a size in bytes as human readable string, e.g. `1.5 MiB`."""
+    value = float(size)
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
 def _split_string(string: str, delimiter: str, escape: str, maxsplit: int = 0) -> list[str]:
+    if escape not in string:
+        return string.split(delimiter, maxsplit if maxsplit > 0 else -1)
+
     result = []
     current_element = []
     iterator = iter(string)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Collect errors of failed roles."""
+
+import json
+from typing import Any
+
+
+class ErrorReport:
+    """
+    Errors of all roles that failed in a keep-going run.
+
+    Each record contains the role name and path, the error message and the context of the error,
+    e.g. the file that could not be parsed. Values of the context are converted to strings.
+    """
+
+    def __init__(self) -> None:
+        self.records: list[dict[str, Any]] = []
+        self.roles = 0
+
+    def add(self, role: str, role_path: str, msg: Any, **context: Any) -> None:
+        record = {"role": role, "role_path": role_path, "message": str(msg).strip()}
+        record.update({key: str(value).strip() for key, value in context.items()})
+        self.records.append(record)
+
+    def format(self) -> str:
+        """Format all records as json document."""
+        report = {
+            "roles": self.roles,
+            "failed": len(self.records),
+            "errors": self.records,
+        }
+        return json.dumps(report, indent=2) + "\n"
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as outfile:
+            outfile.write(self.format())
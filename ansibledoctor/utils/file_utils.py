@@ -1,15 +1,143 @@
 #!/usr/bin/env python3
 """Utility functions for file operations."""
 
-import fnmatch
+import os
+import tempfile
 
-from ansibledoctor.constants import DEFAULTS_FILE_KEY, VARS_FILE_KEY, YAML_EXTENSIONS
+from ansibledoctor.constants import (
+    ARGUMENT_SPECS_FILE_KEY,
+    DEFAULTS_FILE_KEY,
+    HANDLERS_FILE_KEY,
+    META_FILE_KEY,
+    OTHER_FILE_KEY,
+    TASKS_FILE_KEY,
+    VARS_FILE_KEY,
+    YAML_EXTENSIONS,
+)
+
+# Files identified by their parent directory and file name, e.g. `defaults/main.yml`.
+MAIN_FILE_TYPES = {
+    ("defaults", "main"): DEFAULTS_FILE_KEY,
+    ("vars", "main"): VARS_FILE_KEY,
+    ("meta", "main"): META_FILE_KEY,
+    ("meta", "argument_specs"): ARGUMENT_SPECS_FILE_KEY,
+}
+
+# Files identified by any ancestor directory, e.g. `tasks/install/main.yml`.
+TREE_FILE_TYPES = {
+    "tasks": TASKS_FILE_KEY,
+    "handlers": HANDLERS_FILE_KEY,
+}
+
+
+def classify_file(rfile: str, base_dir: str | None = None) -> tuple[str, str | None]:
+    """
+    Classify a role file based on its path.
+
+    :param rfile: path of the file to classify
+    :param base_dir: only path components below this directory are considered
+    :return: the file type and the role directory the file belongs to, the role
+        directory is `None` if the file is not part of a known role layout
+    """
+    relpath = os.path.relpath(rfile, base_dir) if base_dir else rfile
+    head, filename = os.path.split(relpath)
+    name, ext = os.path.splitext(filename)
+    parts = [part for part in head.split(os.sep) if part and part != "."]
+
+    if not parts or ext[1:] not in YAML_EXTENSIONS:
+        return OTHER_FILE_KEY, None
+
+    file_type = MAIN_FILE_TYPES.get((parts[-1], name))
+    if file_type:
+        return file_type, os.path.dirname(os.path.dirname(rfile))
+
+    for depth, part in enumerate(reversed(parts)):
+        file_type = TREE_FILE_TYPES.get(part)
+        if file_type:
+            role_path = rfile
+            for _ in range(depth + 2):
+                role_path = os.path.dirname(role_path)
+            return file_type, role_path
+
+    return OTHER_FILE_KEY, None
 
 
 def classify_var_file(rfile: str) -> str | None:
     """Classify a file as a vars or defaults file based on its path."""
-    if any(fnmatch.fnmatch(rfile, "*/vars/main." + ext) for ext in YAML_EXTENSIONS):
-        return VARS_FILE_KEY
-    if any(fnmatch.fnmatch(rfile, "*/defaults/main." + ext) for ext in YAML_EXTENSIONS):
-        return DEFAULTS_FILE_KEY
+    file_type, _ = classify_file(rfile)
+    if file_type in (VARS_FILE_KEY, DEFAULTS_FILE_KEY):
+        return file_type
     return None
+
+
+def existing_files(paths: list[str]) -> set[str]:
+    """
+    Check which of the given files exist with a single directory scan per parent directory.
+
+    :param paths: absolute file paths, usually the output files of many roles
+    :return: the paths that exist as regular file or symlink to a file
+    """
+    by_dir: dict[str, set[str]] = {}
+    for path in paths:
+        directory, name = os.path.split(path)
+        by_dir.setdefault(directory, set()).add(name)
+
+    existing: set[str] = set()
+    for directory, names in by_dir.items():
+        try:
+            with os.scandir(directory) as entries:
+                existing.update(
+                    entry.path
+                    for entry in entries
+                    if entry.name in names and entry.is_file(follow_symlinks=True)
+                )
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+    return existing
+
+
+def prefetch_files(paths: list[str], chunk_size: int = 1024 * 1024) -> None:
+    """
+    Read files without keeping their content to load them into the page cache.
+
+    Files that can not be read are skipped, errors are reported when the files are read again.
+
+    :param paths: files to read
+    :param chunk_size: size of a single read
+    """
+    for path in paths:
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while f.read(chunk_size):
+                    pass
+        except OSError:
+            continue
+
+
+def write_file_atomic(path: str, content: bytes) -> None:
+    """
+    Write a file through a temporary file in the same directory that replaces the file.
+
+    Readers see either the old or the new content, never a partially written file. The mode of
+    an existing file is kept, new files are readable by everyone.
+
+    :param path: file to write, the directory must exist
+    :param content: content of the file
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(path)
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
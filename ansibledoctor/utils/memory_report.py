@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Track memory usage per role and processing stage."""
+
+import gc
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from ansibledoctor.utils import format_size
+
+
+class MemoryReport:
+    """
+    Record peak and retained memory with tracemalloc.
+
+    Peak is the highest amount of memory allocated during a stage on top of the memory that was
+    allocated when the stage started. Retained is the memory still allocated after the stage
+    (or role) finished, compared to its start. A role is measured after all of its data has
+    been released, so a retained value close to zero means nothing is kept between roles.
+
+    Stages and roles that fail are recorded as well. Stages outside of a role, e.g. planning,
+    are only measured against their own start.
+    """
+
+    def __init__(self) -> None:
+        self.records: list[tuple[str, str, int, int]] = []
+        self._role_start: int | None = None
+        self._role_peak = 0
+        tracemalloc.start()
+
+    @contextmanager
+    def role(self, name: str) -> Iterator[None]:
+        gc.collect()
+        role_start, _ = tracemalloc.get_traced_memory()
+        self._role_start = role_start
+        self._role_peak = 0
+
+        try:
+            yield
+        finally:
+            self._role_start = None
+            gc.collect()
+            current, _ = tracemalloc.get_traced_memory()
+            self.records.append((name, "total", self._role_peak, current - role_start))
+
+    @contextmanager
+    def stage(self, role: str, name: str) -> Iterator[None]:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._role_start is not None:
+                self._role_peak = max(self._role_peak, peak - self._role_start)
+            self.records.append((role, name, peak - start, current - start))
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    def format(self) -> str:
+        """Format all records as plain text table."""
+        width = max([len(record[0]) for record in self.records] + [4])
+        lines = [f"{'role':<{width}}  {'stage':<8}  {'peak':>10}  {'retained':>10}"]
+        for role, stage, peak, retained in self.records:
+            lines.append(
+                f"{role:<{width}}  {stage:<8}  {format_size(peak):>10}  "
+                f"{format_size(retained):>10}"
+            )
+
+        return "\n".join(lines) + "\n"
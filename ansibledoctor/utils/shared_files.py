@@ -0,0 +1,101 @@
+"""Share results of reading files that belong to several roles."""
+
+import copy
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Device and inode of a file.
+FileId = tuple[int, int]
+
+
+class SharedFiles:
+    """
+    Results of reading files that are part of several roles, e.g. through symlinks.
+
+    Files are identified by device and inode, so all paths of a file share the same results.
+    Every registry of a run adds its files before any role is parsed. Results are only kept for
+    files that are used by more than one role and are released after the last role used them or
+    was released without using them, e.g. because it skipped a section.
+
+    Results must not depend on the path of the file, e.g. they must not contain the path. Every
+    role gets its own copy of a result, so roles can change the values they read, e.g. when
+    annotations are merged into variables.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._uses: Counter[FileId] = Counter()
+        self._results: dict[tuple[str, FileId], Any] = {}
+        self._remaining: dict[tuple[str, FileId], int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, file_id: FileId) -> None:
+        """Register a file of a role, call once per role."""
+        self._uses[file_id] += 1
+
+    def release(self, file_ids: Iterable[FileId], used: Iterable[tuple[str, FileId]]) -> None:
+        """
+        Release the files of a role once the role is done, call once per role.
+
+        :param file_ids: files the role has registered
+        :param used: kinds and files of the results the role got with `get`
+        """
+        file_ids = set(file_ids)
+        used = set(used)
+        with self._lock:
+            for file_id in file_ids:
+                self._uses[file_id] -= 1
+                if self._uses[file_id] <= 0:
+                    del self._uses[file_id]
+            for key in [k for k in self._results if k[1] in file_ids and k not in used]:
+                self._consume(key)
+
+    def _consume(self, key: tuple[str, FileId]) -> None:
+        self._remaining[key] -= 1
+        if self._remaining[key] <= 0:
+            del self._results[key], self._remaining[key]
+
+    def get(self, kind: str, file_id: FileId | None, compute: Callable[[], T]) -> T:
+        """
+        Get the result of reading a file, computed on first use.
+
+        :param kind: type of the result, e.g. `vars` or `annotations`
+        :param file_id: device and inode of the file, results are not shared if `None`
+        :param compute: function that reads the file
+        """
+        if file_id is None:
+            return compute()
+
+        key = (kind, file_id)
+        # Results stay stored for the last role, even if the other roles are released already.
+        if self._uses[file_id] < 2 and key not in self._results:
+            return compute()
+
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                result: T = self._results[key]
+                self._remaining[key] -= 1
+                if self._remaining[key] > 0:
+                    return copy.deepcopy(result)
+                # The last role gets the stored result itself.
+                del self._results[key], self._remaining[key]
+                return result
+
+        result = compute()
+        with self._lock:
+            self.misses += 1
+            if key not in self._results:
+                if self._uses[file_id] > 1:
+                    self._results[key] = copy.deepcopy(result)
+                    self._remaining[key] = self._uses[file_id] - 1
+            else:
+                # Another role stored the result while this role computed it.
+                self._consume(key)
+
+        return result
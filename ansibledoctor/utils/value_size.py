@@ -0,0 +1,88 @@
+"""Estimate and limit the size of values before they are serialised."""
+
+from collections.abc import Mapping
+from typing import Any
+
+# Rough number of characters a container adds per item, e.g. `- ` or `: ` and a line break.
+ITEM_OVERHEAD = 3
+# Rough number of characters of a non-string scalar, e.g. numbers or booleans.
+SCALAR_SIZE = 8
+TRUNCATION_MARK = "..."
+
+
+def estimate_size(value: Any, limit: int | None = None) -> int:
+    """
+    Estimate the serialised size of a value in characters without serialising it.
+
+    :param value: value to estimate
+    :param limit: stop as soon as the estimate exceeds this size, the returned size is
+        a lower bound in this case
+    """
+    size = 0
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, str):
+            size += len(current)
+        elif isinstance(current, Mapping):
+            size += len(current) * ITEM_OVERHEAD
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple)):
+            size += len(current) * ITEM_OVERHEAD
+            stack.extend(current)
+        else:
+            size += SCALAR_SIZE
+
+        if limit is not None and size > limit:
+            break
+
+    return size
+
+
+def truncate_value(value: Any, limit: int) -> Any:
+    """
+    Create a preview copy of a value that fits into the size limit.
+
+    Items of mappings and sequences are kept in order until the limit is reached, long strings
+    are shortened. A truncation mark is added to every container and string that was shortened.
+
+    :param value: value to truncate
+    :param limit: size limit as returned by `estimate_size`
+    """
+    return _Truncator(limit).truncate(value)
+
+
+class _Truncator:
+    def __init__(self, limit: int) -> None:
+        self.remaining = limit
+
+    def truncate(self, value: Any) -> Any:
+        if isinstance(value, str):
+            if len(value) > self.remaining:
+                value = value[: max(self.remaining, 0)] + TRUNCATION_MARK
+            self.remaining -= len(value)
+            return value
+
+        if isinstance(value, Mapping):
+            result: dict[Any, Any] = {}
+            for key, item in value.items():
+                if self.remaining <= 0:
+                    result[TRUNCATION_MARK] = TRUNCATION_MARK
+                    break
+                self.remaining -= ITEM_OVERHEAD + estimate_size(key, self.remaining)
+                result[key] = self.truncate(item)
+            return result
+
+        if isinstance(value, (list, tuple)):
+            items: list[Any] = []
+            for item in value:
+                if self.remaining <= 0:
+                    items.append(TRUNCATION_MARK)
+                    break
+                self.remaining -= ITEM_OVERHEAD
+                items.append(self.truncate(item))
+            return items
+
+        self.remaining -= SCALAR_SIZE
+        return value
@@ -0,0 +1,204 @@
+"""Reusable emitter for human readable yaml output."""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import ruamel.yaml
+from ruamel.yaml.compat import StringIO
+
+from ansibledoctor.utils.value_size import estimate_size
+
+YAML_EMITTERS = ["ruamel", "fast"]
+
+
+class YamlEmitter:
+    """
+    Dump values as verbose, human readable yaml.
+
+    The ruamel dumper is configured once per indentation and reused for all values. Output of
+    small plain values (dicts, lists and scalars) is memoised, so values that repeat across
+    variables, template files or roles are only serialised once.
+
+    With the `fast` backend, plain mappings with simple keys and scalars are written directly
+    without the ruamel pipeline. The fast path only accepts values for which the output is known
+    to be identical to the ruamel output, everything else is still dumped by ruamel.
+
+    The emitter can be used from multiple threads. Ruamel dumpers keep state while dumping, so
+    they are created per thread, the cache is shared.
+    """
+
+    CACHE_SIZE = 2048
+    # Don't keep large outputs in the cache, huge values rarely repeat.
+    CACHE_MAX_LENGTH = 4096
+
+    def __init__(self, backend: str = "ruamel", cache_size: int = CACHE_SIZE) -> None:
+        self.backend = backend
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[int, Any], str] = OrderedDict()
+
+    def dump(self, data: Any, indent: int = 4, **kw: Any) -> str:
+        """
+        Serialise `data` to yaml without trailing whitespace.
+
+        :param data: value to serialise
+        :param indent: indentation of nested mappings, sequences are indented twice as much
+        :param kw: additional arguments passed to the ruamel dumper, disables memoisation
+        """
+        if kw:
+            return self._dump_ruamel(data, indent, **kw)
+
+        # Large outputs are not cached, the key of a large value is not worth building.
+        if (
+            self.cache_size <= 0
+            or estimate_size(data, self.CACHE_MAX_LENGTH) > self.CACHE_MAX_LENGTH
+        ):
+            return self._dump(data, indent)
+
+        try:
+            key = (indent, _freeze(data))
+        except _UnsupportedValueError:
+            return self._dump(data, indent)
+
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return result
+            self.misses += 1
+
+        result = self._dump(data, indent)
+        if len(result) <= self.CACHE_MAX_LENGTH:
+            with self._lock:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return result
+
+    def _dump(self, data: Any, indent: int) -> str:
+        if self.backend == "fast":
+            try:
+                return _dump_fast(data, indent)
+            except _UnsupportedValueError:
+                pass
+
+        return self._dump_ruamel(data, indent)
+
+    def _dump_ruamel(self, data: Any, indent: int, **kw: Any) -> str:
+        dumpers: dict[int, ruamel.yaml.YAML] | None = getattr(self._local, "dumpers", None)
+        if dumpers is None:
+            dumpers = self._local.dumpers = {}
+        yaml = dumpers.get(indent)
+        if yaml is None:
+            yaml = ruamel.yaml.YAML()
+            yaml.indent(mapping=indent, sequence=(indent * 2), offset=indent)
+            yaml.width = 4096
+            dumpers[indent] = yaml
+
+        stream = StringIO()
+        yaml.dump(data, stream, **kw)
+        return stream.getvalue().rstrip()
+
+
+class _UnsupportedValueError(Exception):
+    pass
+
+
+_PLAIN_SCALARS = (str, int, float, bool, type(None))
+
+# Plain scalars that are never quoted by ruamel. Strings that start with a digit, dot or
+# underscore can be resolved to numbers, other special characters change the yaml structure.
+_SAFE_STRING = re.compile(r"[A-Za-z][A-Za-z0-9_./-]*(?: [A-Za-z0-9_./-]+)*")
+_RESERVED_STRINGS = {"true", "false", "null"}
+_MAX_KEY_LENGTH = 100
+_MAX_STRING_LENGTH = 200
+
+
+def _freeze(data: Any) -> Any:
+    """Convert plain data to a hashable key, including the type of all values."""
+    data_type = type(data)
+    if data_type is dict:
+        return (dict, tuple((_freeze(k), _freeze(v)) for k, v in data.items()))
+    if data_type is list:
+        return (list, tuple(_freeze(v) for v in data))
+    if data_type in _PLAIN_SCALARS:
+        return (data_type, data)
+
+    # Round-trip yaml objects keep format information that is not part of the key.
+    raise _UnsupportedValueError
+
+
+def _dump_fast(data: Any, indent: int) -> str:
+    if type(data) is not dict or not data or indent < 2:
+        raise _UnsupportedValueError
+
+    lines: list[str] = []
+    _emit_mapping(data, "", indent, lines)
+    return "\n".join(lines)
+
+
+def _emit_mapping(data: dict[Any, Any], pad: str, indent: int, lines: list[str]) -> None:
+    for key, value in data.items():
+        if type(key) is not str or len(key) > _MAX_KEY_LENGTH:
+            raise _UnsupportedValueError
+        _emit_node(f"{pad}{_scalar(key)}:", value, pad, indent, lines)
+
+
+def _emit_node(prefix: str, value: Any, pad: str, indent: int, lines: list[str]) -> None:
+    value_type = type(value)
+    if value_type is dict:
+        if not value:
+            lines.append(f"{prefix} {{}}")
+            return
+        lines.append(prefix)
+        _emit_mapping(value, pad + " " * indent, indent, lines)
+    elif value_type is list:
+        if not value:
+            lines.append(f"{prefix} []")
+            return
+        lines.append(prefix)
+        _emit_sequence(value, pad + " " * indent, indent, lines)
+    else:
+        lines.append(f"{prefix} {_scalar(value)}")
+
+
+def _emit_sequence(data: list[Any], pad: str, indent: int, lines: list[str]) -> None:
+    # Items are indented by the sequence indent, i.e. `indent` after the dash.
+    item_pad = pad + " " * indent
+    dash = "-".ljust(indent)
+    for value in data:
+        value_type = type(value)
+        if value_type is dict and value:
+            # The first key is written on the same line as the dash.
+            first = len(lines)
+            _emit_mapping(value, item_pad, indent, lines)
+            lines[first] = f"{pad}{dash}{lines[first][len(item_pad) :]}"
+        elif value_type in (dict, list):
+            raise _UnsupportedValueError
+        else:
+            lines.append(f"{pad}{dash}{_scalar(value)}")
+
+
+def _scalar(value: Any) -> str:
+    value_type = type(value)
+    if value_type is str:
+        if (
+            len(value) > _MAX_STRING_LENGTH
+            or value.lower() in _RESERVED_STRINGS
+            or not _SAFE_STRING.fullmatch(value)
+        ):
+            raise _UnsupportedValueError
+        return str(value)
+    if value_type is bool:
+        return "true" if value else "false"
+    if value_type is int:
+        return str(value)
+
+    raise _UnsupportedValueError
@@ -8,6 +8,8 @@ from typing import Any
 import ruamel.yaml
 import yaml
 from ansible.parsing.yaml.loader import AnsibleLoader
+from ruamel.yaml.anchor import Anchor
+from ruamel.yaml.comments import CommentedMap, CommentedSeq, Format, merge_attrib
 from ruamel.yaml.constructor import SafeConstructor
 
 import ansibledoctor.exception
@@ -26,6 +28,14 @@ class UnsafeTag:
         return loader.construct_scalar(node)
 
 
+# Registered once on import, loaders are created per file and may run on multiple threads.
+ruamel.yaml.add_constructor(
+    UnsafeTag.yaml_tag,
+    UnsafeTag.yaml_constructor,
+    constructor=SafeConstructor,
+)
+
+
 def parse_yaml_ansible(
     yaml_file: TextIOBase | StringIO | str,
 ) -> list[Any] | dict[Any, Any]:
@@ -44,16 +54,59 @@ def parse_yaml_ansible(
 
 
 def parse_yaml(yaml_file: TextIOBase | StringIO | str) -> dict[Any, Any]:
-    try:
-        ruamel.yaml.add_constructor(
-            UnsafeTag.yaml_tag,
-            UnsafeTag.yaml_constructor,
-            constructor=SafeConstructor,
-        )
+    return defaultdict(dict, _load_yaml(yaml_file) or {})
+
+
+def parse_yaml_lines(
+    yaml_file: TextIOBase | StringIO | str,
+) -> tuple[dict[Any, Any], dict[Any, int]]:
+    """Parse a yaml file and return the data and the line number of each top-level key."""
+    raw = _load_yaml(yaml_file)
+    lines: dict[Any, int] = {}
+
+    if isinstance(raw, CommentedMap):
+        for key in raw:
+            with suppress(KeyError, TypeError):
+                lines[key] = raw.lc.key(key)[0] + 1
+
+    return defaultdict(dict, raw or {}), lines
+
 
+def compact_yaml(data: Any) -> Any:
+    """
+    Convert round-trip yaml containers to plain dicts and lists.
+
+    Round-trip containers keep line, column and format information for every node. Collections
+    in flow style or with anchors and merge keys are kept as they are to preserve the output of
+    the yaml dumper.
+    """
+    if isinstance(data, CommentedMap):
+        if _yaml_keep_node(data):
+            return data
+        return {key: compact_yaml(value) for key, value in data.items()}
+
+    if isinstance(data, CommentedSeq):
+        if _yaml_keep_node(data):
+            return data
+        return [compact_yaml(value) for value in data]
+
+    return data
+
+
+def _yaml_keep_node(node: CommentedMap | CommentedSeq) -> bool:
+    fmt = getattr(node, Format.attrib, None)
+    anchor = getattr(node, Anchor.attrib, None)
+    return bool(
+        (fmt is not None and fmt.flow_style())
+        or (anchor is not None and anchor.value)
+        or getattr(node, merge_attrib, None)
+    )
+
+
+def _load_yaml(yaml_file: TextIOBase | StringIO | str) -> Any:
+    try:
         data = ruamel.yaml.YAML(typ="rt").load(yaml_file)
         _yaml_remove_comments(data)
-        data = defaultdict(dict, data or {})
     except (
         ruamel.yaml.parser.ParserError,
         ruamel.yaml.scanner.ScannerError,